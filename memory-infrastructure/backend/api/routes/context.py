@@ -45,10 +45,11 @@ async def suggest_related_context(
         threshold=0.5,
     )
     sources: list[ContextSource] = []
+    entries = await factory.memory_store.get_many(user_id, [result.doc_id for result in results])
     for result in results:
         if result.doc_id == entry_id:
             continue
-        entry = await factory.memory_store.get(user_id, result.doc_id)
+        entry = entries.get(result.doc_id)
         if not entry:
             continue
         sources.append(
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import timedelta
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Response, status
 
 from models import (
     BulkIngestRequest,
@@ -15,7 +15,7 @@ from models import (
 )
 from services.app_services import memory_aggregator, memory_stats, compounding_service
 from services.factory import factory
-from services.utils import now_utc
+from services.utils import from_epoch_us, now_utc, to_epoch_us
 
 router = APIRouter(prefix="/api/memory", tags=["memory"])
 
@@ -25,8 +25,7 @@ async def get_memory_stats(
     user_id: str = Query(..., min_length=1),
 ) -> MemoryStats:
     profile = await factory.voice_profile_service.get_profile(user_id)
-    events = await factory.memory_store.get_compounding_events(user_id, 1)
-    last_compounding = events[0]["timestamp"] if events else None
+    last_compounding = await factory.memory_store.last_compounding_event_at(user_id)
     return await memory_stats.get_stats(user_id, profile.confidence if profile else 0.0, last_compounding)
 
 
@@ -35,8 +34,7 @@ async def get_memory_health(
     user_id: str = Query(..., min_length=1),
 ) -> MemoryHealthReport:
     profile = await factory.voice_profile_service.get_profile(user_id)
-    events = await factory.memory_store.get_compounding_events(user_id, 1)
-    last_compounding = events[0]["timestamp"] if events else None
+    last_compounding = await factory.memory_store.last_compounding_event_at(user_id)
     return await memory_stats.get_health_report(
         user_id, profile.confidence if profile else 0.0, last_compounding
     )
@@ -44,13 +42,23 @@ async def get_memory_health(
 
 @router.get("/entries", response_model=list[MemoryEntry])
 async def list_memory_entries(
+    response: Response,
     user_id: str = Query(..., min_length=1),
     content_type: str | None = Query(None),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     sort_by: str = Query("indexed_at"),
+    cursor: str | None = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
 ) -> list[MemoryEntry]:
-    records = await factory.memory_store.list(user_id, content_type, limit, offset, sort_by)
+    if offset and not cursor:
+        records = await factory.memory_store.list(user_id, content_type, limit, offset, sort_by)
+    else:
+        try:
+            records, next_cursor = await factory.memory_store.list_page(user_id, content_type, limit, sort_by, cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
     return [
         MemoryEntry(
             id=record.id,
@@ -59,8 +67,8 @@ async def list_memory_entries(
             title=record.title,
             content_preview=record.content_preview,
             embedding_id=record.embedding_id,
-            indexed_at=record.indexed_at,
-            last_accessed_at=record.last_accessed_at,
+            indexed_at=from_epoch_us(record.indexed_at_us),
+            last_accessed_at=from_epoch_us(record.last_accessed_at_us) if record.last_accessed_at_us else None,
             access_count=record.access_count,
             relevance_decay=record.relevance_decay,
             source_url=record.source_url,
@@ -75,12 +83,14 @@ async def list_memory_entries(
 @router.get("/entries/{entry_id}", response_model=MemoryEntry)
 async def get_memory_entry(
     entry_id: str,
+    background_tasks: BackgroundTasks,
     user_id: str = Query(..., min_length=1),
 ) -> MemoryEntry:
     record = await factory.memory_store.get(user_id, entry_id)
     if not record:
         raise HTTPException(status_code=404, detail="Entry not found")
-    await compounding_service.on_content_accessed(user_id, entry_id)
+    # Access tracking is write-behind; don't hold the response for it.
+    background_tasks.add_task(compounding_service.on_content_accessed, user_id, entry_id)
     return MemoryEntry(
         id=record.id,
         user_id=record.user_id,
@@ -88,8 +98,8 @@ async def get_memory_entry(
         title=record.title,
         content_preview=record.content_preview,
         embedding_id=record.embedding_id,
-        indexed_at=record.indexed_at,
-        last_accessed_at=record.last_accessed_at,
+        indexed_at=from_epoch_us(record.indexed_at_us),
+        last_accessed_at=from_epoch_us(record.last_accessed_at_us) if record.last_accessed_at_us else None,
         access_count=record.access_count,
         relevance_decay=record.relevance_decay,
         source_url=record.source_url,
@@ -142,14 +152,16 @@ async def compact_memory(
     decayed = await compounding_service.decay_stale_entries(user_id)
     removed = []
     if remove_stale:
-        threshold = now_utc() - timedelta(days=90)
-        records = await factory.memory_store.list_all(user_id)
-        for record in records:
-            last_accessed = record.last_accessed_at or record.indexed_at
-            if last_accessed < threshold:
-                await factory.memory_store.delete(user_id, record.id)
-                await factory.vector_store.delete(user_id, record.id)
-                removed.append(record.id)
+        threshold = to_epoch_us(now_utc() - timedelta(days=90))
+        removed = [
+            record.id
+            async for page in factory.memory_store.iter_summaries(user_id)
+            for record in page
+            if (record.last_accessed_at_us or record.indexed_at_us) < threshold
+        ]
+        await factory.memory_store.delete_many(user_id, removed)
+        for entry_id in removed:
+            await factory.vector_store.delete(user_id, entry_id)
     merged = []
     if merge_duplicates:
         merged = await compounding_service.merge_near_duplicates(user_id)
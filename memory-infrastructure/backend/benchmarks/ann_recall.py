@@ -0,0 +1,61 @@
+"""Recall@k and latency of the IVF index against exact search.
+
+Run from ``backend/``::
+
+    python -m benchmarks.ann_recall --size 50000 --nprobe 4 8 16 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from services.ann_index import AnnConfig, recall_at_k
+from services.vector_store import VectorCollection
+
+
+def clustered_vectors(size: int, dimension: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=size)
+    return centers[labels] + 1.5 * rng.standard_normal((size, dimension)).astype(np.float32)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50_000)
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = clustered_vectors(args.size, args.dimension, args.clusters, rng)
+    collection = VectorCollection(initial_capacity=args.size, ann=AnnConfig(min_size=args.size, nlist=args.nlist))
+    start = time.perf_counter()
+    for i, vector in enumerate(data):
+        collection.upsert(f"doc-{i}", vector, {})
+    print(f"built {args.size} rows in {time.perf_counter() - start:.1f}s, nlist={len(collection.ann_index.centroids)}")
+
+    queries = data[rng.integers(0, args.size, size=args.queries)]
+    queries = queries + 0.5 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    def run(**kwargs) -> tuple[list[list[str]], float]:
+        start = time.perf_counter()
+        ids = [[r.doc_id for r in collection.search(q, args.k, -1.0, **kwargs)] for q in queries]
+        return ids, (time.perf_counter() - start) * 1000 / len(queries)
+
+    exact, exact_ms = run(exact=True)
+    print(f"{'mode':>12} {'recall@' + str(args.k):>10} {'ms/query':>9}")
+    print(f"{'exact':>12} {1.0:>10.3f} {exact_ms:>9.2f}")
+    for nprobe in args.nprobe:
+        approximate, ms = run(nprobe=nprobe)
+        print(f"{'nprobe=' + str(nprobe):>12} {recall_at_k(exact, approximate):>10.3f} {ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
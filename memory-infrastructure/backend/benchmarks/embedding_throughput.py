@@ -0,0 +1,64 @@
+"""Throughput of the local embedder against the previous ``random.gauss`` loop.
+
+Run from ``backend/``::
+
+    python -m benchmarks.embedding_throughput --texts 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+
+from services.embedding import LocalVoyageClient
+
+
+def legacy_embed(text: str, dimension: int) -> list[float]:
+    # The pre-NumPy implementation: reseeds the global generator per call.
+    random.seed(hash(text))
+    return [random.gauss(0, 1) for _ in range(dimension)]
+
+
+async def run(args: argparse.Namespace) -> None:
+    texts = [f"memory entry {i} about retention and positioning" for i in range(args.texts)]
+    client = LocalVoyageClient(args.dimension)
+
+    start = time.perf_counter()
+    for text in texts:
+        legacy_embed(text, args.dimension)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in texts:
+        await client.embed(text)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await client.embed_batch(texts)
+    batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.embed_array(texts)
+    array = time.perf_counter() - start
+
+    print(f"{'path':>18} {'texts/s':>10} {'speedup':>8}")
+    for name, elapsed in (
+        ("legacy gauss loop", legacy),
+        ("embed", single),
+        ("embed_batch", batch),
+        ("embed_array", array),
+    ):
+        print(f"{name:>18} {args.texts / elapsed:>10.0f} {legacy / elapsed:>7.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--dimension", type=int, default=512)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
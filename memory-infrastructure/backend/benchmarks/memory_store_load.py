@@ -0,0 +1,169 @@
+"""Mixed read/write throughput and write latency of ``MemoryStore``: per-call
+connections vs pooled per-thread connections vs the single writer.
+
+Run from ``backend/``::
+
+    python -m benchmarks.memory_store_load --ops 4000 --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+from uuid import uuid4
+
+import anyio
+
+from services.memory_store import MemoryRecord, MemoryStore
+from services.utils import now_us
+
+
+class PooledConnectionStore(MemoryStore):
+    """Before the single writer: each write commits on its worker thread's pooled connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._writable = threading.local()
+
+    async def _write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await anyio.to_thread.run_sync(self._write_direct, fn, args)
+        finally:
+            self._write_latencies_ms.append((time.perf_counter() - start) * 1000)
+
+    def _write_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._writable, "conn", None)
+        if conn is None:
+            conn = self._writable.conn = self._open_connection()
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _write_direct(self, fn: Callable[..., Any], args: tuple) -> Any:
+        conn = self._write_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._transactions += 1
+        self._write_count += 1
+        return result
+
+
+class PerCallConnectionStore(PooledConnectionStore):
+    """Before pooling: a fresh rollback-journal connection for every call."""
+
+    def _open_connection(self, read_only: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.create_function("memory_content", 2, self._indexed_content, deterministic=True)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._open_connection()
+
+    def _write_connection(self) -> sqlite3.Connection:
+        return self._open_connection()
+
+
+def make_record(user_id: str) -> MemoryRecord:
+    content = "retention, positioning and storytelling notes " * 20
+    return MemoryRecord(
+        id=str(uuid4()),
+        user_id=user_id,
+        content_type="document",
+        title="Benchmark entry",
+        content_preview=content[:500],
+        content=content,
+        embedding_id="",
+        indexed_at_us=now_us(),
+        last_accessed_at_us=None,
+        access_count=0,
+        relevance_decay=1.0,
+        source_url=None,
+        source_metadata=None,
+        related_entries=[],
+        tags=["bench"],
+        token_count=len(content) // 4,
+    )
+
+
+async def run_load(store: MemoryStore, args: argparse.Namespace) -> tuple[float, int]:
+    rng = random.Random(args.seed)
+    users = [f"user-{i}" for i in range(args.users)]
+    ids: dict[str, list[str]] = {user: [] for user in users}
+    for user in users:
+        for _ in range(args.seed_rows):
+            record = make_record(user)
+            await store.upsert(record)
+            ids[user].append(record.id)
+
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one_op() -> None:
+        nonlocal errors
+        user = rng.choice(users)
+        roll = rng.random()
+        async with semaphore:
+            try:
+                if roll < args.write_ratio:
+                    record = make_record(user)
+                    await store.upsert(record)
+                    ids[user].append(record.id)
+                elif roll < args.write_ratio + 0.1:
+                    await store.update_access(user, rng.choice(ids[user]))
+                elif roll < 0.8:
+                    await store.get(user, rng.choice(ids[user]))
+                else:
+                    await store.list(user, None, 20, 0, "indexed_at")
+            except sqlite3.OperationalError:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_op() for _ in range(args.ops)))
+    return time.perf_counter() - start, errors
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, store_cls in (
+            ("per-call", PerCallConnectionStore),
+            ("pooled", PooledConnectionStore),
+            ("writer", MemoryStore),
+        ):
+            store = store_cls(Path(tmp) / f"{label}.db", metrics_window=args.ops)
+            elapsed, errors = await run_load(store, args)
+            stats = store.write_stats()
+            store.close()
+            print(
+                f"{label:>9}: {args.ops / elapsed:8.0f} ops/s  write p50 {stats['p50_write_ms']:6.2f} ms"
+                f"  p99 {stats['p99_write_ms']:6.2f} ms  {stats['transactions']} transactions"
+                f"  ({elapsed:.2f}s, {errors} lock errors)"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--seed-rows", type=int, default=200)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
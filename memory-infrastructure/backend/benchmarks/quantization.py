@@ -0,0 +1,53 @@
+"""Memory footprint and recall@k of int8 and product quantization.
+
+Run from ``backend/``::
+
+    python -m benchmarks.quantization --size 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from benchmarks.ann_recall import clustered_vectors
+from services.quantization import QuantizationConfig
+from services.vector_store import LocalVectorStore
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(0)
+    data = clustered_vectors(args.size, args.dimension, args.clusters, rng)
+    print(f"{'mode':>6} {'recall@' + str(args.k):>10} {'ms/query':>9} {'code MB':>8} {'float32 MB':>10} {'list MB':>8}")
+    for mode in ("int8", "pq"):
+        store = LocalVectorStore(quantization=QuantizationConfig(mode=mode, min_size=args.size, rescore=args.rescore))
+        for i, vector in enumerate(data):
+            await store.upsert("bench", f"doc-{i}", vector, {})
+        await store.wait_for_training()
+        start = time.perf_counter()
+        recall = await store.approximate_recall("bench", k=args.k, sample=args.queries)
+        ms = (time.perf_counter() - start) * 1000 / args.queries
+        report = await store.memory_report("bench")
+        mb = 1024 * 1024
+        print(
+            f"{mode:>6} {recall:>10.3f} {ms:>9.2f} {report['code_bytes'] / mb:>8.1f} "
+            f"{report['float32_bytes'] / mb:>10.1f} {report['python_list_bytes'] / mb:>8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=20_000)
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=4)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from services.app_services import compounding_service
+from services.factory import factory
 
 
 async def run_nightly_decay(user_id: str) -> int:
@@ -13,3 +14,13 @@ async def run_weekly_connections(user_id: str) -> int:
 
 async def run_monthly_duplicates(user_id: str) -> list[tuple[str, str]]:
     return await compounding_service.merge_near_duplicates(user_id)
+
+
+async def run_segment_merge(user_id: str) -> int:
+    dropped = await factory.vector_store.merge_segments(user_id)
+    return dropped + await factory.vector_store.passages.merge_segments(user_id)
+
+
+async def run_event_retention() -> int:
+    await factory.event_log.flush()
+    return await factory.event_log.prune()
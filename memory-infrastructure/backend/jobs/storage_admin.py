@@ -0,0 +1,124 @@
+"""Storage maintenance commands for ``memory.db``.
+
+Run from ``backend/``; ``compress`` needs ``MEMORY_COMPRESSION=zlib``::
+
+    python -m jobs.storage_admin compress [--user USER] [--batch 500] [--train-dictionary]
+    python -m jobs.storage_admin report
+    python -m jobs.storage_admin shards
+    python -m jobs.storage_admin move USER SHARD
+    python -m jobs.storage_admin import-legacy PATH
+    python -m jobs.storage_admin repair-stats [--user USER]
+    python -m jobs.storage_admin backfill-vectors [--user USER]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from services.factory import factory
+from services.memory_index import MemoryIndexService
+from services.memory_store import MemoryStore
+
+
+async def compress(args: argparse.Namespace) -> None:
+    store = factory.memory_store
+    if store.store_options.get("codec") is None:
+        print("compression is off; set MEMORY_COMPRESSION=zlib to enable it")
+        return
+    if args.train_dictionary:
+        dictionary_id = await store.train_content_dictionary()
+        print(f"trained dictionary {dictionary_id}" if dictionary_id else "not enough short content to train on")
+    processed = await store.compress_content(args.user, args.batch)
+    print(f"processed {processed} entries")
+    await report(args)
+
+
+async def report(args: argparse.Namespace) -> None:
+    rows = await factory.memory_store.compression_report()
+    print(f"{'user':<36} {'entries':>8} {'compressed':>10} {'raw':>12} {'stored':>12} {'ratio':>6}")
+    for row in rows:
+        print(
+            f"{row['user_id']:<36} {row['entries']:>8} {row['compressed']:>10} "
+            f"{row['raw_bytes']:>12} {row['stored_bytes']:>12} {row['ratio']:>6.2f}"
+        )
+
+
+async def shards(args: argparse.Namespace) -> None:
+    assignments = factory.memory_store.shard_map.assignments()
+    for shard in await factory.memory_store.shard_report():
+        pinned = sum(1 for assigned in assignments.values() if assigned == shard["shard"])
+        largest = ", ".join(f"{user_id}={count}" for user_id, count in shard["largest"])
+        print(f"{shard['shard']:<24} users={shard['users']:<6} pinned={pinned:<4} entries={shard['entries']:<8} {largest}")
+
+
+async def move(args: argparse.Namespace) -> None:
+    moved = await factory.memory_store.move_user(args.user, args.shard)
+    print(f"moved {moved} entries of {args.user} to {args.shard}")
+
+
+async def import_legacy(args: argparse.Namespace) -> None:
+    legacy = MemoryStore(args.path)
+    try:
+        imported = await factory.memory_store.import_store(legacy)
+    finally:
+        legacy.close()
+    factory.memory_store.mark_legacy_imported(args.path)
+    print(f"imported {sum(imported.values())} entries for {len(imported)} users")
+
+
+async def repair_stats(args: argparse.Namespace) -> None:
+    drifted = await factory.memory_store.repair_user_stats(args.user)
+    print(f"recomputed user_stats; {drifted} rows had drifted")
+
+
+async def backfill_vectors(args: argparse.Namespace) -> None:
+    indexer = MemoryIndexService(factory.vector_store, factory.embedding_client)
+    users = [args.user] if args.user else sorted(await factory.memory_store.entry_counts())
+    total = 0
+    for user_id in users:
+        indexed = await indexer.backfill(factory.memory_store, user_id)
+        if indexed:
+            print(f"{user_id}: embedded {indexed} entries")
+        total += indexed
+    print(f"embedded {total} entries missing from the vector store")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="memory.db storage maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compress_parser = commands.add_parser("compress", help="encode content stored before compression was enabled")
+    compress_parser.add_argument("--user", default=None)
+    compress_parser.add_argument("--batch", type=int, default=500)
+    compress_parser.add_argument("--train-dictionary", action="store_true")
+    compress_parser.set_defaults(handler=compress)
+    report_parser = commands.add_parser("report", help="per-user compression ratio")
+    report_parser.set_defaults(handler=report)
+    shards_parser = commands.add_parser("shards", help="users and entries per shard")
+    shards_parser.set_defaults(handler=shards)
+    move_parser = commands.add_parser("move", help="move a user to another shard, e.g. a dedicated tenant-<name>")
+    move_parser.add_argument("user")
+    move_parser.add_argument("shard")
+    move_parser.set_defaults(handler=move)
+    import_parser = commands.add_parser("import-legacy", help="copy an unsharded memory.db into the shards")
+    import_parser.add_argument("path")
+    import_parser.set_defaults(handler=import_legacy)
+    repair_parser = commands.add_parser("repair-stats", help="recompute per-user stats from the entries")
+    repair_parser.add_argument("--user", default=None)
+    repair_parser.set_defaults(handler=repair_stats)
+    backfill_parser = commands.add_parser("backfill-vectors", help="embed stored entries that have no vector")
+    backfill_parser.add_argument("--user", default=None)
+    backfill_parser.set_defaults(handler=backfill_vectors)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        try:
+            await args.handler(args)
+        finally:
+            await factory.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
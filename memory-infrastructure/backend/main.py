@@ -1,12 +1,25 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 
-from api.routes import memory, context
+from dotenv import load_dotenv
 
+# Settings such as MEMORY_COMPRESSION are read when the service factory is built.
 load_dotenv()
 
-app = FastAPI(title="Memory Infrastructure")
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+
+from api.routes import memory, context  # noqa: E402
+from services.factory import factory  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await factory.start()
+    yield
+    await factory.aclose()
+
+
+app = FastAPI(title="Memory Infrastructure", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,6 +27,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(memory.router)
@@ -107,8 +107,12 @@ class ContextRequest(BaseModel):
     max_tokens: int = Field(2000, ge=100, le=8000)
     max_sources: int = Field(5, ge=1, le=20)
     content_types: list[str] | None = None
+    tags: list[str] | None = None
     recency_days: int | None = None
     min_relevance: float = Field(0.5, ge=0.0, le=1.0)
+    # "lexical" and "hybrid" rank by reciprocal rank fusion rather than cosine
+    # similarity, and min_relevance only applies to their vector hits.
+    retrieval_mode: Literal["vector", "lexical", "hybrid"] = "vector"
     include_voice_profile: bool = True
     include_source_metadata: bool = True
     format: Literal["markdown", "plain", "xml"] = "markdown"
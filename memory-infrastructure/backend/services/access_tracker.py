@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from .memory_store import MemoryStore
+from .utils import now_us
+
+logger = logging.getLogger(__name__)
+
+
+class AccessTracker:
+    """Write-behind buffer for entry reads.
+
+    ``record`` coalesces reads per (user, entry) into one increment and the
+    latest access time without touching the database; a background task
+    applies everything pending in one transaction every ``flush_interval``
+    seconds, or as soon as ``max_pending`` distinct entries are waiting.
+    A crash therefore loses at most ``flush_interval`` seconds of access
+    counts for at most ``max_pending`` entries; ``close`` flushes the rest
+    at shutdown. Only one early flush runs at a time, and a failed flush
+    keeps at most ``max_pending`` entries, dropping the rest with a warning.
+    """
+
+    def __init__(self, store: MemoryStore, flush_interval: float = 5.0, max_pending: int = 10_000) -> None:
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: dict[tuple[str, str], list] = {}
+        self._task: asyncio.Task | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, user_id: str, entry_id: str, accessed_at_us: int | None = None) -> None:
+        accessed_at_us = accessed_at_us or now_us()
+        access = self._pending.get((user_id, entry_id))
+        if access is None:
+            self._pending[(user_id, entry_id)] = [1, accessed_at_us]
+        else:
+            access[0] += 1
+            access[1] = max(access[1], accessed_at_us)
+        loop = asyncio.get_running_loop()
+        if len(self._pending) >= self.max_pending:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = loop.create_task(self._flush_logged())
+        elif self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            await self.store.update_access_many(
+                [
+                    (user_id, entry_id, count, accessed_at_us)
+                    for (user_id, entry_id), (count, accessed_at_us) in pending.items()
+                ]
+            )
+        except Exception:
+            # Fold the batch back into whatever arrived meanwhile, up to
+            # max_pending entries so a failing store cannot grow the buffer.
+            dropped = 0
+            for key, (count, accessed_at_us) in pending.items():
+                access = self._pending.get(key)
+                if access is None:
+                    if len(self._pending) >= self.max_pending:
+                        dropped += 1
+                        continue
+                    access = self._pending[key] = [0, accessed_at_us]
+                access[0] += count
+                access[1] = max(access[1], accessed_at_us)
+            if dropped:
+                logger.warning("dropped access counts for %d entries after a failed flush", dropped)
+            raise
+        return len(pending)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._flush_task is not None:
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        # Exits once nothing is pending; the next record() starts it again.
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_logged()
+
+    async def _flush_logged(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("flushing access counts for %d entries failed", len(self._pending))
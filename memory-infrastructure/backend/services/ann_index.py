@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+
+@dataclass
+class AnnConfig:
+    """Tuning knobs for the per-collection IVF index.
+
+    Collections with fewer than ``min_size`` live rows are searched exactly.
+    ``nlist`` defaults to roughly ``sqrt(n)`` clusters; ``nprobe`` is the number
+    of clusters scanned per query and is the main recall/speed trade-off.
+    """
+
+    min_size: int = 10_000
+    nlist: int | None = None
+    nprobe: int = 16
+    train_sample_per_list: int = 64
+    train_iterations: int = 10
+    seed: int = 0
+
+
+def kmeans(
+    data: np.ndarray,
+    k: int,
+    iterations: int = 10,
+    seed: int = 0,
+    spherical: bool = True,
+) -> np.ndarray:
+    """Lloyd's k-means; spherical mode keeps centroids unit-length for cosine data."""
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _assign(data, centroids, spherical)
+        onehot = np.zeros((len(data), k), dtype=np.float32)
+        onehot[np.arange(len(data)), assignment] = 1.0
+        counts = onehot.sum(axis=0)
+        sums = onehot.T @ data
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters from random points.
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+            counts[empty] = 1.0
+        if spherical:
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+        else:
+            centroids = sums / counts[:, None]
+    return centroids.astype(np.float32)
+
+
+def _assign(data: np.ndarray, centroids: np.ndarray, spherical: bool) -> np.ndarray:
+    scores = data @ centroids.T
+    if not spherical:
+        scores -= 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    return np.argmax(scores, axis=1)
+
+
+class IVFIndex:
+    """Inverted-file index over the rows of one ``VectorCollection``.
+
+    Rows are assigned to their nearest centroid on ``add`` and removed from
+    their list on ``remove``; queries scan the ``nprobe`` closest lists.
+    """
+
+    def __init__(self, centroids: np.ndarray, nprobe: int) -> None:
+        self.centroids = centroids
+        self.nprobe = nprobe
+        self.trained_rows = 0
+        self._lists: list[list[int]] = [[] for _ in range(len(centroids))]
+        self._arrays: list[np.ndarray | None] = [None] * len(centroids)
+        self._assignment: dict[int, int] = {}
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, rows: np.ndarray, config: AnnConfig) -> "IVFIndex":
+        nlist = config.nlist or int(min(4096, max(16, math.sqrt(rows.size))))
+        rng = np.random.default_rng(config.seed)
+        sample_size = min(rows.size, nlist * config.train_sample_per_list)
+        sample = rng.choice(rows, size=sample_size, replace=False) if sample_size < rows.size else rows
+        centroids = kmeans(vectors[np.sort(sample)], nlist, config.train_iterations, config.seed)
+        index = cls(centroids, config.nprobe)
+        index.add_many(rows, vectors[rows])
+        index.trained_rows = int(rows.size)
+        return index
+
+    @classmethod
+    def from_state(cls, state: dict[str, np.ndarray]) -> "IVFIndex":
+        """Rebuild an index saved with ``state`` without re-running k-means."""
+        index = cls(state["ivf_centroids"], int(state["ivf_nprobe"]))
+        for row, cluster in zip(state["ivf_rows"].tolist(), state["ivf_clusters"].tolist()):
+            index._assignment[row] = cluster
+            index._lists[cluster].append(row)
+        index.trained_rows = int(state["ivf_trained_rows"])
+        return index
+
+    def state(self) -> dict[str, np.ndarray]:
+        """Centroids and row assignments as arrays, for ``np.savez``."""
+        return {
+            "ivf_centroids": self.centroids,
+            "ivf_nprobe": np.array(self.nprobe),
+            "ivf_trained_rows": np.array(self.trained_rows),
+            "ivf_rows": np.fromiter(self._assignment.keys(), dtype=np.int64, count=len(self._assignment)),
+            "ivf_clusters": np.fromiter(self._assignment.values(), dtype=np.int64, count=len(self._assignment)),
+        }
+
+    def __len__(self) -> int:
+        return len(self._assignment)
+
+    def add(self, row: int, vector: np.ndarray) -> None:
+        self.add_many(np.array([row]), vector[None, :])
+
+    def add_many(self, rows: np.ndarray, vectors: np.ndarray, block: int = 8192) -> None:
+        for start in range(0, len(rows), block):
+            assignment = _assign(np.asarray(vectors[start : start + block]), self.centroids, True)
+            for row, cluster in zip(rows[start : start + block].tolist(), assignment.tolist()):
+                self.remove(row)
+                self._assignment[row] = cluster
+                self._lists[cluster].append(row)
+                self._arrays[cluster] = None
+
+    def remove(self, row: int) -> None:
+        cluster = self._assignment.pop(row, None)
+        if cluster is not None:
+            self._lists[cluster].remove(row)
+            self._arrays[cluster] = None
+
+    def candidates(self, query: np.ndarray, nprobe: int | None = None) -> np.ndarray:
+        nprobe = min(nprobe or self.nprobe, len(self._lists))
+        scores = self.centroids @ query
+        probe = np.argpartition(scores, -nprobe)[-nprobe:]
+        return np.concatenate([self._list_array(cluster) for cluster in probe.tolist()])
+
+    def _list_array(self, cluster: int) -> np.ndarray:
+        array = self._arrays[cluster]
+        if array is None:
+            array = self._arrays[cluster] = np.array(self._lists[cluster], dtype=np.int64)
+        return array
+
+
+def recall_at_k(exact: Sequence[Sequence[str]], approximate: Sequence[Sequence[str]]) -> float:
+    """Mean fraction of each exact top-k that the approximate top-k recovered."""
+    total = 0.0
+    counted = 0
+    for truth, found in zip(exact, approximate):
+        if not truth:
+            continue
+        total += len(set(truth) & set(found)) / len(truth)
+        counted += 1
+    return total / counted if counted else 1.0
@@ -12,6 +12,8 @@ compounding_service = MemoryCompoundingService(
     store=factory.memory_store,
     vector_store=factory.vector_store,
     voice_profile=factory.voice_profile_service,
+    events=factory.event_log,
+    access_tracker=factory.access_tracker,
 )
 
 index_service = MemoryIndexService(
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass
+class Passage:
+    index: int
+    start: int
+    end: int
+    text: str
+
+
+def split_passages(text: str, max_chars: int = 1200, overlap: int = 200) -> list[Passage]:
+    """Split ``text`` into overlapping passages of at most ``max_chars``.
+
+    Passages end on a paragraph, sentence or word boundary when one falls in
+    their second half, and each passage after the first starts ``overlap``
+    characters before the previous one ended (snapped forward to a word
+    start). Text that fits in one passage comes back as a single passage.
+    """
+    if overlap >= max_chars:
+        raise ValueError("overlap must be smaller than max_chars")
+    passages: list[Passage] = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + max_chars, length)
+        if end < length:
+            end = _break_before(text, start + max_chars // 2, end)
+        passages.append(Passage(len(passages), start, end, text[start:end]))
+        if end >= length:
+            break
+        start = _word_start(text, max(end - overlap, start + 1), end)
+    return passages
+
+
+def _break_before(text: str, low: int, high: int) -> int:
+    for separator in ("\n\n", ". ", "\n", " "):
+        cut = text.rfind(separator, low, high)
+        if cut != -1:
+            return cut + len(separator)
+    return high
+
+
+def _word_start(text: str, low: int, high: int) -> int:
+    if low == 0 or text[low - 1].isspace():
+        return low
+    space = text.find(" ", low, high)
+    return space + 1 if space != -1 else low
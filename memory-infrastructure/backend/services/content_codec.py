@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import re
+import zlib
+from collections import Counter
+from typing import Any, Iterable, Protocol
+
+# Marker for rows that were considered for compression but stored as-is
+# because encoding did not make them smaller. NULL means never considered.
+PLAIN = "plain"
+
+
+class ContentCodec(Protocol):
+    """Reversible text codec for the ``content`` column.
+
+    ``name`` is stored next to each encoded row, so it must stay stable for
+    as long as rows written with it exist.
+    """
+
+    name: str
+
+    def encode(self, text: str) -> bytes: ...
+
+    def decode(self, data: bytes) -> str: ...
+
+
+class ZlibCodec:
+    """zlib (DEFLATE) codec, optionally primed with a preset dictionary.
+
+    A dictionary mostly helps short snippets, which are too small to build
+    up useful back-references on their own.
+    """
+
+    def __init__(self, level: int = 6, zdict: bytes | None = None, name: str = "zlib") -> None:
+        self.level = level
+        self.zdict = zdict
+        self.name = name
+
+    def encode(self, text: str) -> bytes:
+        if self.zdict:
+            compressor = zlib.compressobj(self.level, zdict=self.zdict)
+        else:
+            compressor = zlib.compressobj(self.level)
+        return compressor.compress(text.encode("utf-8")) + compressor.flush()
+
+    def decode(self, data: bytes) -> str:
+        decompressor = zlib.decompressobj(zdict=self.zdict) if self.zdict else zlib.decompressobj()
+        return (decompressor.decompress(data) + decompressor.flush()).decode("utf-8")
+
+
+def dictionary_codec_name(dictionary_id: int) -> str:
+    return f"zlib:{dictionary_id}"
+
+
+def dictionary_codec_id(name: str) -> int | None:
+    """The dictionary id in a ``dictionary_codec_name``, or None for other codecs."""
+    match = re.fullmatch(r"zlib:(\d+)", name)
+    return int(match.group(1)) if match else None
+
+
+def train_dictionary(samples: Iterable[str], size: int = 32 * 1024) -> bytes:
+    """Build a zlib preset dictionary from representative texts.
+
+    zlib has no trainer, so this keeps the word n-grams that would save the
+    most bytes (frequency times length) and lays them out with the most
+    valuable last, where DEFLATE's window reaches them most cheaply.
+    """
+    counts: Counter[str] = Counter()
+    for text in samples:
+        words = re.findall(r"\S+\s*", text)
+        for n in (1, 2, 3):
+            for start in range(len(words) - n + 1):
+                counts["".join(words[start : start + n])] += 1
+    ranked = sorted(
+        ((gram, count) for gram, count in counts.items() if count > 1),
+        key=lambda item: item[1] * len(item[0]),
+        reverse=True,
+    )
+    chosen: list[str] = []
+    used = 0
+    for gram, _ in ranked:
+        encoded = len(gram.encode("utf-8"))
+        if used + encoded > size:
+            continue
+        chosen.append(gram)
+        used += encoded
+    return "".join(reversed(chosen)).encode("utf-8")
+
+
+class EncodedContent:
+    """Stored content that has not been decoded yet."""
+
+    __slots__ = ("data", "codec")
+
+    def __init__(self, data: bytes, codec: ContentCodec) -> None:
+        self.data = data
+        self.codec = codec
+
+
+class LazyContent:
+    """Dataclass field descriptor that decodes ``EncodedContent`` on first read.
+
+    Used as ``content: str = LazyContent()``. ``dataclass`` treats a
+    descriptor default per the "Descriptor-typed fields" section of the
+    dataclasses docs: the generated ``__init__`` assigns through ``__set__``,
+    and because class-level ``__get__`` raises ``AttributeError`` the field
+    has no default and stays a required argument in its declared position.
+    The value lives in ``_<name>`` on the instance.
+    """
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._attr = f"_{name}"
+
+    def __get__(self, obj: Any, objtype: type | None = None) -> str:
+        if obj is None:
+            # Class-level access: no default value for the dataclass field.
+            raise AttributeError(self._attr)
+        value = getattr(obj, self._attr)
+        if isinstance(value, EncodedContent):
+            value = value.codec.decode(value.data)
+            setattr(obj, self._attr, value)
+        return value
+
+    def __set__(self, obj: Any, value: str | EncodedContent) -> None:
+        setattr(obj, self._attr, value)
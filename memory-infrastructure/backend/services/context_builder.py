@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import time
 from datetime import datetime, timedelta
 
 from models import ContextRequest, ContextSource, RetrievedContext, VoiceContext
 from .memory_store import MemoryStore
-from .vector_store import LocalVectorStore
-from .embedding import LocalVoyageClient
+from .payload_index import PayloadFilter
+from .vector_store import LocalVectorStore, SearchResult
+from .embedding import EmbeddingClient
 from .voice_profile_service import VoiceProfileService
-from .utils import estimate_token_count, recency_score, now_utc
+from .utils import estimate_token_count, recency_score, now_utc, to_epoch_us
+
+logger = logging.getLogger(__name__)
+
+# ContextSource.excerpt max_length.
+EXCERPT_CHARS = 500
 
 
 class ContextBuilder:
@@ -16,40 +24,49 @@ class ContextBuilder:
         self,
         store: MemoryStore,
         vector_store: LocalVectorStore,
-        embedding_client: LocalVoyageClient,
+        embedding_client: EmbeddingClient,
         voice_profile: VoiceProfileService,
+        embed_timeout: float | None = 2.0,
+        rrf_k: int = 60,
     ) -> None:
         self.store = store
         self.vector_store = vector_store
         self.embedding_client = embedding_client
         self.voice_profile = voice_profile
+        self.embed_timeout = embed_timeout
+        self.rrf_k = rrf_k
 
     async def retrieve_context(self, user_id: str, request: ContextRequest) -> RetrievedContext:
         start = time.time()
-        query_vec = await self.embedding_client.embed_query(request.query)
-        results = await self.vector_store.search(
-            user_id=user_id,
-            query_vector=query_vec,
-            limit=max(20, request.max_sources * 3),
-            threshold=request.min_relevance,
+        now = now_utc()
+        now_us = to_epoch_us(now)
+        limit = max(20, request.max_sources * 3)
+        payload_filter = PayloadFilter(
+            content_types=request.content_types,
+            tags=request.tags,
+            created_after=now - timedelta(days=request.recency_days) if request.recency_days else None,
         )
+        if request.retrieval_mode == "vector":
+            scores, passages = await self._vector_candidates(user_id, request, limit, payload_filter)
+        else:
+            scores, passages = await self._fused_candidates(user_id, request, limit, payload_filter)
 
-        sources_considered = len(results)
+        sources_considered = len(scores)
         sources: list[ContextSource] = []
         ranked = []
-        now = now_utc()
-        for result in results:
-            entry = await self.store.get(user_id, result.doc_id)
+        entries = await self.store.get_many(user_id, scores)
+        for doc_id, score in scores.items():
+            entry = entries.get(doc_id)
             if not entry:
                 continue
-            if request.content_types and entry.content_type not in request.content_types:
-                continue
-            if request.recency_days:
-                if entry.indexed_at < now - timedelta(days=request.recency_days):
-                    continue
-            recency = recency_score(entry.indexed_at, now=now)
-            combined = 0.7 * result.score + 0.3 * recency
-            ranked.append((combined, result, entry))
+            passage = passages.get(doc_id)
+            if passage is not None:
+                excerpt = passage_excerpt(entry.content, passage.payload["start"], passage.payload["end"])
+            else:
+                excerpt = entry.content_preview
+            recency = recency_score(entry.indexed_at_us, now=now_us)
+            combined = 0.7 * score + 0.3 * recency
+            ranked.append((combined, entry, excerpt))
 
         ranked.sort(key=lambda x: x[0], reverse=True)
         total_tokens = 0
@@ -60,7 +77,7 @@ class ContextBuilder:
                 token_cost = estimate_token_count(excerpt)
                 if total_tokens + token_cost > request.max_tokens:
                     continue
-                recency = recency_score(entry.indexed_at, now=now)
+                recency = recency_score(entry.indexed_at_us, now=now_us)
                 sources.append(
                     ContextSource(
                         entry_id=entry.id,
@@ -89,8 +106,7 @@ class ContextBuilder:
                 sources_considered=sources_considered,
                 sources_included=len(sources),
             )
-        for combined_score, result, entry in ranked:
-            excerpt = entry.content_preview
+        for combined_score, entry, excerpt in ranked:
             token_cost = estimate_token_count(excerpt)
             if total_tokens + token_cost > request.max_tokens:
                 continue
@@ -127,6 +143,73 @@ class ContextBuilder:
             sources_included=len(sources),
         )
 
+    async def _vector_candidates(
+        self, user_id: str, request: ContextRequest, limit: int, payload_filter: PayloadFilter
+    ) -> tuple[dict[str, float], dict[str, SearchResult]]:
+        """Cosine score per entry (best of entry and passage vectors) and each entry's best passage."""
+        query_vec = await self.embedding_client.embed_query(request.query)
+        results, passages = await asyncio.gather(
+            self.vector_store.search(
+                user_id=user_id,
+                query_vector=query_vec,
+                limit=limit,
+                threshold=request.min_relevance,
+                payload_filter=payload_filter,
+            ),
+            self._best_passages(user_id, query_vec, limit, request.min_relevance, payload_filter),
+        )
+        scores = {result.doc_id: result.score for result in results}
+        for parent_id, passage in passages.items():
+            if passage.score > scores.get(parent_id, -1.0):
+                scores[parent_id] = passage.score
+        return scores, passages
+
+    async def _fused_candidates(
+        self, user_id: str, request: ContextRequest, limit: int, payload_filter: PayloadFilter
+    ) -> tuple[dict[str, float], dict[str, SearchResult]]:
+        """Lexical and (in hybrid mode) vector candidates, fused by reciprocal rank.
+
+        Both run concurrently. The vector side is bounded by ``embed_timeout``
+        and may fail outright; retrieval then continues on lexical results alone.
+        """
+        lexical_search = self.store.search_text(user_id, request.query, limit, payload_filter)
+        if request.retrieval_mode == "lexical":
+            lexical = await lexical_search
+            return reciprocal_rank_fusion([[doc_id for doc_id, _ in lexical]], self.rrf_k), {}
+
+        vector, lexical = await asyncio.gather(
+            asyncio.wait_for(self._vector_candidates(user_id, request, limit, payload_filter), self.embed_timeout),
+            lexical_search,
+            return_exceptions=True,
+        )
+        if isinstance(lexical, BaseException):
+            raise lexical
+        rankings = [[doc_id for doc_id, _ in lexical]]
+        passages: dict[str, SearchResult] = {}
+        if isinstance(vector, BaseException):
+            logger.warning("vector retrieval failed for %s; using lexical results only", user_id, exc_info=vector)
+        else:
+            vector_scores, passages = vector
+            rankings.append(sorted(vector_scores, key=vector_scores.__getitem__, reverse=True))
+        return reciprocal_rank_fusion(rankings, self.rrf_k), passages
+
+    async def _best_passages(
+        self,
+        user_id: str,
+        query_vec: list[float],
+        limit: int,
+        threshold: float,
+        payload_filter: PayloadFilter,
+    ) -> dict[str, SearchResult]:
+        """Best-scoring passage of each entry that has passage vectors."""
+        passages = self.vector_store.passages
+        if passages is None:
+            return {}
+        best: dict[str, SearchResult] = {}
+        for result in await passages.search(user_id, query_vec, limit * 2, threshold, payload_filter=payload_filter):
+            best.setdefault(result.payload["parent_id"], result)
+        return best
+
     async def build_voice_context(self, user_id: str) -> VoiceContext | None:
         profile = await self.voice_profile.get_profile(user_id)
         if not profile:
@@ -160,3 +243,21 @@ class ContextBuilder:
         return "\n\n".join(
             f"### {source.title}\n{source.excerpt}" for source in sources
         )
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> dict[str, float]:
+    """Fuse ranked id lists with RRF, scaled so an id ranked first in every list scores 1.0."""
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    best = len(rankings) / (k + 1)
+    return {doc_id: score / best for doc_id, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)}
+
+
+def passage_excerpt(content: str, start: int, end: int, limit: int = EXCERPT_CHARS) -> str:
+    """``content[start:end]``, or the ``limit`` characters at its centre when the passage is longer."""
+    if end - start > limit:
+        start = (start + end - limit) // 2
+        end = start + limit
+    return content[start:end]
@@ -1,24 +1,53 @@
 from __future__ import annotations
 
-import random
-from typing import Dict
+import hashlib
+from typing import Protocol
+
+import numpy as np
+
+
+class EmbeddingClient(Protocol):
+    """Voyage-style embedding interface shared by the local and production clients."""
+
+    async def embed(self, text: str) -> list[float]: ...
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]: ...
+
+    async def embed_query(self, text: str) -> list[float]: ...
 
 
 class LocalVoyageClient:
-    """Deterministic local embedding generator for offline usage."""
+    """Deterministic local embedding generator for offline usage.
+
+    Each text seeds its own NumPy generator from a SHA-256 digest of the
+    content, so vectors are identical across threads, processes and restarts
+    (unlike ``hash()``, which is salted per process).
+    """
+
+    model = "local-sha256-v1"
 
     def __init__(self, dimension: int = 512) -> None:
         self.dimension = dimension
-        self._cache: Dict[str, list[float]] = {}
 
     async def embed(self, text: str) -> list[float]:
-        if text not in self._cache:
-            random.seed(hash(text))
-            self._cache[text] = [random.gauss(0, 1) for _ in range(self.dimension)]
-        return self._cache[text]
+        return self.embed_array([text])[0].tolist()
 
     async def embed_batch(self, texts: list[str]) -> list[list[float]]:
-        return [await self.embed(text) for text in texts]
+        return self.embed_array(texts).tolist()
 
     async def embed_query(self, text: str) -> list[float]:
         return await self.embed(text)
+
+    async def embed_query_batch(self, texts: list[str]) -> list[list[float]]:
+        return await self.embed_batch(texts)
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """Embed ``texts`` into one ``(len(texts), dimension)`` float32 array."""
+        out = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            np.random.default_rng(self._seed(text)).standard_normal(dtype=np.float32, out=out[row])
+        return out
+
+    @staticmethod
+    def _seed(text: str) -> int:
+        return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:16], "little")
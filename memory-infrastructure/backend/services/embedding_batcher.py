@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from .embedding import EmbeddingClient
+
+
+@dataclass
+class _Pending:
+    text: str
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embed calls into ``embed_batch`` calls.
+
+    Calls to ``embed`` / ``embed_query`` wait in a per-input-type queue for at
+    most ``window_ms`` or until ``max_batch_size`` texts are queued, then go
+    out as one batch request and each caller's future is resolved with its own
+    vector. A caller that is cancelled while queued is dropped from the batch.
+    Query batches use the client's ``embed_query_batch`` when it has one and
+    fall back to concurrent ``embed_query`` calls otherwise, so any
+    Voyage-style client works.
+    """
+
+    def __init__(
+        self,
+        client: EmbeddingClient,
+        window_ms: float = 5.0,
+        max_batch_size: int = 32,
+        metrics_window: int = 1024,
+    ) -> None:
+        self.client = client
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.model = getattr(client, "model", type(client).__name__)
+        self.dimension = getattr(client, "dimension", 0)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: dict[str, list[_Pending]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._batch_sizes: deque[int] = deque(maxlen=metrics_window)
+        self._queue_waits_ms: deque[float] = deque(maxlen=metrics_window)
+        self._batches = 0
+        self._items = 0
+        self._cancelled = 0
+
+    async def embed(self, text: str) -> list[float]:
+        return await self._submit("document", text)
+
+    async def embed_query(self, text: str) -> list[float]:
+        return await self._submit("query", text)
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        # Already a batch: no point holding it back for the window.
+        return await self.client.embed_batch(texts)
+
+    def stats(self) -> dict[str, float]:
+        sizes = sorted(self._batch_sizes)
+        waits = sorted(self._queue_waits_ms)
+        return {
+            "batches": self._batches,
+            "items": self._items,
+            "cancelled": self._cancelled,
+            "mean_batch_size": sum(sizes) / len(sizes) if sizes else 0.0,
+            "max_batch_size": sizes[-1] if sizes else 0,
+            "mean_queue_wait_ms": sum(waits) / len(waits) if waits else 0.0,
+            "p99_queue_wait_ms": waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0.0,
+        }
+
+    async def _submit(self, input_type: str, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures and timers belong to one loop; start fresh on a new one.
+            self._loop = loop
+            self._pending = {}
+            self._timers = {}
+        future = loop.create_future()
+        pending = self._pending.setdefault(input_type, [])
+        pending.append(_Pending(text, future, time.perf_counter()))
+        if len(pending) >= self.max_batch_size:
+            self._flush(input_type)
+        elif input_type not in self._timers:
+            self._timers[input_type] = loop.call_later(self.window_ms / 1000, self._flush, input_type)
+        return await future
+
+    def _flush(self, input_type: str) -> None:
+        timer = self._timers.pop(input_type, None)
+        if timer is not None:
+            timer.cancel()
+        queued = self._pending.pop(input_type, [])
+        live = [item for item in queued if not item.future.done()]
+        self._cancelled += len(queued) - len(live)
+        for start in range(0, len(live), self.max_batch_size):
+            task = self._loop.create_task(self._dispatch(input_type, live[start : start + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, input_type: str, batch: list[_Pending]) -> None:
+        now = time.perf_counter()
+        self._batches += 1
+        self._items += len(batch)
+        self._batch_sizes.append(len(batch))
+        self._queue_waits_ms.extend((now - item.enqueued_at) * 1000 for item in batch)
+        texts = list(dict.fromkeys(item.text for item in batch))
+        try:
+            if input_type == "document":
+                vectors = await self.client.embed_batch(texts)
+            elif hasattr(self.client, "embed_query_batch"):
+                vectors = await self.client.embed_query_batch(texts)
+            else:
+                vectors = await asyncio.gather(*(self.client.embed_query(text) for text in texts))
+        except Exception as exc:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+            return
+        by_text = dict(zip(texts, vectors))
+        for item in batch:
+            if not item.future.done():
+                item.future.set_result(by_text[item.text])
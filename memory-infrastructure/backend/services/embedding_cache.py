@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import anyio
+import numpy as np
+
+from .embedding import EmbeddingClient
+
+# Rough per-entry bookkeeping cost of the OrderedDict node, key bytes object
+# and ndarray header, on top of the vector payload itself.
+ENTRY_OVERHEAD_BYTES = 200
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    disk_hits: int = 0
+    disk_misses: int = 0
+
+
+class SQLiteEmbeddingCache:
+    """Persistent embedding cache shared by every worker process on a node.
+
+    Rows are keyed by (model, dimension, input type, SHA-256 of the text) and
+    hold the vector as float32 bytes. The database runs in WAL mode so many
+    processes can read while one writes. ``last_used_at`` is refreshed at
+    most once per ``touch_interval`` seconds, and least-recently-used rows are
+    pruned once the stored vectors exceed ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        max_bytes: int = 1024 * 1024 * 1024,
+        touch_interval: float = 3600.0,
+        prune_every: int = 1000,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes_since_prune = 0
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                input_type TEXT NOT NULL,
+                digest BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (model, dimension, input_type, digest)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used_at)")
+        conn.commit()
+
+    async def get_many(
+        self, model: str, dimension: int, input_type: str, digests: list[bytes]
+    ) -> dict[bytes, np.ndarray]:
+        return await anyio.to_thread.run_sync(self._get_many_sync, model, dimension, input_type, digests)
+
+    def _get_many_sync(
+        self, model: str, dimension: int, input_type: str, digests: list[bytes]
+    ) -> dict[bytes, np.ndarray]:
+        if not digests:
+            return {}
+        conn = self._connect()
+        placeholders = ",".join("?" for _ in digests)
+        rows = conn.execute(
+            f"SELECT digest, vector, last_used_at FROM embeddings "
+            f"WHERE model = ? AND dimension = ? AND input_type = ? AND digest IN ({placeholders})",
+            (model, dimension, input_type, *digests),
+        ).fetchall()
+        now = time.time()
+        stale = [digest for digest, _, last_used in rows if now - last_used > self.touch_interval]
+        if stale:
+            conn.executemany(
+                "UPDATE embeddings SET last_used_at = ? WHERE model = ? AND dimension = ? AND input_type = ? AND digest = ?",
+                [(now, model, dimension, input_type, digest) for digest in stale],
+            )
+            conn.commit()
+        return {digest: np.frombuffer(vector, dtype=np.float32) for digest, vector, _ in rows}
+
+    async def put_many(
+        self, model: str, dimension: int, input_type: str, items: list[tuple[bytes, np.ndarray]]
+    ) -> None:
+        await anyio.to_thread.run_sync(self._put_many_sync, model, dimension, input_type, items)
+
+    def _put_many_sync(
+        self, model: str, dimension: int, input_type: str, items: list[tuple[bytes, np.ndarray]]
+    ) -> None:
+        if not items:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, dimension, input_type, digest, vector, last_used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (model, dimension, input_type, digest, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                for digest, vector in items
+            ],
+        )
+        conn.commit()
+        self._writes_since_prune += len(items)
+        if self._writes_since_prune >= self.prune_every:
+            self._writes_since_prune = 0
+            self._prune_sync()
+
+    async def prune(self) -> int:
+        return await anyio.to_thread.run_sync(self._prune_sync)
+
+    def _prune_sync(self) -> int:
+        """Delete least-recently-used rows until the stored vectors fit in ``max_bytes``."""
+        conn = self._connect()
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        removed = 0
+        while total > self.max_bytes:
+            batch = conn.execute(
+                "SELECT model, dimension, input_type, digest, LENGTH(vector) FROM embeddings "
+                "ORDER BY last_used_at LIMIT 500"
+            ).fetchall()
+            if not batch:
+                break
+            victims = []
+            for model, dimension, input_type, digest, size in batch:
+                if total <= self.max_bytes:
+                    break
+                victims.append((model, dimension, input_type, digest))
+                total -= size
+            conn.executemany(
+                "DELETE FROM embeddings WHERE model = ? AND dimension = ? AND input_type = ? AND digest = ?",
+                victims,
+            )
+            conn.commit()
+            removed += len(victims)
+        return removed
+
+
+class CachedEmbeddingClient:
+    """Byte-bounded LRU in front of any Voyage-style embedding client.
+
+    Keys are SHA-256 digests of the input (plus whether it was embedded as a
+    document or a query), so a 100 KB text costs 32 bytes of key. Vectors are
+    held as float32 arrays and evicted least-recently-used once ``max_bytes``
+    is exceeded. With a ``disk`` cache, in-memory misses are looked up there
+    before the wrapped client is called, and new vectors are written back.
+    """
+
+    def __init__(
+        self,
+        client: EmbeddingClient,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk: SQLiteEmbeddingCache | None = None,
+    ) -> None:
+        self.client = client
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.model = getattr(client, "model", type(client).__name__)
+        self.dimension = getattr(client, "dimension", 0)
+        self._entries: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._stats = CacheStats()
+
+    async def embed(self, text: str) -> list[float]:
+        return (await self._embed_texts("document", [text]))[0]
+
+    async def embed_query(self, text: str) -> list[float]:
+        return (await self._embed_texts("query", [text]))[0]
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        return await self._embed_texts("document", texts)
+
+    async def _embed_texts(self, input_type: str, texts: list[str]) -> list[list[float]]:
+        digests = [hashlib.sha256(text.encode("utf-8")).digest() for text in texts]
+        keys = [input_type[0].encode() + digest for digest in digests]
+        vectors: list[list[float] | None] = [self._lookup(key) for key in keys]
+        missing = [index for index, vector in enumerate(vectors) if vector is None]
+        if missing and self.disk is not None:
+            found = await self.disk.get_many(
+                self.model, self.dimension, input_type, list({digests[index] for index in missing})
+            )
+            self._stats.disk_hits += sum(1 for index in missing if digests[index] in found)
+            self._stats.disk_misses += sum(1 for index in missing if digests[index] not in found)
+            for index in missing:
+                if digests[index] in found:
+                    vectors[index] = found[digests[index]].tolist()
+                    self._store(keys[index], vectors[index])
+            missing = [index for index in missing if vectors[index] is None]
+        if missing:
+            # Embed each distinct missing text once, even if it repeats in the batch.
+            unique = list(dict.fromkeys(texts[index] for index in missing))
+            if input_type == "query":
+                embedded = {text: await self.client.embed_query(text) for text in unique}
+            elif len(unique) == 1:
+                embedded = {unique[0]: await self.client.embed(unique[0])}
+            else:
+                embedded = dict(zip(unique, await self.client.embed_batch(unique)))
+            for index in missing:
+                vectors[index] = embedded[texts[index]]
+                self._store(keys[index], vectors[index])
+            if self.disk is not None:
+                new = {digests[index]: vectors[index] for index in missing}
+                await self.disk.put_many(self.model, self.dimension, input_type, list(new.items()))
+        return vectors
+
+    def stats(self) -> dict[str, int]:
+        self._stats.entries = len(self._entries)
+        return asdict(self._stats)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._stats.bytes = 0
+
+    def _lookup(self, key: bytes) -> list[float] | None:
+        vector = self._entries.get(key)
+        if vector is None:
+            self._stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return vector.tolist()
+
+    def _store(self, key: bytes, vector: list[float]) -> None:
+        if key in self._entries:
+            return
+        array = np.asarray(vector, dtype=np.float32)
+        size = array.nbytes + len(key) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        self._entries[key] = array
+        self._stats.bytes += size
+        while self._stats.bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._stats.bytes -= evicted.nbytes + len(evicted_key) + ENTRY_OVERHEAD_BYTES
+            self._stats.evictions += 1
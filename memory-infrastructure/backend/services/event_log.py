@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from .memory_store import MemoryStore
+from .utils import now_us, to_epoch_us, now_utc
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """Buffered writer for ``compounding_events``.
+
+    ``record`` only appends to an in-process buffer and never raises; a
+    background task writes the buffer in one transaction every
+    ``flush_interval`` seconds, and filling it to ``batch_size`` starts an
+    early flush (one at a time). Events still buffered when the process dies
+    are lost, so ``close`` must run at shutdown. The buffer holds at most
+    ``max_buffer`` events: when a failing store lets it grow past that, the
+    oldest events are dropped with a warning and counted in ``dropped``. Raw
+    events older than ``retention_days`` are removed by ``prune``; the daily
+    rollups the stats endpoints read are kept.
+    """
+
+    def __init__(
+        self,
+        store: MemoryStore,
+        flush_interval: float = 1.0,
+        batch_size: int = 256,
+        retention_days: int = 90,
+        max_buffer: int = 10_000,
+    ) -> None:
+        self.store = store
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._buffer: list[tuple[str, str, int, dict]] = []
+        self._task: asyncio.Task | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    async def record(self, user_id: str, event_type: str, details: dict) -> None:
+        self._buffer.append((user_id, event_type, now_us(), details))
+        self._trim()
+        loop = asyncio.get_running_loop()
+        if len(self._buffer) >= self.batch_size:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = loop.create_task(self._flush_logged())
+        elif self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def flush(self) -> int:
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+        try:
+            await self.store.add_compounding_events(batch)
+        except Exception:
+            # Put the batch back in front so the next flush retries it in
+            # order, keeping at most max_buffer events.
+            self._buffer[:0] = batch
+            self._trim()
+            raise
+        return len(batch)
+
+    async def prune(self) -> int:
+        return await self.store.prune_compounding_events(to_epoch_us(now_utc() - timedelta(days=self.retention_days)))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._flush_task is not None:
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    def _trim(self) -> None:
+        excess = len(self._buffer) - self.max_buffer
+        if excess > 0:
+            del self._buffer[:excess]
+            self.dropped += excess
+            logger.warning("dropped the %d oldest compounding events; buffer is full", excess)
+
+    async def _run(self) -> None:
+        # Exits once the buffer drains; the next record() starts it again.
+        while self._buffer:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_logged()
+
+    async def _flush_logged(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("flushing %d compounding events failed", len(self._buffer))
@@ -1,21 +1,58 @@
 from __future__ import annotations
 
+import logging
+import os
 from pathlib import Path
 
+from .access_tracker import AccessTracker
+from .ann_index import AnnConfig
+from .content_codec import ZlibCodec
 from .embedding import LocalVoyageClient
-from .memory_store import MemoryStore
-from .vector_store import LocalVectorStore
+from .embedding_batcher import EmbeddingBatcher
+from .embedding_cache import CachedEmbeddingClient, SQLiteEmbeddingCache
+from .event_log import EventLog
+from .segment_store import PersistentVectorStore
+from .sharded_memory_store import ShardedMemoryStore
 from .voice_profile_service import VoiceProfileService
 
+logger = logging.getLogger(__name__)
+
 
 class ServiceFactory:
     def __init__(self) -> None:
         base_dir = Path(__file__).resolve().parents[1]
-        db_path = base_dir / "memory.db"
-        self.memory_store = MemoryStore(db_path)
-        self.vector_store = LocalVectorStore()
-        self.embedding_client = LocalVoyageClient()
+        self.base_dir = base_dir
+        # Compression of new content is opt-in; stored compressed rows are
+        # readable either way.
+        codec = ZlibCodec() if os.getenv("MEMORY_COMPRESSION", "").lower() == "zlib" else None
+        self.memory_store = ShardedMemoryStore(base_dir / "shards", shard_count=8, codec=codec)
+        self.event_log = EventLog(self.memory_store)
+        self.access_tracker = AccessTracker(self.memory_store)
+        self.vector_store = PersistentVectorStore(
+            base_dir / "vectors",
+            ann=AnnConfig(),
+            passages=PersistentVectorStore(base_dir / "passages", ann=AnnConfig()),
+        )
+        self.embedding_client = CachedEmbeddingClient(
+            EmbeddingBatcher(LocalVoyageClient()),
+            disk=SQLiteEmbeddingCache(base_dir / "embeddings.db"),
+        )
         self.voice_profile_service = VoiceProfileService()
 
+    async def start(self) -> None:
+        # Deployments from before sharding kept everything in backend/memory.db.
+        imported = await self.memory_store.import_legacy_once(self.base_dir / "memory.db")
+        if imported:
+            logger.info("imported %d entries for %d users from memory.db", sum(imported.values()), len(imported))
+
+    async def aclose(self) -> None:
+        await self.access_tracker.close()
+        await self.event_log.close()
+        self.close()
+
+    def close(self) -> None:
+        self.vector_store.close()
+        self.memory_store.close()
+
 
 factory = ServiceFactory()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 import time
 from datetime import datetime, timezone
 from uuid import uuid4
@@ -10,6 +11,7 @@ from .memory_index import MemoryIndexService
 from .memory_compounding import MemoryCompoundingService
 from .utils import estimate_token_count
 
+logger = logging.getLogger(__name__)
 
 class MemoryAggregator:
     def __init__(
@@ -24,10 +26,64 @@ class MemoryAggregator:
 
     async def ingest(self, user_id: str, request: IngestRequest) -> IngestResponse:
         start = time.time()
+        record = await self._index(user_id, request)
+        await self.store.upsert(record)
+        return await self._compound(record, start)
+
+    async def ingest_bulk(self, user_id: str, entries: list[IngestRequest]) -> tuple[list[IngestResponse], list[dict]]:
+        # Index everything first, store all records in one transaction, then
+        # run compounding so new entries can link to each other.
+        successful: list[IngestResponse] = []
+        failed: list[dict] = []
+        indexed: list[tuple[int, MemoryRecord, float]] = []
+        for idx, entry in enumerate(entries):
+            start = time.time()
+            try:
+                indexed.append((idx, await self._index(user_id, entry), start))
+            except Exception as exc:
+                failed.append({"index": idx, "error": str(exc)})
+        for idx, record, start in await self._persist(indexed, failed):
+            try:
+                successful.append(await self._compound(record, start))
+            except Exception as exc:
+                failed.append({"index": idx, "error": str(exc)})
+        failed.sort(key=lambda item: item["index"])
+        return successful, failed
+
+    async def _persist(
+        self, indexed: list[tuple[int, MemoryRecord, float]], failed: list[dict]
+    ) -> list[tuple[int, MemoryRecord, float]]:
+        try:
+            await self.store.upsert_many([record for _, record, _ in indexed])
+            return indexed
+        except Exception:
+            logger.warning("bulk upsert of %d records failed; retrying one by one", len(indexed), exc_info=True)
+        persisted = []
+        for item in indexed:
+            idx, record, _ = item
+            try:
+                await self.store.upsert(record)
+            except Exception as exc:
+                failed.append({"index": idx, "error": str(exc)})
+                await self._discard_vectors(record)
+            else:
+                persisted.append(item)
+        return persisted
+
+    async def _discard_vectors(self, record: MemoryRecord) -> None:
+        # Vectors of a record that never reached the store would match searches
+        # with no row behind them.
+        try:
+            await self.indexer.delete_indexed_content(record.user_id, record.id)
+        except Exception:
+            logger.warning("could not remove vectors of unstored entry %s", record.id, exc_info=True)
+
+    async def _index(self, user_id: str, request: IngestRequest) -> MemoryRecord:
         entry_id = str(uuid4())
         metadata = {
             "type": request.content_type,
             "title": request.title,
+            "tags": request.tags,
             "created_at": datetime.now(timezone.utc).isoformat(),
         }
         if request.metadata:
@@ -38,54 +94,38 @@ class MemoryAggregator:
             content=request.content,
             metadata=metadata,
         )
-
-        preview = request.content[:500]
-        token_count = estimate_token_count(request.content)
-
-        record = MemoryRecord(
+        return MemoryRecord(
             id=index_result.doc_id,
             user_id=user_id,
             content_type=request.content_type,
             title=request.title,
-            content_preview=preview,
+            content_preview=request.content[:500],
             content=request.content,
             embedding_id=index_result.embedding_id,
-            indexed_at=index_result.indexed_at,
-            last_accessed_at=None,
+            indexed_at_us=index_result.indexed_at_us,
+            last_accessed_at_us=None,
             access_count=0,
             relevance_decay=1.0,
             source_url=request.source_url,
             source_metadata=request.metadata,
             related_entries=[],
             tags=request.tags,
-            token_count=token_count,
+            token_count=estimate_token_count(request.content),
         )
-        await self.store.upsert(record)
 
-        compounding_result = await self.compounding.on_content_added(
-            user_id=user_id,
+    async def _compound(self, record: MemoryRecord, start: float) -> IngestResponse:
+        await self.compounding.on_content_added(
+            user_id=record.user_id,
             entry_id=record.id,
-            content=request.content,
-            content_type=request.content_type,
+            content=record.content,
+            content_type=record.content_type,
         )
-
         processing_time_ms = int((time.time() - start) * 1000)
         return IngestResponse(
             entry_id=record.id,
             indexed=True,
             embedding_id=record.embedding_id,
-            token_count=token_count,
+            token_count=record.token_count,
             related_entries=self.compounding.related_entries_cache.get(record.id, []),
             processing_time_ms=processing_time_ms,
         )
-
-    async def ingest_bulk(self, user_id: str, entries: list[IngestRequest]) -> tuple[list[IngestResponse], list[dict]]:
-        successful: list[IngestResponse] = []
-        failed: list[dict] = []
-        for idx, entry in enumerate(entries):
-            try:
-                response = await self.ingest(user_id, entry)
-                successful.append(response)
-            except Exception as exc:
-                failed.append({"index": idx, "error": str(exc)})
-        return successful, failed
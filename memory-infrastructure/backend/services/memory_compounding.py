@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 import time
-from datetime import datetime, timedelta
+from dataclasses import replace
+from datetime import timedelta
 
 from models import CompoundingEvent, CompoundingResult
+from .access_tracker import AccessTracker
+from .event_log import EventLog
 from .memory_store import MemoryStore
 from .vector_store import LocalVectorStore
 from .voice_profile_service import VoiceProfileService
-from .utils import now_utc
+from .utils import from_epoch_us, now_utc, to_epoch_us
 
 
 class MemoryCompoundingService:
@@ -16,10 +19,16 @@ class MemoryCompoundingService:
         store: MemoryStore,
         vector_store: LocalVectorStore,
         voice_profile: VoiceProfileService,
+        search_block_size: int = 256,
+        events: EventLog | None = None,
+        access_tracker: AccessTracker | None = None,
     ) -> None:
         self.store = store
+        self.events = events or EventLog(store)
+        self.access_tracker = access_tracker or AccessTracker(store)
         self.vector_store = vector_store
         self.voice_profile = voice_profile
+        self.search_block_size = search_block_size
         self.related_entries_cache: dict[str, list[str]] = {}
 
     async def on_content_added(
@@ -42,7 +51,7 @@ class MemoryCompoundingService:
                 confidence_delta = profile_after.confidence - profile_before.confidence
             elif profile_after:
                 confidence_delta = profile_after.confidence
-        await self.store.add_compounding_event(
+        await self.events.record(
             user_id,
             "content_added",
             {"entry_id": entry_id, "new_connections": new_connections},
@@ -62,8 +71,8 @@ class MemoryCompoundingService:
         entry_id: str,
         access_context: str | None = None,
     ) -> None:
-        await self.store.update_access(user_id, entry_id)
-        await self.store.add_compounding_event(
+        self.access_tracker.record(user_id, entry_id)
+        await self.events.record(
             user_id,
             "content_accessed",
             {"entry_id": entry_id, "context": access_context},
@@ -75,17 +84,19 @@ class MemoryCompoundingService:
         decay_after_days: int = 30,
         decay_rate: float = 0.95,
     ) -> int:
-        records = await self.store.list_all(user_id)
-        threshold = now_utc() - timedelta(days=decay_after_days)
+        threshold = to_epoch_us(now_utc() - timedelta(days=decay_after_days))
         decayed = 0
-        for record in records:
-            last_accessed = record.last_accessed_at or record.indexed_at
-            if last_accessed < threshold:
-                new_decay = max(0.1, record.relevance_decay * decay_rate)
-                await self.store.update_decay(user_id, record.id, new_decay)
-                decayed += 1
+        async for page in self.store.iter_summaries(user_id):
+            decays = {
+                record.id: max(0.1, record.relevance_decay * decay_rate)
+                for record in page
+                if (record.last_accessed_at_us or record.indexed_at_us) < threshold
+            }
+            if decays:
+                await self.store.update_decay_many(user_id, decays)
+                decayed += len(decays)
         if decayed:
-            await self.store.add_compounding_event(
+            await self.events.record(
                 user_id,
                 "decay",
                 {"decayed": decayed, "decay_rate": decay_rate},
@@ -93,16 +104,26 @@ class MemoryCompoundingService:
         return decayed
 
     async def find_new_connections(self, user_id: str, similarity_threshold: float = 0.8) -> int:
-        records = await self.store.list_all(user_id)
         new_links = 0
-        for record in records:
-            before = set(record.related_entries)
-            after = set(await self._find_related(user_id, record.id, similarity_threshold))
-            if after - before:
-                await self.store.update_related_entries(user_id, record.id, list(after))
-                new_links += len(after - before)
+        async for page in self.store.iter_summaries(user_id):
+            neighbours = await self.vector_store.search_stored(
+                user_id=user_id,
+                doc_ids=[record.id for record in page],
+                limit=10,
+                threshold=similarity_threshold,
+                block_size=self.search_block_size,
+            )
+            updates: dict[str, list[tuple[str, float]]] = {}
+            for record, results in zip(page, neighbours):
+                before = set(record.related_entries)
+                after = {r.doc_id: r.score for r in results if r.doc_id != record.id}
+                if after.keys() - before:
+                    updates[record.id] = list(after.items())
+                    new_links += len(after.keys() - before)
+            if updates:
+                await self.store.replace_edges(user_id, updates)
         if new_links:
-            await self.store.add_compounding_event(
+            await self.events.record(
                 user_id,
                 "recluster",
                 {"new_links": new_links},
@@ -115,39 +136,51 @@ class MemoryCompoundingService:
         similarity_threshold: float = 0.95,
     ) -> list[tuple[str, str]]:
         merged: list[tuple[str, str]] = []
-        records = {r.id: r for r in await self.store.list_all(user_id)}
-        vectors = {doc_id: vec for doc_id, vec, _ in await self.vector_store.get_all(user_id)}
+        # Entries merged away stay in both stores until the end, so every page
+        # searches the same vectors; ``seen`` skips them once merged.
         seen: set[str] = set()
-        for entry_id, record in records.items():
-            if entry_id in seen:
-                continue
-            query_vec = vectors.get(entry_id)
-            if not query_vec:
-                continue
-            results = await self.vector_store.search(
+        async for page in self.store.iter_summaries(user_id):
+            entry_ids = [summary.id for summary in page]
+            neighbours = await self.vector_store.search_stored(
                 user_id=user_id,
-                query_vector=query_vec,
+                doc_ids=entry_ids,
                 limit=10,
                 threshold=similarity_threshold,
+                block_size=self.search_block_size,
             )
-            for result in results:
-                if result.doc_id == entry_id or result.doc_id in seen:
-                    continue
-                newer = record
-                older = records.get(result.doc_id)
-                if not older:
+            pairs = {
+                entry_id: [r.doc_id for r in results if r.doc_id != entry_id]
+                for entry_id, results in zip(entry_ids, neighbours)
+            }
+            # Full records (with content) are only read for entries that have a near-duplicate.
+            candidates = {entry_id for entry_id, others in pairs.items() if others}
+            candidates.update(other for others in pairs.values() for other in others)
+            records = await self.store.get_many(user_id, candidates) if candidates else {}
+            for entry_id in entry_ids:
+                if entry_id in seen:
                     continue
-                if older.indexed_at > record.indexed_at:
-                    newer, older = older, record
-                merged_tags = list(dict.fromkeys(newer.tags + older.tags))
-                await self.store.update_content_fields(user_id, newer.id, newer.title, newer.content_preview, merged_tags)
-                await self.store.delete(user_id, older.id)
-                await self.vector_store.delete(user_id, older.id)
-                merged.append((newer.id, older.id))
-                seen.add(older.id)
-            seen.add(entry_id)
+                for other_id in pairs[entry_id]:
+                    record = records.get(entry_id)
+                    older = records.get(other_id)
+                    if other_id in seen or not record or not older:
+                        continue
+                    newer = record
+                    if older.indexed_at_us > record.indexed_at_us:
+                        newer, older = older, record
+                    merged_tags = list(dict.fromkeys(newer.tags + older.tags))
+                    await self.store.update_content_fields(
+                        user_id, newer.id, newer.title, newer.content_preview, merged_tags
+                    )
+                    records[newer.id] = replace(newer, tags=merged_tags)
+                    merged.append((newer.id, older.id))
+                    seen.add(older.id)
+                seen.add(entry_id)
         if merged:
-            await self.store.add_compounding_event(
+            removed = [older_id for _, older_id in merged]
+            await self.store.delete_many(user_id, removed)
+            for older_id in removed:
+                await self.vector_store.delete(user_id, older_id)
+            await self.events.record(
                 user_id,
                 "merge_duplicates",
                 {"merged": merged},
@@ -155,12 +188,13 @@ class MemoryCompoundingService:
         return merged
 
     async def get_compounding_history(self, user_id: str, limit: int = 100) -> list[CompoundingEvent]:
+        await self.events.flush()
         rows = await self.store.get_compounding_events(user_id, limit)
         return [
             CompoundingEvent(
                 user_id=row["user_id"],
                 event_type=row["event_type"],
-                timestamp=datetime.fromisoformat(row["timestamp"]),
+                timestamp=from_epoch_us(row["timestamp_us"]),
                 details=row["details"],
             )
             for row in rows
@@ -168,15 +202,12 @@ class MemoryCompoundingService:
 
     async def _update_related_entries(self, user_id: str, entry_id: str) -> int:
         related = await self._find_related(user_id, entry_id, 0.8)
-        await self.store.update_related_entries(user_id, entry_id, related)
-        for other_id in related:
-            other = await self.store.get(user_id, other_id)
-            if other and entry_id not in other.related_entries:
-                await self.store.update_related_entries(user_id, other_id, other.related_entries + [entry_id])
-        self.related_entries_cache[entry_id] = related
+        await self.store.replace_edges(user_id, {entry_id: related})
+        await self.store.add_edges(user_id, [(other_id, entry_id, score) for other_id, score in related])
+        self.related_entries_cache[entry_id] = [other_id for other_id, _ in related]
         return len(related)
 
-    async def _find_related(self, user_id: str, entry_id: str, threshold: float) -> list[str]:
+    async def _find_related(self, user_id: str, entry_id: str, threshold: float) -> list[tuple[str, float]]:
         query_vec = await self.vector_store.get_vector(user_id, entry_id)
         if not query_vec:
             return []
@@ -186,4 +217,4 @@ class MemoryCompoundingService:
             limit=10,
             threshold=threshold,
         )
-        return [r.doc_id for r in results if r.doc_id != entry_id]
+        return [(r.doc_id, r.score) for r in results if r.doc_id != entry_id]
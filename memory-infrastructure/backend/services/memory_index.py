@@ -1,26 +1,46 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime, timezone
 from typing import Any
 from uuid import uuid4
 
-from .embedding import LocalVoyageClient
-from .vector_store import LocalVectorStore
+import numpy as np
+
+from .chunking import split_passages
+from .embedding import EmbeddingClient
+from .memory_store import MemoryStore
+from .utils import from_epoch_us, now_us
+from .vector_store import LocalVectorStore, normalize_rows, passage_id
 
 
 @dataclass
 class IndexResult:
     doc_id: str
     embedding_id: str
-    indexed_at: datetime
+    indexed_at_us: int
     token_count: int
 
 
 class MemoryIndexService:
-    def __init__(self, vector_store: LocalVectorStore, embedding_client: LocalVoyageClient) -> None:
+    """Embeds entries into the vector store.
+
+    When the store has a passage store, content longer than ``passage_chars``
+    is split into overlapping passages that are embedded in one batch and
+    stored as their own vectors; the entry vector is then the mean of its
+    passage vectors. Shorter content keeps a single vector.
+    """
+
+    def __init__(
+        self,
+        vector_store: LocalVectorStore,
+        embedding_client: EmbeddingClient,
+        passage_chars: int = 1200,
+        passage_overlap: int = 200,
+    ) -> None:
         self.vector_store = vector_store
         self.embedding_client = embedding_client
+        self.passage_chars = passage_chars
+        self.passage_overlap = passage_overlap
 
     async def index_text_content(
         self,
@@ -29,8 +49,24 @@ class MemoryIndexService:
         content: str,
         metadata: dict[str, Any],
     ) -> IndexResult:
-        embedding = await self.embedding_client.embed(content)
         entry_id = doc_id or str(uuid4())
+        passages = self.vector_store.passages
+        chunks = split_passages(content, self.passage_chars, self.passage_overlap) if passages is not None else []
+        if len(chunks) > 1:
+            vectors = await self.embedding_client.embed_batch([chunk.text for chunk in chunks])
+            for chunk, vector in zip(chunks, vectors):
+                await passages.upsert(
+                    user_id=user_id,
+                    doc_id=passage_id(entry_id, chunk.index),
+                    vector=vector,
+                    payload={**metadata, "parent_id": entry_id, "start": chunk.start, "end": chunk.end},
+                )
+            embedding = normalize_rows(np.asarray(vectors, dtype=np.float32)).mean(axis=0).tolist()
+        else:
+            embedding = await self.embedding_client.embed(content)
+        if passages is not None:
+            # Drop passages left over from a longer previous version of the entry.
+            await passages.delete_passages(user_id, entry_id, start=len(chunks) if len(chunks) > 1 else 0)
         await self.vector_store.upsert(
             user_id=user_id,
             doc_id=entry_id,
@@ -40,9 +76,37 @@ class MemoryIndexService:
         return IndexResult(
             doc_id=entry_id,
             embedding_id=entry_id,
-            indexed_at=datetime.now(timezone.utc),
+            indexed_at_us=now_us(),
             token_count=max(1, len(content) // 4),
         )
 
     async def delete_indexed_content(self, user_id: str, doc_id: str) -> bool:
+        # The vector store deletes the entry's passages along with it.
         return await self.vector_store.delete(user_id, doc_id)
+
+    async def backfill(self, store: MemoryStore, user_id: str, page_size: int = 500) -> int:
+        """Embed the user's stored entries that have no vector; returns how many.
+
+        Entries written before the vector store was persistent, or while it was
+        unavailable, exist only in ``store``. Only those entries' content is loaded.
+        """
+        indexed = 0
+        async for page in store.iter_summaries(user_id, page_size):
+            missing = await self.vector_store.missing(user_id, [summary.id for summary in page])
+            if not missing:
+                continue
+            records = await store.get_many(user_id, missing)
+            for entry_id in missing:
+                record = records.get(entry_id)
+                if record is None:
+                    continue  # deleted since the page was read
+                metadata = {
+                    "type": record.content_type,
+                    "title": record.title,
+                    "tags": record.tags,
+                    "created_at": from_epoch_us(record.indexed_at_us).isoformat(),
+                    **(record.source_metadata or {}),
+                }
+                await self.index_text_content(user_id, entry_id, record.content, metadata)
+                indexed += 1
+        return indexed
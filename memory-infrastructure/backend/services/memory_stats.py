@@ -4,14 +4,14 @@ from datetime import timedelta
 
 from models import MemoryHealthReport, MemoryStats
 from .memory_store import MemoryStore
-from .utils import now_utc
+from .utils import from_epoch_us, now_utc, to_epoch_us
 
 
 class MemoryStatsService:
     def __init__(self, store: MemoryStore) -> None:
         self.store = store
 
-    async def get_stats(self, user_id: str, voice_confidence: float, last_compounding: str | None) -> MemoryStats:
+    async def get_stats(self, user_id: str, voice_confidence: float, last_compounding: int | None) -> MemoryStats:
         stats = await self.store.stats(user_id)
         health_score = self._health_score(stats["entries_by_type"], stats["total_entries"], stats["newest"])
         return MemoryStats(
@@ -20,27 +20,27 @@ class MemoryStatsService:
             entries_by_type=stats["entries_by_type"],
             total_tokens_indexed=stats["total_tokens"],
             memory_health_score=health_score,
-            oldest_entry=stats["oldest"],
-            newest_entry=stats["newest"],
+            oldest_entry=from_epoch_us(stats["oldest"]) if stats["oldest"] is not None else None,
+            newest_entry=from_epoch_us(stats["newest"]) if stats["newest"] is not None else None,
             voice_profile_confidence=voice_confidence,
-            last_compounding_run=last_compounding,
+            last_compounding_run=from_epoch_us(last_compounding) if last_compounding is not None else None,
         )
 
     async def get_health_report(
         self,
         user_id: str,
         voice_confidence: float,
-        last_compounding: str | None,
+        last_compounding: int | None,
     ) -> MemoryHealthReport:
         stats = await self.get_stats(user_id, voice_confidence, last_compounding)
-        records = await self.store.list_all(user_id)
         stale_entries = []
         recommendations = []
-        thirty_days_ago = now_utc() - timedelta(days=30)
-        for record in records:
-            last_accessed = record.last_accessed_at or record.indexed_at
-            if last_accessed < thirty_days_ago:
-                stale_entries.append(record.id)
+        thirty_days_ago = to_epoch_us(now_utc() - timedelta(days=30))
+        async for page in self.store.iter_summaries(user_id):
+            for record in page:
+                last_accessed = record.last_accessed_at_us or record.indexed_at_us
+                if last_accessed < thirty_days_ago:
+                    stale_entries.append(record.id)
         if len(stale_entries) > 5:
             recommendations.append("Consider pruning stale entries to keep memory fresh.")
         if stats.total_entries < 5:
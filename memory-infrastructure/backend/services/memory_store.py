@@ -1,15 +1,38 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import binascii
 import json
+import logging
+import queue
+import re
 import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, AsyncIterator, Callable, Iterable
 
 import anyio
 
-from .utils import now_utc
+from .content_codec import (
+    PLAIN,
+    ContentCodec,
+    EncodedContent,
+    LazyContent,
+    ZlibCodec,
+    dictionary_codec_id,
+    dictionary_codec_name,
+    train_dictionary,
+)
+from .payload_index import PayloadFilter
+from .utils import iso_to_epoch_us, now_us, now_utc, to_epoch_us, utc_day
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -19,10 +42,13 @@ class MemoryRecord:
     content_type: str
     title: str
     content_preview: str
-    content: str
+    # Decoded on first access when the row is stored compressed.
+    content: str = LazyContent()
     embedding_id: str
-    indexed_at: datetime
-    last_accessed_at: datetime | None
+    # Timestamps are integer microseconds since the Unix epoch (UTC); they
+    # become datetimes only where API models are built.
+    indexed_at_us: int
+    last_accessed_at_us: int | None
     access_count: int
     relevance_decay: float
     source_url: str | None
@@ -32,130 +58,762 @@ class MemoryRecord:
     token_count: int
 
 
+@dataclass
+class MemorySummary:
+    """A ``MemoryRecord`` without its content, preview or source metadata."""
+
+    id: str
+    user_id: str
+    content_type: str
+    title: str
+    indexed_at_us: int
+    last_accessed_at_us: int | None
+    access_count: int
+    relevance_decay: float
+    related_entries: list[str]
+    tags: list[str]
+    token_count: int
+
+
+# Out-edges of the selected entry as a JSON array, strongest first. Keeps
+# ``related_entries`` on records now that links live in ``memory_edges``.
+RELATED_COLUMN = (
+    "(SELECT json_group_array(dst) FROM ("
+    "SELECT dst FROM memory_edges "
+    "WHERE memory_edges.user_id = memory_entries.user_id AND memory_edges.src = memory_entries.id "
+    "ORDER BY score DESC, created_at, dst"
+    ")) AS related_entries"
+)
+
+SUMMARY_COLUMNS = (
+    "rowid, id, user_id, content_type, title, indexed_at_us, last_accessed_at_us, "
+    f"access_count, relevance_decay, {RELATED_COLUMN}, tags, token_count"
+)
+
+
+# ORDER BY expression per sort key. NULL last_accessed_at_us is folded to 0
+# so (value, id) keyset comparisons stay total; each expression has a
+# matching (user_id, expression, id) index.
+SORT_EXPRESSIONS = {
+    "indexed_at": "indexed_at_us",
+    "last_accessed_at": "COALESCE(last_accessed_at_us, 0)",
+    "relevance_decay": "relevance_decay",
+}
+
+
+SCHEMA_VERSION = 3
+
+# Rows converted per transaction by online backfills.
+MIGRATION_BATCH_SIZE = 5000
+
+# Schema version 2 replaced ISO-8601 TEXT timestamps with integer epoch
+# microseconds: table -> (row key, ((iso column, integer column), ...)).
+EPOCH_COLUMNS = {
+    "memory_entries": ("rowid", (("indexed_at", "indexed_at_us"), ("last_accessed_at", "last_accessed_at_us"))),
+    "compounding_events": ("rowid", (("timestamp", "timestamp_us"),)),
+    "compounding_event_rollups": ("user_id, day, event_type", (("last_at", "last_at_us"),)),
+}
+
+
+# Applied to every pooled connection. WAL lets readers run alongside the
+# writer; synchronous=NORMAL is durable across application crashes under WAL
+# and only risks the last commits on power loss.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-32000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+# Keep memory_fts in step with memory_entries. Deleting from a contentless
+# FTS5 table needs the originally indexed values, so they are re-derived
+# from OLD.
+FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_memory_fts_insert AFTER INSERT ON memory_entries
+    BEGIN
+        INSERT INTO memory_fts (rowid, title, content, tags)
+        VALUES (NEW.rowid, NEW.title, memory_content(NEW.content, NEW.content_codec), NEW.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_memory_fts_delete AFTER DELETE ON memory_entries
+    BEGIN
+        INSERT INTO memory_fts (memory_fts, rowid, title, content, tags)
+        VALUES ('delete', OLD.rowid, OLD.title, memory_content(OLD.content, OLD.content_codec), OLD.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_memory_fts_update AFTER UPDATE OF title, content, tags ON memory_entries
+    WHEN OLD.title IS NOT NEW.title OR OLD.content IS NOT NEW.content OR OLD.tags IS NOT NEW.tags
+    BEGIN
+        INSERT INTO memory_fts (memory_fts, rowid, title, content, tags)
+        VALUES ('delete', OLD.rowid, OLD.title, memory_content(OLD.content, OLD.content_codec), OLD.tags);
+        INSERT INTO memory_fts (rowid, title, content, tags)
+        VALUES (NEW.rowid, NEW.title, memory_content(NEW.content, NEW.content_codec), NEW.tags);
+    END
+    """,
+)
+
+# bm25() column weights for title, content and tags.
+FTS_WEIGHTS = (4.0, 1.0, 2.0)
+
+# Keep user_stats in step with memory_entries inside the writing transaction.
+# Counts and token sums are adjusted by the row's delta; when the removed row
+# held the oldest or newest timestamp, that bound is re-read through
+# idx_memory_user_type_indexed_at.
+_USER_STATS_ADD = """
+    INSERT INTO user_stats (user_id, content_type, entries, tokens, oldest_us, newest_us)
+    VALUES (NEW.user_id, NEW.content_type, 1, NEW.token_count, NEW.indexed_at_us, NEW.indexed_at_us)
+    ON CONFLICT(user_id, content_type) DO UPDATE SET
+        entries = entries + 1,
+        tokens = tokens + excluded.tokens,
+        oldest_us = MIN(oldest_us, excluded.oldest_us),
+        newest_us = MAX(newest_us, excluded.newest_us);
+"""
+_USER_STATS_REMOVE = """
+    UPDATE user_stats SET
+        entries = entries - 1,
+        tokens = tokens - OLD.token_count,
+        oldest_us = CASE WHEN oldest_us < OLD.indexed_at_us THEN oldest_us ELSE (
+            SELECT MIN(indexed_at_us) FROM memory_entries
+            WHERE user_id = OLD.user_id AND content_type = OLD.content_type
+        ) END,
+        newest_us = CASE WHEN newest_us > OLD.indexed_at_us THEN newest_us ELSE (
+            SELECT MAX(indexed_at_us) FROM memory_entries
+            WHERE user_id = OLD.user_id AND content_type = OLD.content_type
+        ) END
+    WHERE user_id = OLD.user_id AND content_type = OLD.content_type;
+    DELETE FROM user_stats WHERE user_id = OLD.user_id AND content_type = OLD.content_type AND entries <= 0;
+"""
+USER_STATS_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_user_stats_insert AFTER INSERT ON memory_entries
+    BEGIN {_USER_STATS_ADD}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_user_stats_delete AFTER DELETE ON memory_entries
+    BEGIN {_USER_STATS_REMOVE}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_user_stats_update
+    AFTER UPDATE OF user_id, content_type, token_count, indexed_at_us ON memory_entries
+    WHEN OLD.user_id IS NOT NEW.user_id OR OLD.content_type IS NOT NEW.content_type
+        OR OLD.token_count IS NOT NEW.token_count OR OLD.indexed_at_us IS NOT NEW.indexed_at_us
+    BEGIN {_USER_STATS_REMOVE} {_USER_STATS_ADD}
+    END
+    """,
+)
+
+# user_stats rows recomputed from memory_entries, optionally for one user.
+USER_STATS_QUERY = """
+SELECT user_id, content_type, COUNT(*) AS entries, COALESCE(SUM(token_count), 0) AS tokens,
+       MIN(indexed_at_us) AS oldest_us, MAX(indexed_at_us) AS newest_us
+FROM memory_entries {where}
+GROUP BY user_id, content_type
+"""
+
+
+UPSERT_SQL = """
+INSERT INTO memory_entries (
+    id, user_id, content_type, title, content_preview, content, content_codec, content_raw_bytes,
+    embedding_id, indexed_at_us, last_accessed_at_us, access_count, relevance_decay, source_url,
+    source_metadata, tags, token_count
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    title=excluded.title,
+    content_preview=excluded.content_preview,
+    content=excluded.content,
+    content_codec=excluded.content_codec,
+    content_raw_bytes=excluded.content_raw_bytes,
+    embedding_id=excluded.embedding_id,
+    indexed_at_us=excluded.indexed_at_us,
+    last_accessed_at_us=excluded.last_accessed_at_us,
+    access_count=excluded.access_count,
+    relevance_decay=excluded.relevance_decay,
+    source_url=excluded.source_url,
+    source_metadata=excluded.source_metadata,
+    tags=excluded.tags,
+    token_count=excluded.token_count
+"""
+
+
+class _ThreadConnection:
+    """A worker thread's read connection, held in the store's thread-local."""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+
+def _release_connection(
+    conn: sqlite3.Connection, connections: list[sqlite3.Connection], lock: threading.Lock
+) -> None:
+    with lock:
+        if conn in connections:
+            connections.remove(conn)
+    conn.close()
+
+
+@dataclass
+class _WriteOp:
+    fn: Callable[..., Any]
+    args: tuple
+    future: Future
+    enqueued_at: float
+
+
 class MemoryStore:
-    def __init__(self, db_path: str | Path) -> None:
+    """SQLite metadata store.
+
+    Each ``anyio`` worker thread keeps one read-only connection for the
+    lifetime of the store instead of connecting per call, so the pragmas are
+    paid once and ``sqlite3``'s statement cache reuses prepared statements
+    across calls.
+
+    All writes go through one writer thread that owns the only writable
+    connection. It drains queued operations into transactions of up to
+    ``write_batch_size`` operations, each under its own savepoint so one
+    failing operation does not take the others down, and resolves every
+    caller's awaitable once the transaction commits. Writers therefore never
+    contend for SQLite's write lock, and readers never wait on them in WAL
+    mode. A batch that fails outside its transaction fails every caller in
+    it; if the writer's connection then cannot be reopened, writes fail fast
+    until ``close``.
+
+    With a ``codec``, content of at least ``min_compress_chars`` is stored
+    encoded, with the codec name in ``content_codec``; content shorter than
+    ``dictionary_max_chars`` uses the newest trained zlib dictionary when
+    there is one. Records decode their content only when it is read.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        cached_statements: int = 256,
+        codec: ContentCodec | None = None,
+        min_compress_chars: int = 256,
+        dictionary_max_chars: int = 4096,
+        write_batch_size: int = 256,
+        metrics_window: int = 1024,
+    ) -> None:
         self.db_path = Path(db_path)
-        self._ensure_schema()
+        self.cached_statements = cached_statements
+        self.codec = codec
+        self.min_compress_chars = min_compress_chars
+        self.dictionary_max_chars = dictionary_max_chars
+        self.write_batch_size = write_batch_size
+        self._codecs: dict[str, ContentCodec] = {"zlib": ZlibCodec()}
+        if codec is not None:
+            self._codecs[codec.name] = codec
+        self._dictionary_codec: ContentCodec | None = None
+        self._dictionary_id: int | None = None
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writes: queue.SimpleQueue[_WriteOp | None] = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        self._writer_conn: sqlite3.Connection | None = None
+        self._writer_lock = threading.Lock()
+        self._writer_error: Exception | None = None
+        self._writer_error_lock = threading.Lock()
+        self._write_batch_sizes: deque[int] = deque(maxlen=metrics_window)
+        self._write_latencies_ms: deque[float] = deque(maxlen=metrics_window)
+        self._write_count = 0
+        self._write_failures = 0
+        self._transactions = 0
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer_conn = self._open_connection()
+        self._ensure_schema(self._writer_conn)
 
-    def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
+    def _open_connection(self, read_only: bool = False) -> sqlite3.Connection:
+        # check_same_thread is off only so close() can run from the shutdown
+        # thread; each connection is used by one thread at a time.
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=5.0,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            # Autocommit: the writer issues BEGIN/COMMIT itself.
+            isolation_level=None,
+        )
         conn.row_factory = sqlite3.Row
+        # Used by the full-text triggers to index compressed content.
+        conn.create_function("memory_content", 2, self._indexed_content, deterministic=True)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
         return conn
 
-    def _ensure_schema(self) -> None:
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        conn = self._connect()
-        try:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS memory_entries (
-                    id TEXT PRIMARY KEY,
-                    user_id TEXT NOT NULL,
-                    content_type TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    content_preview TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    embedding_id TEXT NOT NULL,
-                    indexed_at TEXT NOT NULL,
-                    last_accessed_at TEXT,
-                    access_count INTEGER NOT NULL,
-                    relevance_decay REAL NOT NULL,
-                    source_url TEXT,
-                    source_metadata TEXT,
-                    related_entries TEXT,
-                    tags TEXT,
-                    token_count INTEGER NOT NULL
+    def _connect(self) -> sqlite3.Connection:
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = self._open_connection(read_only=True)
+            holder = self._local.holder = _ThreadConnection(conn)
+            with self._connections_lock:
+                self._connections.append(conn)
+            # anyio retires idle worker threads; their thread-locals go with
+            # them, and so does the connection.
+            weakref.finalize(holder, _release_connection, conn, self._connections, self._connections_lock)
+        return holder.conn
+
+    def close(self) -> None:
+        """Finish queued writes, then close every connection; the store reopens lazily."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+            # A writer that stopped on a broken connection has already exited.
+            if writer is not None and writer.is_alive():
+                self._writes.put(None)
+                writer.join()
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
+            self._writer_error = None
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    async def _write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Queue ``fn(conn, *args)`` for the writer; resolves once its transaction commits."""
+        return await asyncio.wrap_future(self._submit_write(fn, args))
+
+    def _write_sync(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return self._submit_write(fn, args).result()
+
+    def _submit_write(self, fn: Callable[..., Any], args: tuple) -> Future:
+        future: Future = Future()
+        with self._writer_lock, self._writer_error_lock:
+            if self._writer_error is not None:
+                future.set_exception(RuntimeError(f"{self.db_path.name} writer stopped: {self._writer_error}"))
+                return future
+            if self._writer is None:
+                if self._writer_conn is None:
+                    self._writer_conn = self._open_connection()
+                self._writer = threading.Thread(
+                    target=self._write_loop,
+                    args=(self._writer_conn,),
+                    name=f"memory-writer:{self.db_path.name}",
+                    daemon=True,
                 )
-                """
+                self._writer.start()
+            self._writes.put(_WriteOp(fn, args, future, time.perf_counter()))
+        return future
+
+    def _write_loop(self, conn: sqlite3.Connection) -> None:
+        while True:
+            op = self._writes.get()
+            if op is None:
+                return
+            batch = [op]
+            stopping = False
+            while len(batch) < self.write_batch_size:
+                try:
+                    op = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if op is None:
+                    stopping = True
+                    break
+                batch.append(op)
+            try:
+                self._run_write_batch(conn, batch)
+            except Exception as exc:
+                # Last resort, e.g. ROLLBACK itself failed: no caller may be
+                # left waiting, and the loop must keep serving the queue.
+                logger.exception("write batch on %s failed outside its transaction", self.db_path.name)
+                for op in batch:
+                    if not op.future.done():
+                        op.future.set_exception(exc)
+                conn = self._recover_writer_connection(conn, exc)
+                if conn is None:
+                    return
+            if stopping:
+                return
+
+    def _recover_writer_connection(self, conn: sqlite3.Connection, error: Exception) -> sqlite3.Connection | None:
+        """The writer's connection with no transaction open, reopened if it has to be.
+
+        When it cannot be reopened the store is marked broken: queued and
+        later writes fail with ``error`` instead of waiting for a dead writer.
+        """
+        try:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return conn
+        except sqlite3.Error:
+            pass
+        try:
+            conn.close()
+            fresh = self._open_connection()
+        except Exception:
+            logger.exception("could not reopen the writer connection for %s", self.db_path.name)
+            self._writer_conn = None
+            # Not _writer_lock: close() holds it while joining this thread.
+            with self._writer_error_lock:
+                self._writer_error = error
+                while True:
+                    try:
+                        op = self._writes.get_nowait()
+                    except queue.Empty:
+                        return None
+                    if op is not None and op.future.set_running_or_notify_cancel():
+                        op.future.set_exception(error)
+        self._writer_conn = fresh
+        return fresh
+
+    def _run_write_batch(self, conn: sqlite3.Connection, batch: list[_WriteOp]) -> None:
+        # Callers cancelled while queued are dropped before anything runs.
+        ops = [op for op in batch if op.future.set_running_or_notify_cancel()]
+        if not ops:
+            return
+        outcomes: list[tuple[_WriteOp, Any, BaseException | None]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op in ops:
+                conn.execute("SAVEPOINT write_op")
+                try:
+                    result = op.fn(conn, *op.args)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO write_op")
+                    conn.execute("RELEASE write_op")
+                    outcomes.append((op, None, exc))
+                else:
+                    conn.execute("RELEASE write_op")
+                    outcomes.append((op, result, None))
+            conn.execute("COMMIT")
+        except Exception as exc:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._transactions += 1
+            self._write_failures += len(ops)
+            for op in ops:
+                op.future.set_exception(exc)
+            return
+        committed_at = time.perf_counter()
+        self._transactions += 1
+        self._write_count += len(ops)
+        self._write_batch_sizes.append(len(ops))
+        for op, result, exc in outcomes:
+            self._write_latencies_ms.append((committed_at - op.enqueued_at) * 1000)
+            if exc is None:
+                op.future.set_result(result)
+            else:
+                self._write_failures += 1
+                op.future.set_exception(exc)
+
+    def write_stats(self) -> dict[str, float]:
+        """Writer throughput and enqueue-to-commit latency over the last ``metrics_window`` writes."""
+        sizes = list(self._write_batch_sizes)
+        latencies = sorted(self._write_latencies_ms)
+
+        def percentile(q: float) -> float:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * q))] if latencies else 0.0
+
+        return {
+            "writes": self._write_count,
+            "failed": self._write_failures,
+            "transactions": self._transactions,
+            "queued": self._writes.qsize(),
+            "mean_batch_size": sum(sizes) / len(sizes) if sizes else 0.0,
+            "p50_write_ms": percentile(0.5),
+            "p99_write_ms": percentile(0.99),
+            "max_write_ms": latencies[-1] if latencies else 0.0,
+        }
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        """Bring the database to ``SCHEMA_VERSION``, tracked in ``PRAGMA user_version``.
+
+        Each migration may have a ``prepare`` step that runs first in short,
+        separately committed batches and must be safe to resume; its
+        ``apply`` step then runs in one transaction with the version bump.
+        """
+        migrations = (
+            (1, None, self._create_schema),
+            (2, self._backfill_epoch_timestamps, self._switch_to_epoch_timestamps),
+            (3, None, self._create_user_stats),
+        )
+        assert migrations[-1][0] == SCHEMA_VERSION
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"{self.db_path} is at schema version {version}; this build supports up to {SCHEMA_VERSION}"
             )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS compounding_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    event_type TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    details TEXT NOT NULL
-                )
-                """
+        for target, prepare, apply in migrations[version:]:
+            if prepare is not None:
+                prepare(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                apply(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        for row in conn.execute("SELECT id, data FROM content_dictionaries ORDER BY id"):
+            self._register_dictionary(row["id"], row["data"])
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        # Version 1: the schema as it stood before versioning. Every statement
+        # is idempotent so databases created before user_version was tracked
+        # (version 0) pass through it too.
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS memory_entries (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                content_type TEXT NOT NULL,
+                title TEXT NOT NULL,
+                content_preview TEXT NOT NULL,
+                content TEXT NOT NULL,
+                content_codec TEXT,
+                content_raw_bytes INTEGER,
+                embedding_id TEXT NOT NULL,
+                indexed_at TEXT NOT NULL,
+                last_accessed_at TEXT,
+                access_count INTEGER NOT NULL,
+                relevance_decay REAL NOT NULL,
+                source_url TEXT,
+                source_metadata TEXT,
+                tags TEXT,
+                token_count INTEGER NOT NULL
             )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_memory_user ON memory_entries(user_id)"
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS memory_edges (
+                user_id TEXT NOT NULL,
+                src TEXT NOT NULL,
+                dst TEXT NOT NULL,
+                score REAL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (user_id, src, dst)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_edges_dst ON memory_edges(user_id, dst)")
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_memory_edges_cascade
+            AFTER DELETE ON memory_entries
+            BEGIN
+                DELETE FROM memory_edges WHERE user_id = OLD.user_id AND src = OLD.id;
+                DELETE FROM memory_edges WHERE user_id = OLD.user_id AND dst = OLD.id;
+            END
+            """
+        )
+        self._migrate_related_entries(conn)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(memory_entries)")}
+        if "content_codec" not in columns:
+            conn.execute("ALTER TABLE memory_entries ADD COLUMN content_codec TEXT")
+            conn.execute("ALTER TABLE memory_entries ADD COLUMN content_raw_bytes INTEGER")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS content_dictionaries (
+                id INTEGER PRIMARY KEY,
+                data BLOB NOT NULL,
+                created_at TEXT NOT NULL
             )
+            """
+        )
+        self._ensure_fts(conn)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS compounding_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                details TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS compounding_event_rollups (
+                user_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                last_at TEXT NOT NULL,
+                PRIMARY KEY (user_id, day, event_type)
+            ) WITHOUT ROWID
+            """
+        )
+        if conn.execute("SELECT 1 FROM compounding_event_rollups LIMIT 1").fetchone() is None:
+            # First open after rollups were introduced: summarise existing events.
             conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_memory_user_type ON memory_entries(user_id, content_type)"
+                """
+                INSERT INTO compounding_event_rollups (user_id, day, event_type, count, last_at)
+                SELECT user_id, substr(timestamp, 1, 10), event_type, COUNT(*), MAX(timestamp)
+                FROM compounding_events
+                GROUP BY user_id, substr(timestamp, 1, 10), event_type
+                """
             )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memory_user ON memory_entries(user_id)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memory_user_type ON memory_entries(user_id, content_type)"
+        )
+
+    @staticmethod
+    def _backfill_epoch_timestamps(conn: sqlite3.Connection) -> None:
+        # Version 2, online part: add the integer columns and fill them in
+        # short transactions so other connections keep writing meanwhile. Rows
+        # still NULL after an interruption are picked up on the next open.
+        conn.create_function("iso_to_us", 1, iso_to_epoch_us, deterministic=True)
+        for table, (_, columns) in EPOCH_COLUMNS.items():
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for _, column in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+        for table in EPOCH_COLUMNS:
+            while True:
+                # The connection autocommits, so each batch commits on its own.
+                updated = _backfill_epoch_columns(conn, table, MIGRATION_BATCH_SIZE)
+                if updated < MIGRATION_BATCH_SIZE:
+                    break
+
+    @staticmethod
+    def _switch_to_epoch_timestamps(conn: sqlite3.Connection) -> None:
+        # Version 2, atomic part: convert rows written since the backfill,
+        # then drop the ISO columns and index the integer ones instead.
+        for table in EPOCH_COLUMNS:
+            _backfill_epoch_columns(conn, table)
+        for index in (
+            "idx_memory_indexed_at",
+            "idx_memory_user_indexed_at",
+            "idx_memory_user_last_accessed_at",
+            "idx_events_user_timestamp",
+            "idx_events_timestamp",
+        ):
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+        for table, (_, columns) in EPOCH_COLUMNS.items():
+            for iso_column, _ in columns:
+                conn.execute(f"ALTER TABLE {table} DROP COLUMN {iso_column}")
+        conn.execute("CREATE INDEX idx_memory_indexed_at ON memory_entries(indexed_at_us)")
+        for sort_by, expression in SORT_EXPRESSIONS.items():
             conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_memory_indexed_at ON memory_entries(indexed_at)"
+                f"CREATE INDEX IF NOT EXISTS idx_memory_user_{sort_by} ON memory_entries(user_id, {expression}, id)"
             )
-            conn.commit()
-        finally:
-            conn.close()
+        conn.execute("CREATE INDEX idx_events_user_timestamp ON compounding_events(user_id, timestamp_us)")
+        conn.execute("CREATE INDEX idx_events_timestamp ON compounding_events(timestamp_us)")
 
-    async def upsert(self, record: MemoryRecord) -> None:
-        await anyio.to_thread.run_sync(self._upsert_sync, record)
+    @staticmethod
+    def _create_user_stats(conn: sqlite3.Connection) -> None:
+        # Version 3: per-user, per-type aggregates kept current by triggers so
+        # stats() no longer scans the user's rows.
+        conn.execute(
+            """
+            CREATE TABLE user_stats (
+                user_id TEXT NOT NULL,
+                content_type TEXT NOT NULL,
+                entries INTEGER NOT NULL,
+                tokens INTEGER NOT NULL,
+                oldest_us INTEGER,
+                newest_us INTEGER,
+                PRIMARY KEY (user_id, content_type)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("DROP INDEX IF EXISTS idx_memory_user_type")
+        conn.execute(
+            "CREATE INDEX idx_memory_user_type_indexed_at ON memory_entries(user_id, content_type, indexed_at_us)"
+        )
+        conn.execute("INSERT INTO user_stats " + USER_STATS_QUERY.format(where=""))
+        for trigger in USER_STATS_TRIGGERS:
+            conn.execute(trigger)
 
-    def _upsert_sync(self, record: MemoryRecord) -> None:
-        conn = self._connect()
-        try:
+    @staticmethod
+    def _migrate_related_entries(conn: sqlite3.Connection) -> None:
+        # Databases created before memory_edges keep links in a JSON column;
+        # move them over (dropping ids that no longer exist) and drop it.
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(memory_entries)")}
+        if "related_entries" not in columns:
+            return
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO memory_edges (user_id, src, dst, score, created_at)
+            SELECT m.user_id, m.id, link.value, NULL, m.indexed_at
+            FROM memory_entries AS m, json_each(COALESCE(m.related_entries, '[]')) AS link
+            WHERE link.type = 'text'
+              AND EXISTS (SELECT 1 FROM memory_entries AS d WHERE d.user_id = m.user_id AND d.id = link.value)
+            """
+        )
+        conn.execute("ALTER TABLE memory_entries DROP COLUMN related_entries")
+
+    @staticmethod
+    def _ensure_fts(conn: sqlite3.Connection) -> None:
+        # Contentless, so the index does not keep a second, uncompressed copy
+        # of every entry; its rowids are memory_entries rowids.
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'memory_fts'").fetchone()
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(title, content, tags, content='')"
+        )
+        for trigger in FTS_TRIGGERS:
+            conn.execute(trigger)
+        if exists is None:
             conn.execute(
                 """
-                INSERT INTO memory_entries (
-                    id, user_id, content_type, title, content_preview, content, embedding_id,
-                    indexed_at, last_accessed_at, access_count, relevance_decay, source_url,
-                    source_metadata, related_entries, tags, token_count
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    title=excluded.title,
-                    content_preview=excluded.content_preview,
-                    content=excluded.content,
-                    embedding_id=excluded.embedding_id,
-                    indexed_at=excluded.indexed_at,
-                    last_accessed_at=excluded.last_accessed_at,
-                    access_count=excluded.access_count,
-                    relevance_decay=excluded.relevance_decay,
-                    source_url=excluded.source_url,
-                    source_metadata=excluded.source_metadata,
-                    related_entries=excluded.related_entries,
-                    tags=excluded.tags,
-                    token_count=excluded.token_count
-                """,
-                (
-                    record.id,
-                    record.user_id,
-                    record.content_type,
-                    record.title,
-                    record.content_preview,
-                    record.content,
-                    record.embedding_id,
-                    record.indexed_at.isoformat(),
-                    record.last_accessed_at.isoformat() if record.last_accessed_at else None,
-                    record.access_count,
-                    record.relevance_decay,
-                    record.source_url,
-                    json.dumps(record.source_metadata) if record.source_metadata else None,
-                    json.dumps(record.related_entries),
-                    json.dumps(record.tags),
-                    record.token_count,
-                ),
+                INSERT INTO memory_fts (rowid, title, content, tags)
+                SELECT rowid, title, memory_content(content, content_codec), tags FROM memory_entries
+                """
             )
-            conn.commit()
-        finally:
-            conn.close()
+
+    async def upsert(self, record: MemoryRecord) -> None:
+        await self._write(self._upsert_many_tx, [record])
+
+    async def upsert_many(self, records: list[MemoryRecord]) -> None:
+        await self._write(self._upsert_many_tx, records)
+
+    def _upsert_many_tx(self, conn: sqlite3.Connection, records: list[MemoryRecord]) -> None:
+        conn.executemany(UPSERT_SQL, [self._record_params(record) for record in records])
+        edges: dict[str, dict[str, list[tuple[str, float | None]]]] = {}
+        for record in records:
+            edges.setdefault(record.user_id, {})[record.id] = [(dst, None) for dst in record.related_entries]
+        for user_id, user_edges in edges.items():
+            self._replace_edges(conn, user_id, user_edges)
 
     async def get(self, user_id: str, entry_id: str) -> MemoryRecord | None:
         return await anyio.to_thread.run_sync(self._get_sync, user_id, entry_id)
 
     def _get_sync(self, user_id: str, entry_id: str) -> MemoryRecord | None:
         conn = self._connect()
-        try:
-            row = conn.execute(
-                "SELECT * FROM memory_entries WHERE user_id = ? AND id = ?",
-                (user_id, entry_id),
-            ).fetchone()
-            return self._row_to_record(row) if row else None
-        finally:
-            conn.close()
+        row = conn.execute(
+            f"SELECT *, {RELATED_COLUMN} FROM memory_entries WHERE user_id = ? AND id = ?",
+            (user_id, entry_id),
+        ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    async def get_many(self, user_id: str, entry_ids: Iterable[str]) -> dict[str, MemoryRecord]:
+        """Fetch several entries in one query, keyed by id; missing ids are left out."""
+        return await anyio.to_thread.run_sync(self._get_many_sync, user_id, list(dict.fromkeys(entry_ids)))
+
+    def _get_many_sync(self, user_id: str, entry_ids: list[str]) -> dict[str, MemoryRecord]:
+        conn = self._connect()
+        records: dict[str, MemoryRecord] = {}
+        # Stay well under SQLite's bound-parameter limit.
+        for start in range(0, len(entry_ids), 900):
+            chunk = entry_ids[start : start + 900]
+            placeholders = ",".join("?" for _ in chunk)
+            rows = conn.execute(
+                f"SELECT *, {RELATED_COLUMN} FROM memory_entries WHERE user_id = ? AND id IN ({placeholders})",
+                (user_id, *chunk),
+            ).fetchall()
+            for row in rows:
+                records[row["id"]] = self._row_to_record(row)
+        return records
 
     async def list(
         self,
@@ -178,219 +836,745 @@ class MemoryStore:
         sort_by: str,
     ) -> list[MemoryRecord]:
         conn = self._connect()
-        try:
-            if sort_by not in {"indexed_at", "last_accessed_at", "relevance_decay"}:
-                sort_by = "indexed_at"
-            query = "SELECT * FROM memory_entries WHERE user_id = ?"
-            params: list[Any] = [user_id]
-            if content_type:
-                query += " AND content_type = ?"
-                params.append(content_type)
-            query += f" ORDER BY {sort_by} DESC LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-            rows = conn.execute(query, tuple(params)).fetchall()
-            return [self._row_to_record(row) for row in rows]
-        finally:
-            conn.close()
+        expression = SORT_EXPRESSIONS.get(sort_by, SORT_EXPRESSIONS["indexed_at"])
+        query = f"SELECT *, {RELATED_COLUMN} FROM memory_entries WHERE user_id = ?"
+        params: list[Any] = [user_id]
+        if content_type:
+            query += " AND content_type = ?"
+            params.append(content_type)
+        query += f" ORDER BY {expression} DESC, id DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        rows = conn.execute(query, tuple(params)).fetchall()
+        return [self._row_to_record(row) for row in rows]
 
-    async def delete(self, user_id: str, entry_id: str) -> bool:
-        return await anyio.to_thread.run_sync(self._delete_sync, user_id, entry_id)
+    async def list_page(
+        self,
+        user_id: str,
+        content_type: str | None,
+        limit: int,
+        sort_by: str,
+        cursor: str | None = None,
+    ) -> tuple[list[MemoryRecord], str | None]:
+        """Keyset-paginated ``list``: returns a page and the cursor for the next one.
+
+        The cursor encodes the last row's (sort value, id), so each page is an
+        index range scan regardless of depth, and entries inserted meanwhile
+        never shift rows between pages. Raises ``ValueError`` for a cursor that
+        is malformed or was issued for a different ``sort_by``.
+        """
+        return await anyio.to_thread.run_sync(self._list_page_sync, user_id, content_type, limit, sort_by, cursor)
 
-    def _delete_sync(self, user_id: str, entry_id: str) -> bool:
+    def _list_page_sync(
+        self,
+        user_id: str,
+        content_type: str | None,
+        limit: int,
+        sort_by: str,
+        cursor: str | None,
+    ) -> tuple[list[MemoryRecord], str | None]:
         conn = self._connect()
-        try:
-            cur = conn.execute(
-                "DELETE FROM memory_entries WHERE user_id = ? AND id = ?",
-                (user_id, entry_id),
-            )
-            conn.commit()
-            return cur.rowcount > 0
-        finally:
-            conn.close()
+        if sort_by not in SORT_EXPRESSIONS:
+            sort_by = "indexed_at"
+        expression = SORT_EXPRESSIONS[sort_by]
+        query = f"SELECT *, {RELATED_COLUMN}, {expression} AS sort_value FROM memory_entries WHERE user_id = ?"
+        params: list[Any] = [user_id]
+        if content_type:
+            query += " AND content_type = ?"
+            params.append(content_type)
+        if cursor:
+            value, last_id = _decode_cursor(cursor, sort_by)
+            # The redundant ``<=`` bound lets SQLite seek the expression index too.
+            query += f" AND {expression} <= ? AND ({expression}, id) < (?, ?)"
+            params.extend([value, value, last_id])
+        query += f" ORDER BY {expression} DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        rows = conn.execute(query, tuple(params)).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(sort_by, rows[-1]["sort_value"], rows[-1]["id"])
+        return [self._row_to_record(row) for row in rows], next_cursor
+
+    async def delete(self, user_id: str, entry_id: str) -> bool:
+        return await self._write(self._delete_tx, user_id, entry_id)
+
+    def _delete_tx(self, conn: sqlite3.Connection, user_id: str, entry_id: str) -> bool:
+        cur = conn.execute(
+            "DELETE FROM memory_entries WHERE user_id = ? AND id = ?",
+            (user_id, entry_id),
+        )
+        return cur.rowcount > 0
+
+    async def delete_many(self, user_id: str, entry_ids: list[str]) -> int:
+        return await self._write(self._delete_many_tx, user_id, entry_ids)
+
+    def _delete_many_tx(self, conn: sqlite3.Connection, user_id: str, entry_ids: list[str]) -> int:
+        cur = conn.executemany(
+            "DELETE FROM memory_entries WHERE user_id = ? AND id = ?",
+            [(user_id, entry_id) for entry_id in entry_ids],
+        )
+        return cur.rowcount
 
     async def update_access(
         self,
         user_id: str,
         entry_id: str,
-        accessed_at: datetime | None = None,
+        accessed_at_us: int | None = None,
         increment: int = 1,
         reset_decay: bool = True,
     ) -> None:
-        await anyio.to_thread.run_sync(
-            self._update_access_sync, user_id, entry_id, accessed_at, increment, reset_decay
+        await self._write(
+            self._update_access_tx, user_id, entry_id, accessed_at_us, increment, reset_decay
         )
 
-    def _update_access_sync(
+    def _update_access_tx(
         self,
+        conn: sqlite3.Connection,
         user_id: str,
         entry_id: str,
-        accessed_at: datetime | None,
+        accessed_at_us: int | None,
         increment: int,
         reset_decay: bool,
     ) -> None:
-        accessed_at = accessed_at or now_utc()
-        conn = self._connect()
-        try:
-            decay_stmt = "relevance_decay = 1.0" if reset_decay else "relevance_decay = relevance_decay"
-            conn.execute(
-                f"""
-                UPDATE memory_entries
-                SET last_accessed_at = ?,
-                    access_count = access_count + ?,
-                    {decay_stmt}
-                WHERE user_id = ? AND id = ?
-                """,
-                (accessed_at.isoformat(), increment, user_id, entry_id),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        accessed_at_us = accessed_at_us or now_us()
+        decay_stmt = "relevance_decay = 1.0" if reset_decay else "relevance_decay = relevance_decay"
+        conn.execute(
+            f"""
+            UPDATE memory_entries
+            SET last_accessed_at_us = ?,
+                access_count = access_count + ?,
+                {decay_stmt}
+            WHERE user_id = ? AND id = ?
+            """,
+            (accessed_at_us, increment, user_id, entry_id),
+        )
+
+    async def update_access_many(self, accesses: list[tuple[str, str, int, int]]) -> None:
+        """Apply ``(user_id, entry_id, increment, accessed_at_us)`` accesses in one transaction.
+
+        ``last_accessed_at_us`` only moves forward, so a late flush of an older
+        access never rewinds it. Each access resets ``relevance_decay``.
+        """
+        await self._write(self._update_access_many_tx, accesses)
+
+    def _update_access_many_tx(self, conn: sqlite3.Connection, accesses: list[tuple[str, str, int, int]]) -> None:
+        conn.executemany(
+            """
+            UPDATE memory_entries
+            SET last_accessed_at_us = MAX(COALESCE(last_accessed_at_us, 0), ?),
+                access_count = access_count + ?,
+                relevance_decay = 1.0
+            WHERE user_id = ? AND id = ?
+            """,
+            [
+                (accessed_at_us, increment, user_id, entry_id)
+                for user_id, entry_id, increment, accessed_at_us in accesses
+            ],
+        )
 
     async def update_related_entries(self, user_id: str, entry_id: str, related_entries: list[str]) -> None:
-        await anyio.to_thread.run_sync(self._update_related_entries_sync, user_id, entry_id, related_entries)
+        await self.update_related_many(user_id, {entry_id: related_entries})
+
+    async def update_related_many(self, user_id: str, related: dict[str, list[str]]) -> None:
+        """Replace the related entries of every entry in ``related`` in one transaction."""
+        await self.replace_edges(
+            user_id, {entry_id: [(dst, None) for dst in entries] for entry_id, entries in related.items()}
+        )
+
+    async def add_related_many(self, user_id: str, links: list[tuple[str, str]]) -> None:
+        """Link each ``entry_id`` to ``related_id`` unless the link already exists."""
+        await self.add_edges(user_id, [(entry_id, related_id, None) for entry_id, related_id in links])
+
+    async def add_edges(self, user_id: str, edges: list[tuple[str, str, float | None]]) -> None:
+        """Insert ``(src, dst, score)`` links; an existing link keeps its score unless a new one is given."""
+        await self._write(self._add_edges_tx, user_id, edges)
+
+    def _add_edges_tx(self, conn: sqlite3.Connection, user_id: str, edges: list[tuple[str, str, float | None]]) -> None:
+        self._insert_edges(conn, user_id, edges)
+
+    async def replace_edges(self, user_id: str, edges: dict[str, list[tuple[str, float | None]]]) -> None:
+        """Replace the out-links of each source id with the given ``(dst, score)`` pairs."""
+        await self._write(self._replace_edges_tx, user_id, edges)
+
+    def _replace_edges_tx(
+        self, conn: sqlite3.Connection, user_id: str, edges: dict[str, list[tuple[str, float | None]]]
+    ) -> None:
+        self._replace_edges(conn, user_id, edges)
 
-    def _update_related_entries_sync(self, user_id: str, entry_id: str, related_entries: list[str]) -> None:
+    async def get_backlinks(self, user_id: str, entry_id: str) -> list[str]:
+        """Ids of the entries that link to ``entry_id``."""
+        return await anyio.to_thread.run_sync(self._get_backlinks_sync, user_id, entry_id)
+
+    def _get_backlinks_sync(self, user_id: str, entry_id: str) -> list[str]:
         conn = self._connect()
-        try:
-            conn.execute(
-                "UPDATE memory_entries SET related_entries = ? WHERE user_id = ? AND id = ?",
-                (json.dumps(related_entries), user_id, entry_id),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        rows = conn.execute(
+            "SELECT src FROM memory_edges WHERE user_id = ? AND dst = ? ORDER BY score DESC, created_at, src",
+            (user_id, entry_id),
+        ).fetchall()
+        return [row["src"] for row in rows]
+
+    def _replace_edges(
+        self, conn: sqlite3.Connection, user_id: str, edges: dict[str, list[tuple[str, float | None]]]
+    ) -> None:
+        conn.executemany(
+            "DELETE FROM memory_edges WHERE user_id = ? AND src = ?",
+            [(user_id, src) for src in edges],
+        )
+        self._insert_edges(conn, user_id, [(src, dst, score) for src, links in edges.items() for dst, score in links])
+
+    @staticmethod
+    def _insert_edges(conn: sqlite3.Connection, user_id: str, edges: list[tuple[str, str, float | None]]) -> None:
+        created_at = now_utc().isoformat()
+        conn.executemany(
+            """
+            INSERT INTO memory_edges (user_id, src, dst, score, created_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, src, dst) DO UPDATE SET score = COALESCE(excluded.score, memory_edges.score)
+            """,
+            [(user_id, src, dst, score, created_at) for src, dst, score in edges if src != dst],
+        )
 
     async def update_decay(self, user_id: str, entry_id: str, new_decay: float) -> None:
-        await anyio.to_thread.run_sync(self._update_decay_sync, user_id, entry_id, new_decay)
+        await self._write(self._update_decay_tx, user_id, entry_id, new_decay)
 
-    def _update_decay_sync(self, user_id: str, entry_id: str, new_decay: float) -> None:
-        conn = self._connect()
-        try:
-            conn.execute(
-                "UPDATE memory_entries SET relevance_decay = ? WHERE user_id = ? AND id = ?",
-                (new_decay, user_id, entry_id),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+    def _update_decay_tx(self, conn: sqlite3.Connection, user_id: str, entry_id: str, new_decay: float) -> None:
+        conn.execute(
+            "UPDATE memory_entries SET relevance_decay = ? WHERE user_id = ? AND id = ?",
+            (new_decay, user_id, entry_id),
+        )
+
+    async def update_decay_many(self, user_id: str, decays: dict[str, float]) -> None:
+        await self._write(self._update_decay_many_tx, user_id, decays)
+
+    def _update_decay_many_tx(self, conn: sqlite3.Connection, user_id: str, decays: dict[str, float]) -> None:
+        conn.executemany(
+            "UPDATE memory_entries SET relevance_decay = ? WHERE user_id = ? AND id = ?",
+            [(decay, user_id, entry_id) for entry_id, decay in decays.items()],
+        )
 
     async def update_content_fields(
         self, user_id: str, entry_id: str, title: str, preview: str, tags: list[str]
     ) -> None:
-        await anyio.to_thread.run_sync(self._update_content_fields_sync, user_id, entry_id, title, preview, tags)
+        await self._write(self._update_content_fields_tx, user_id, entry_id, title, preview, tags)
 
-    def _update_content_fields_sync(
-        self, user_id: str, entry_id: str, title: str, preview: str, tags: list[str]
+    def _update_content_fields_tx(
+        self, conn: sqlite3.Connection, user_id: str, entry_id: str, title: str, preview: str, tags: list[str]
     ) -> None:
-        conn = self._connect()
-        try:
-            conn.execute(
-                "UPDATE memory_entries SET title = ?, content_preview = ?, tags = ? WHERE user_id = ? AND id = ?",
-                (title, preview, json.dumps(tags), user_id, entry_id),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        conn.execute(
+            "UPDATE memory_entries SET title = ?, content_preview = ?, tags = ? WHERE user_id = ? AND id = ?",
+            (title, preview, json.dumps(tags), user_id, entry_id),
+        )
 
     async def list_all(self, user_id: str) -> list[MemoryRecord]:
         return await anyio.to_thread.run_sync(self._list_all_sync, user_id)
 
     def _list_all_sync(self, user_id: str) -> list[MemoryRecord]:
         conn = self._connect()
-        try:
+        rows = conn.execute(
+            f"SELECT *, {RELATED_COLUMN} FROM memory_entries WHERE user_id = ?",
+            (user_id,),
+        ).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    async def search_text(
+        self,
+        user_id: str,
+        query: str,
+        limit: int = 20,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[tuple[str, float]]:
+        """BM25 full-text search over title, content and tags.
+
+        Each whitespace-separated query term is matched as a phrase and terms
+        are OR-ed, so punctuation inside product names or error codes does not
+        break the query. Returns ``(entry_id, score)`` best first; higher is better.
+        """
+        return await anyio.to_thread.run_sync(self._search_text_sync, user_id, query, limit, payload_filter)
+
+    def _search_text_sync(
+        self, user_id: str, query: str, limit: int, payload_filter: PayloadFilter | None
+    ) -> list[tuple[str, float]]:
+        match = _fts_query(query)
+        if match is None:
+            return []
+        weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+        clauses = ["memory_fts MATCH ?", "m.user_id = ?"]
+        params: list[Any] = [match, user_id]
+        if payload_filter is not None:
+            if payload_filter.content_types:
+                clauses.append(f"m.content_type IN ({', '.join('?' * len(payload_filter.content_types))})")
+                params.extend(payload_filter.content_types)
+            if payload_filter.tags:
+                clauses.append(
+                    "EXISTS (SELECT 1 FROM json_each(m.tags) AS tag "
+                    f"WHERE tag.value IN ({', '.join('?' * len(payload_filter.tags))}))"
+                )
+                params.extend(payload_filter.tags)
+            if payload_filter.created_after:
+                clauses.append("m.indexed_at_us >= ?")
+                params.append(to_epoch_us(payload_filter.created_after))
+            if payload_filter.created_before:
+                clauses.append("m.indexed_at_us <= ?")
+                params.append(to_epoch_us(payload_filter.created_before))
+        rows = self._connect().execute(
+            f"""
+            SELECT m.id, bm25(memory_fts, {weights}) AS rank
+            FROM memory_fts JOIN memory_entries AS m ON m.rowid = memory_fts.rowid
+            WHERE {' AND '.join(clauses)}
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (*params, limit),
+        ).fetchall()
+        return [(row["id"], -row["rank"]) for row in rows]
+
+    async def iter_summaries(self, user_id: str, page_size: int = 1000) -> AsyncIterator[list[MemorySummary]]:
+        """Yield a user's entries as pages of ``MemorySummary``.
+
+        Pages are read with a rowid keyset over ``idx_memory_user``, so only
+        one page is held in memory and no cursor stays open between pages.
+        """
+        after = 0
+        while True:
+            rows = await anyio.to_thread.run_sync(self._summary_page_sync, user_id, after, page_size)
+            if not rows:
+                return
+            after = rows[-1]["rowid"]
+            yield [self._row_to_summary(row) for row in rows]
+            if len(rows) < page_size:
+                return
+
+    def _summary_page_sync(self, user_id: str, after: int, page_size: int) -> list[sqlite3.Row]:
+        conn = self._connect()
+        return conn.execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM memory_entries WHERE user_id = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+            (user_id, after, page_size),
+        ).fetchall()
+
+    async def load_content(self, user_id: str, entry_ids: Iterable[str]) -> dict[str, str]:
+        """Full ``content`` of the given entries, keyed by id."""
+        return await anyio.to_thread.run_sync(self._load_content_sync, user_id, list(dict.fromkeys(entry_ids)))
+
+    def _load_content_sync(self, user_id: str, entry_ids: list[str]) -> dict[str, str]:
+        conn = self._connect()
+        content: dict[str, str] = {}
+        for start in range(0, len(entry_ids), 900):
+            chunk = entry_ids[start : start + 900]
+            placeholders = ",".join("?" for _ in chunk)
             rows = conn.execute(
-                "SELECT * FROM memory_entries WHERE user_id = ?",
-                (user_id,),
+                f"SELECT id, content, content_codec FROM memory_entries WHERE user_id = ? AND id IN ({placeholders})",
+                (user_id, *chunk),
             ).fetchall()
-            return [self._row_to_record(row) for row in rows]
-        finally:
-            conn.close()
+            for row in rows:
+                stored = self._stored_content(row["content"], row["content_codec"])
+                content[row["id"]] = stored.codec.decode(stored.data) if isinstance(stored, EncodedContent) else stored
+        return content
 
     async def add_compounding_event(self, user_id: str, event_type: str, details: dict) -> None:
-        await anyio.to_thread.run_sync(self._add_compounding_event_sync, user_id, event_type, details)
+        await self.add_compounding_events([(user_id, event_type, now_us(), details)])
+
+    async def add_compounding_events(self, events: list[tuple[str, str, int, dict]]) -> None:
+        """Insert ``(user_id, event_type, timestamp_us, details)`` rows and fold them into the daily rollups."""
+        await self._write(self._add_compounding_events_tx, events)
 
-    def _add_compounding_event_sync(self, user_id: str, event_type: str, details: dict) -> None:
+    def _add_compounding_events_tx(self, conn: sqlite3.Connection, events: list[tuple[str, str, int, dict]]) -> None:
+        rollups: dict[tuple[str, str, str], list] = {}
+        for user_id, event_type, timestamp_us, _ in events:
+            rollup = rollups.setdefault((user_id, utc_day(timestamp_us), event_type), [0, timestamp_us])
+            rollup[0] += 1
+            rollup[1] = max(rollup[1], timestamp_us)
+        conn.executemany(
+            "INSERT INTO compounding_events (user_id, event_type, timestamp_us, details) VALUES (?, ?, ?, ?)",
+            [
+                (user_id, event_type, timestamp_us, json.dumps(details))
+                for user_id, event_type, timestamp_us, details in events
+            ],
+        )
+        conn.executemany(
+            """
+            INSERT INTO compounding_event_rollups (user_id, day, event_type, count, last_at_us)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, day, event_type) DO UPDATE SET
+                count = count + excluded.count,
+                last_at_us = MAX(last_at_us, excluded.last_at_us)
+            """,
+            [
+                (user_id, day, event_type, count, last_at)
+                for (user_id, day, event_type), (count, last_at) in rollups.items()
+            ],
+        )
+
+    async def last_compounding_event_at(self, user_id: str) -> int | None:
+        """Epoch-microsecond timestamp of the user's latest event, read from the rollups."""
+        return await anyio.to_thread.run_sync(self._last_compounding_event_at_sync, user_id)
+
+    def _last_compounding_event_at_sync(self, user_id: str) -> int | None:
         conn = self._connect()
-        try:
-            conn.execute(
-                "INSERT INTO compounding_events (user_id, event_type, timestamp, details) VALUES (?, ?, ?, ?)",
-                (user_id, event_type, now_utc().isoformat(), json.dumps(details)),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        row = conn.execute(
+            "SELECT MAX(last_at_us) AS last_at_us FROM compounding_event_rollups WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+        return row["last_at_us"]
+
+    async def get_event_rollups(self, user_id: str, since_day: str | None = None) -> list[dict]:
+        """Daily per-type event counts for a user, newest day first."""
+        return await anyio.to_thread.run_sync(self._get_event_rollups_sync, user_id, since_day)
+
+    def _get_event_rollups_sync(self, user_id: str, since_day: str | None) -> list[dict]:
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT day, event_type, count, last_at_us FROM compounding_event_rollups "
+            "WHERE user_id = ? AND day >= ? ORDER BY day DESC, event_type",
+            (user_id, since_day or ""),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    async def prune_compounding_events(self, before_us: int) -> int:
+        """Delete raw events older than ``before_us``; rollups are kept."""
+        return await self._write(self._prune_compounding_events_tx, before_us)
+
+    def _prune_compounding_events_tx(self, conn: sqlite3.Connection, before_us: int) -> int:
+        return conn.execute(
+            "DELETE FROM compounding_events WHERE timestamp_us < ?",
+            (before_us,),
+        ).rowcount
 
     async def get_compounding_events(self, user_id: str, limit: int) -> list[dict]:
         return await anyio.to_thread.run_sync(self._get_compounding_events_sync, user_id, limit)
 
     def _get_compounding_events_sync(self, user_id: str, limit: int) -> list[dict]:
         conn = self._connect()
-        try:
-            rows = conn.execute(
-                "SELECT user_id, event_type, timestamp, details FROM compounding_events WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
-                (user_id, limit),
-            ).fetchall()
-            return [
-                {
-                    "user_id": row["user_id"],
-                    "event_type": row["event_type"],
-                    "timestamp": row["timestamp"],
-                    "details": json.loads(row["details"]),
-                }
-                for row in rows
-            ]
-        finally:
-            conn.close()
+        rows = conn.execute(
+            "SELECT user_id, event_type, timestamp_us, details FROM compounding_events "
+            "WHERE user_id = ? ORDER BY timestamp_us DESC LIMIT ?",
+            (user_id, limit),
+        ).fetchall()
+        return [
+            {
+                "user_id": row["user_id"],
+                "event_type": row["event_type"],
+                "timestamp_us": row["timestamp_us"],
+                "details": json.loads(row["details"]),
+            }
+            for row in rows
+        ]
 
     async def stats(self, user_id: str) -> dict:
+        """Entry and token totals for a user, read from ``user_stats`` (one row per content type)."""
         return await anyio.to_thread.run_sync(self._stats_sync, user_id)
 
     def _stats_sync(self, user_id: str) -> dict:
         conn = self._connect()
+        rows = conn.execute(
+            "SELECT content_type, entries AS count, tokens, oldest_us AS oldest, newest_us AS newest "
+            "FROM user_stats WHERE user_id = ?",
+            (user_id,),
+        ).fetchall()
+        total_entries = 0
+        total_tokens = 0
+        entries_by_type: dict[str, int] = {}
+        oldest = None
+        newest = None
+        for row in rows:
+            count = row["count"] or 0
+            tokens = row["tokens"] or 0
+            total_entries += count
+            total_tokens += tokens
+            entries_by_type[row["content_type"]] = count
+            if row["oldest"] is not None:
+                oldest = row["oldest"] if oldest is None else min(oldest, row["oldest"])
+            if row["newest"] is not None:
+                newest = row["newest"] if newest is None else max(newest, row["newest"])
+        return {
+            "total_entries": total_entries,
+            "total_tokens": total_tokens,
+            "entries_by_type": entries_by_type,
+            "oldest": oldest,
+            "newest": newest,
+        }
+
+    async def repair_user_stats(self, user_id: str | None = None) -> int:
+        """Recompute ``user_stats`` from ``memory_entries``; returns how many rows had drifted."""
+        return await self._write(self._repair_user_stats_tx, user_id)
+
+    @staticmethod
+    def _repair_user_stats_tx(conn: sqlite3.Connection, user_id: str | None) -> int:
+        where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+        expected = {
+            tuple(row)[:2]: tuple(row)[2:] for row in conn.execute(USER_STATS_QUERY.format(where=where), params)
+        }
+        stored = {
+            tuple(row)[:2]: tuple(row)[2:]
+            for row in conn.execute(
+                f"SELECT user_id, content_type, entries, tokens, oldest_us, newest_us FROM user_stats {where}", params
+            )
+        }
+        drifted = sum(1 for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key))
+        conn.execute(f"DELETE FROM user_stats {where}", params)
+        conn.executemany(
+            "INSERT INTO user_stats (user_id, content_type, entries, tokens, oldest_us, newest_us) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(*key, *values) for key, values in expected.items()],
+        )
+        return drifted
+
+    async def entry_counts(self) -> dict[str, int]:
+        """Number of entries per user in this database."""
+        return await anyio.to_thread.run_sync(self._entry_counts_sync)
+
+    def _entry_counts_sync(self) -> dict[str, int]:
+        rows = self._connect().execute("SELECT user_id, COUNT(*) AS count FROM memory_entries GROUP BY user_id")
+        return {row["user_id"]: row["count"] for row in rows}
+
+    async def user_ids(self) -> list[str]:
+        """Every user with entries or events in this database."""
+        return await anyio.to_thread.run_sync(self._user_ids_sync)
+
+    def _user_ids_sync(self) -> list[str]:
+        rows = self._connect().execute(
+            "SELECT user_id FROM memory_entries UNION SELECT user_id FROM compounding_event_rollups ORDER BY user_id"
+        )
+        return [row["user_id"] for row in rows]
+
+    async def copy_user(self, user_id: str, target: MemoryStore) -> int:
+        """Copy every row of ``user_id`` into ``target``, replacing what ``target`` held for them.
+
+        The copy commits in one ``target`` transaction, so an interrupted copy
+        leaves ``target`` as it was. Content is re-encoded for ``target``
+        because dictionary codec ids are local to each database. Returns the
+        number of entries copied.
+        """
+        return await target._write(self._copy_user_tx, user_id, target)
+
+    def _copy_user_tx(self, dest: sqlite3.Connection, user_id: str, target: MemoryStore) -> int:
+        # Runs on the writer of ``target``, reading through a connection of
+        # this store opened on that thread.
+        source = self._connect()
+        copied = 0
+        target._delete_user(dest, user_id)
+        rows = source.execute("SELECT * FROM memory_entries WHERE user_id = ?", (user_id,))
+        while batch := rows.fetchmany(500):
+            entries = []
+            for row in batch:
+                entry = dict(row)
+                content = self._plain_content(entry["content"], entry["content_codec"])
+                encoded = target._encode_content(content)
+                entry["content"], entry["content_codec"], entry["content_raw_bytes"] = encoded
+                entries.append(entry)
+            _insert_rows(dest, "memory_entries", entries)
+            copied += len(entries)
+        for table in ("memory_edges", "compounding_events", "compounding_event_rollups"):
+            rows = source.execute(f"SELECT * FROM {table} WHERE user_id = ?", (user_id,))
+            while batch := rows.fetchmany(500):
+                # Event ids are per database; the target assigns new ones.
+                _insert_rows(dest, table, [{k: row[k] for k in row.keys() if k != "id"} for row in batch])
+        return copied
+
+    async def delete_user(self, user_id: str) -> int:
+        """Delete all of a user's entries, links and events; returns the number of entries removed."""
+        return await self._write(self._delete_user, user_id)
+
+    @staticmethod
+    def _delete_user(conn: sqlite3.Connection, user_id: str) -> int:
+        # Edges go with their entries through trg_memory_edges_cascade.
+        deleted = conn.execute("DELETE FROM memory_entries WHERE user_id = ?", (user_id,)).rowcount
+        conn.execute("DELETE FROM memory_edges WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM compounding_events WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM compounding_event_rollups WHERE user_id = ?", (user_id,))
+        return deleted
+
+    def _record_params(self, record: MemoryRecord) -> tuple:
+        return (
+            record.id,
+            record.user_id,
+            record.content_type,
+            record.title,
+            record.content_preview,
+            *self._encode_content(record.content),
+            record.embedding_id,
+            record.indexed_at_us,
+            record.last_accessed_at_us,
+            record.access_count,
+            record.relevance_decay,
+            record.source_url,
+            json.dumps(record.source_metadata) if record.source_metadata else None,
+            json.dumps(record.tags),
+            record.token_count,
+        )
+
+    @staticmethod
+    def _row_to_summary(row: sqlite3.Row) -> MemorySummary:
+        return MemorySummary(
+            id=row["id"],
+            user_id=row["user_id"],
+            content_type=row["content_type"],
+            title=row["title"],
+            indexed_at_us=row["indexed_at_us"],
+            last_accessed_at_us=row["last_accessed_at_us"],
+            access_count=row["access_count"],
+            relevance_decay=row["relevance_decay"],
+            related_entries=json.loads(row["related_entries"] or "[]"),
+            tags=json.loads(row["tags"] or "[]"),
+            token_count=row["token_count"],
+        )
+
+    async def train_content_dictionary(self, sample_size: int = 2000, size: int = 32 * 1024) -> int | None:
+        """Train and store a zlib dictionary from a sample of short entries; returns its id."""
+        data = await anyio.to_thread.run_sync(self._train_content_dictionary_sync, sample_size, size)
+        if not data:
+            return None
+        dictionary_id = await self._write(self._insert_dictionary_tx, data)
+        self._register_dictionary(dictionary_id, data)
+        return dictionary_id
+
+    def _train_content_dictionary_sync(self, sample_size: int, size: int) -> bytes:
+        rows = self._connect().execute(
+            "SELECT content, content_codec FROM memory_entries "
+            "WHERE COALESCE(content_raw_bytes, length(CAST(content AS BLOB))) < ? ORDER BY random() LIMIT ?",
+            (self.dictionary_max_chars, sample_size),
+        ).fetchall()
+        return train_dictionary((self._plain_content(row["content"], row["content_codec"]) for row in rows), size)
+
+    @staticmethod
+    def _insert_dictionary_tx(conn: sqlite3.Connection, data: bytes) -> int:
+        return conn.execute(
+            "INSERT INTO content_dictionaries (data, created_at) VALUES (?, ?)",
+            (data, now_utc().isoformat()),
+        ).lastrowid
+
+    async def compress_content(self, user_id: str | None = None, batch_size: int = 500) -> int:
+        """Encode rows written before compression was enabled; returns how many were processed.
+
+        Works in ``batch_size`` transactions and only touches rows without a
+        codec marker, so it can be interrupted and re-run at any time. A row
+        rewritten by the application between read and update is skipped.
+        """
+        if self.codec is None:
+            raise ValueError("MemoryStore has no codec configured")
+        total = 0
+        while True:
+            # Rows are read and encoded on a reader thread; the writer only
+            # applies the guarded updates.
+            updates = await anyio.to_thread.run_sync(self._compress_batch_sync, user_id, batch_size)
+            if updates:
+                await self._write(self._apply_compressed_tx, updates)
+            total += len(updates)
+            if len(updates) < batch_size:
+                return total
+
+    def _compress_batch_sync(self, user_id: str | None, batch_size: int) -> list[tuple]:
+        query = "SELECT id, content FROM memory_entries WHERE content_codec IS NULL"
+        params: list[Any] = []
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        rows = self._connect().execute(query + " LIMIT ?", (*params, batch_size)).fetchall()
+        return [(*self._encode_content(row["content"]), row["id"], row["content"]) for row in rows]
+
+    @staticmethod
+    def _apply_compressed_tx(conn: sqlite3.Connection, updates: list[tuple]) -> None:
+        conn.executemany(
+            "UPDATE memory_entries SET content = ?, content_codec = ?, content_raw_bytes = ? "
+            "WHERE id = ? AND content_codec IS NULL AND content = ?",
+            updates,
+        )
+
+    async def compression_report(self) -> list[dict]:
+        """Per-user raw vs stored content bytes and their ratio."""
+        return await anyio.to_thread.run_sync(self._compression_report_sync)
+
+    def _compression_report_sync(self) -> list[dict]:
+        conn = self._connect()
+        rows = conn.execute(
+            f"""
+            SELECT user_id,
+                   COUNT(*) AS entries,
+                   SUM(content_codec IS NOT NULL AND content_codec != '{PLAIN}') AS compressed,
+                   SUM(COALESCE(content_raw_bytes, length(CAST(content AS BLOB)))) AS raw_bytes,
+                   SUM(length(CAST(content AS BLOB))) AS stored_bytes
+            FROM memory_entries
+            GROUP BY user_id
+            ORDER BY user_id
+            """
+        ).fetchall()
+        return [
+            {**dict(row), "ratio": round(row["raw_bytes"] / row["stored_bytes"], 2) if row["stored_bytes"] else 1.0}
+            for row in rows
+        ]
+
+    def _encode_content(self, text: str) -> tuple[str | bytes, str | None, int]:
+        """``(stored value, codec marker, raw byte length)`` for ``text``."""
+        raw = text.encode("utf-8")
+        if self.codec is None:
+            return text, None, len(raw)
+        if len(text) < self.min_compress_chars:
+            return text, PLAIN, len(raw)
+        codec = self.codec
+        if self._dictionary_codec is not None and len(text) < self.dictionary_max_chars:
+            codec = self._dictionary_codec
+        encoded = codec.encode(text)
+        if len(encoded) >= len(raw):
+            return text, PLAIN, len(raw)
+        return encoded, codec.name, len(raw)
+
+    def _stored_content(self, value: str | bytes, marker: str | None) -> str | EncodedContent:
+        if marker is None or marker == PLAIN:
+            return value
+        codec = self._codecs.get(marker) or self._load_dictionary(marker)
+        if codec is None:
+            raise ValueError(f"content stored with unknown codec {marker!r}")
+        return EncodedContent(value, codec)
+
+    def _load_dictionary(self, marker: str) -> ContentCodec | None:
+        # A dictionary trained by another process (storage_admin compress
+        # --train-dictionary) after this store loaded its dictionaries. This
+        # can run inside a trigger on the writer's connection, so it reads
+        # through a connection of its own.
+        dictionary_id = dictionary_codec_id(marker)
+        if dictionary_id is None:
+            return None
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
         try:
-            rows = conn.execute(
-                "SELECT content_type, COUNT(*) AS count, SUM(token_count) AS tokens, MIN(indexed_at) AS oldest, MAX(indexed_at) AS newest FROM memory_entries WHERE user_id = ? GROUP BY content_type",
-                (user_id,),
-            ).fetchall()
-            total_entries = 0
-            total_tokens = 0
-            entries_by_type: dict[str, int] = {}
-            oldest = None
-            newest = None
-            for row in rows:
-                count = row["count"] or 0
-                tokens = row["tokens"] or 0
-                total_entries += count
-                total_tokens += tokens
-                entries_by_type[row["content_type"]] = count
-                if row["oldest"]:
-                    ts = datetime.fromisoformat(row["oldest"])
-                    oldest = ts if not oldest or ts < oldest else oldest
-                if row["newest"]:
-                    ts = datetime.fromisoformat(row["newest"])
-                    newest = ts if not newest or ts > newest else newest
-            return {
-                "total_entries": total_entries,
-                "total_tokens": total_tokens,
-                "entries_by_type": entries_by_type,
-                "oldest": oldest,
-                "newest": newest,
-            }
+            row = conn.execute("SELECT data FROM content_dictionaries WHERE id = ?", (dictionary_id,)).fetchone()
         finally:
             conn.close()
+        if row is None:
+            return None
+        self._register_dictionary(dictionary_id, row[0])
+        return self._codecs[marker]
 
-    @staticmethod
-    def _row_to_record(row: sqlite3.Row) -> MemoryRecord:
+    def _plain_content(self, value: str | bytes, marker: str | None) -> str:
+        stored = self._stored_content(value, marker)
+        return stored.codec.decode(stored.data) if isinstance(stored, EncodedContent) else stored
+
+    def _indexed_content(self, value: str | bytes, marker: str | None) -> str:
+        # The full-text triggers call this; raising would abort the write and
+        # leave the row undeletable, so content that cannot be decoded even
+        # after a dictionary reload is indexed (and unindexed) as empty.
+        try:
+            return self._plain_content(value, marker)
+        except Exception:
+            logger.warning("cannot decode content stored with codec %r for the full-text index", marker, exc_info=True)
+            return ""
+
+    def _register_dictionary(self, dictionary_id: int, data: bytes) -> None:
+        codec = ZlibCodec(zdict=data, name=dictionary_codec_name(dictionary_id))
+        self._codecs[codec.name] = codec
+        # New content is encoded with the newest dictionary.
+        if self._dictionary_id is None or dictionary_id > self._dictionary_id:
+            self._dictionary_id = dictionary_id
+            self._dictionary_codec = codec
+
+    def _row_to_record(self, row: sqlite3.Row) -> MemoryRecord:
         return MemoryRecord(
             id=row["id"],
             user_id=row["user_id"],
             content_type=row["content_type"],
             title=row["title"],
             content_preview=row["content_preview"],
-            content=row["content"],
+            content=self._stored_content(row["content"], row["content_codec"]),
             embedding_id=row["embedding_id"],
-            indexed_at=datetime.fromisoformat(row["indexed_at"]),
-            last_accessed_at=datetime.fromisoformat(row["last_accessed_at"]) if row["last_accessed_at"] else None,
+            indexed_at_us=row["indexed_at_us"],
+            last_accessed_at_us=row["last_accessed_at_us"],
             access_count=row["access_count"],
             relevance_decay=row["relevance_decay"],
             source_url=row["source_url"],
@@ -399,3 +1583,49 @@ class MemoryStore:
             tags=json.loads(row["tags"] or "[]"),
             token_count=row["token_count"],
         )
+
+
+def _backfill_epoch_columns(conn: sqlite3.Connection, table: str, limit: int | None = None) -> int:
+    """Fill NULL epoch columns of ``table`` from their ISO columns (up to ``limit`` rows)."""
+    key, columns = EPOCH_COLUMNS[table]
+    assignments = ", ".join(f"{column} = iso_to_us({iso_column})" for iso_column, column in columns)
+    pending = f"{columns[0][1]} IS NULL"
+    if limit is None:
+        return conn.execute(f"UPDATE {table} SET {assignments} WHERE {pending}").rowcount
+    return conn.execute(
+        f"UPDATE {table} SET {assignments} WHERE ({key}) IN (SELECT {key} FROM {table} WHERE {pending} LIMIT ?)",
+        (limit,),
+    ).rowcount
+
+
+def _insert_rows(conn: sqlite3.Connection, table: str, rows: list[dict]) -> None:
+    if not rows:
+        return
+    columns = list(rows[0])
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [tuple(row[column] for column in columns) for row in rows],
+    )
+
+
+def _fts_query(text: str, max_terms: int = 32) -> str | None:
+    terms = [term for term in text.split() if re.search(r"\w", term)][:max_terms]
+    if not terms:
+        return None
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _encode_cursor(sort_by: str, value: Any, entry_id: str) -> str:
+    raw = json.dumps([sort_by, value, entry_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str) -> tuple[Any, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, entry_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if cursor_sort != sort_by or not isinstance(entry_id, str):
+        raise ValueError("cursor does not match sort_by")
+    return value, entry_id
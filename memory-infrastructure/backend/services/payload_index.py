@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable
+
+import numpy as np
+
+
+@dataclass
+class PayloadFilter:
+    """Predicates resolved against a collection's payload index before scoring.
+
+    ``content_types`` and ``tags`` match any of the listed values; the
+    ``created_*`` bounds are inclusive and compare against ``payload["created_at"]``.
+    """
+
+    content_types: list[str] | None = None
+    tags: list[str] | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.content_types or self.tags or self.created_after or self.created_before)
+
+
+class PayloadIndex:
+    """Secondary indexes over the rows of one ``VectorCollection``.
+
+    ``type`` and ``tags`` map each value to a sorted row array (rows are
+    append-only, so appending keeps them sorted); ``created_at`` is a per-row
+    epoch-seconds column. Tombstoned rows stay indexed and are masked out by
+    the collection's ``alive`` flags.
+    """
+
+    def __init__(self) -> None:
+        self._types: dict[str, list[int]] = {}
+        self._tags: dict[str, list[int]] = {}
+        self._created = np.zeros(0, dtype=np.float64)
+        self._size = 0
+
+    @classmethod
+    def build(cls, payloads: Iterable[dict[str, Any]]) -> "PayloadIndex":
+        index = cls()
+        for row, payload in enumerate(payloads):
+            index.add(row, payload)
+        return index
+
+    def add(self, row: int, payload: dict[str, Any]) -> None:
+        content_type = payload.get("type")
+        if content_type is not None:
+            self._types.setdefault(content_type, []).append(row)
+        for tag in payload.get("tags") or ():
+            self._tags.setdefault(tag, []).append(row)
+        if row >= self._created.shape[0]:
+            grown = np.full(max(64, (row + 1) * 2), np.nan)
+            grown[: self._created.shape[0]] = self._created
+            self._created = grown
+        self._created[row] = _epoch(payload.get("created_at"))
+        self._size = max(self._size, row + 1)
+
+    def mask(self, payload_filter: PayloadFilter, size: int) -> np.ndarray:
+        """Boolean row mask of length ``size`` for rows matching ``payload_filter``."""
+        mask = np.ones(size, dtype=bool)
+        if payload_filter.content_types:
+            mask &= self._any_of(self._types, payload_filter.content_types, size)
+        if payload_filter.tags:
+            mask &= self._any_of(self._tags, payload_filter.tags, size)
+        if payload_filter.created_after or payload_filter.created_before:
+            created = np.full(size, np.nan)
+            known = min(size, self._created.shape[0])
+            created[:known] = self._created[:known]
+            with np.errstate(invalid="ignore"):
+                if payload_filter.created_after:
+                    mask &= created >= payload_filter.created_after.timestamp()
+                if payload_filter.created_before:
+                    mask &= created <= payload_filter.created_before.timestamp()
+        return mask
+
+    @staticmethod
+    def _any_of(postings: dict[str, list[int]], values: list[str], size: int) -> np.ndarray:
+        bits = np.zeros(size, dtype=bool)
+        for value in values:
+            rows = postings.get(value)
+            if rows:
+                bits[np.asarray(rows, dtype=np.int64)] = True
+        return bits
+
+
+def _epoch(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    return np.nan
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+
+from .ann_index import kmeans
+
+BLOCK_ROWS = 16_384
+
+
+@dataclass
+class QuantizationConfig:
+    """Compressed candidate scoring for a ``VectorCollection``.
+
+    ``mode="int8"`` keeps one byte per dimension; ``mode="pq"`` keeps one byte
+    per ``pq_subvectors`` slice. Collections with fewer than ``min_size`` live
+    rows are not quantized. Each search scores ``limit * rescore`` candidates
+    on the codes and rescores those against the full-precision rows.
+    """
+
+    mode: Literal["int8", "pq"] = "int8"
+    min_size: int = 1024
+    rescore: int = 4
+    pq_subvectors: int | None = None
+    pq_train_sample: int = 8192
+    seed: int = 0
+
+
+class ScalarQuantizer:
+    """Per-dimension int8 quantization over the trained [low, high] range."""
+
+    def __init__(self, low: np.ndarray, high: np.ndarray) -> None:
+        self.low = low.astype(np.float32)
+        self.step = np.maximum(high - low, 1e-12).astype(np.float32) / 255.0
+
+    @classmethod
+    def from_state(cls, state: dict[str, np.ndarray]) -> "ScalarQuantizer":
+        quantizer = cls(state["sq_low"], state["sq_low"])
+        quantizer.step = state["sq_step"].astype(np.float32)
+        return quantizer
+
+    def state(self) -> dict[str, np.ndarray]:
+        return {"sq_low": self.low, "sq_step": self.step}
+
+    @classmethod
+    def train(cls, sample: np.ndarray, config: QuantizationConfig) -> "ScalarQuantizer":
+        return cls(sample.min(axis=0), sample.max(axis=0))
+
+    @property
+    def code_width(self) -> int:
+        return self.low.shape[0]
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        levels = np.rint((np.asarray(vectors, dtype=np.float32) - self.low) / self.step)
+        return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # x ~= low + (code + 128) * step, so q.x = q.low + 128 * (q*step).1 + code.(q*step)
+        scaled = query * self.step
+        offset = float(query @ self.low) + 128.0 * float(scaled.sum())
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            out[start : start + BLOCK_ROWS] = codes[start : start + BLOCK_ROWS].astype(np.float32) @ scaled
+        return out + offset
+
+
+class ProductQuantizer:
+    """Product quantization: one uint8 centroid id per sub-vector."""
+
+    def __init__(self, codebooks: np.ndarray) -> None:
+        # (subvectors, 256, sub_dimension)
+        self.codebooks = codebooks.astype(np.float32)
+
+    @classmethod
+    def from_state(cls, state: dict[str, np.ndarray]) -> "ProductQuantizer":
+        return cls(state["pq_codebooks"])
+
+    def state(self) -> dict[str, np.ndarray]:
+        return {"pq_codebooks": self.codebooks}
+
+    @classmethod
+    def train(cls, sample: np.ndarray, config: QuantizationConfig) -> "ProductQuantizer":
+        dimension = sample.shape[1]
+        subvectors = config.pq_subvectors or max(1, dimension // 8)
+        if dimension % subvectors:
+            raise ValueError(f"pq_subvectors={subvectors} does not divide dimension {dimension}")
+        rng = np.random.default_rng(config.seed)
+        if len(sample) > config.pq_train_sample:
+            sample = sample[rng.choice(len(sample), size=config.pq_train_sample, replace=False)]
+        width = dimension // subvectors
+        codebooks = np.zeros((subvectors, 256, width), dtype=np.float32)
+        for j in range(subvectors):
+            centroids = kmeans(sample[:, j * width : (j + 1) * width], 256, seed=config.seed + j, spherical=False)
+            codebooks[j, : len(centroids)] = centroids
+        return cls(codebooks)
+
+    @property
+    def code_width(self) -> int:
+        return self.codebooks.shape[0]
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        subvectors, _, width = self.codebooks.shape
+        codes = np.empty((len(vectors), subvectors), dtype=np.uint8)
+        for j in range(subvectors):
+            part = vectors[:, j * width : (j + 1) * width]
+            book = self.codebooks[j]
+            distances = part @ book.T - 0.5 * np.einsum("ij,ij->i", book, book)
+            codes[:, j] = np.argmax(distances, axis=1)
+        return codes
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        subvectors, _, width = self.codebooks.shape
+        table = np.einsum("jkw,jw->jk", self.codebooks, query.reshape(subvectors, width))
+        columns = np.arange(subvectors)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            out[start : start + BLOCK_ROWS] = table[columns, codes[start : start + BLOCK_ROWS]].sum(axis=1)
+        return out
+
+
+def quantizer_from_state(state: dict[str, np.ndarray]) -> ScalarQuantizer | ProductQuantizer | None:
+    """The quantizer saved in ``state`` by its ``state()`` method, if any."""
+    if "pq_codebooks" in state:
+        return ProductQuantizer.from_state(state)
+    if "sq_low" in state:
+        return ScalarQuantizer.from_state(state)
+    return None
+
+
+def train_quantizer(sample: np.ndarray, config: QuantizationConfig) -> ScalarQuantizer | ProductQuantizer:
+    if config.mode == "pq":
+        return ProductQuantizer.train(sample, config)
+    return ScalarQuantizer.train(sample, config)
@@ -0,0 +1,529 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+import anyio
+import numpy as np
+
+from .ann_index import AnnConfig
+from .payload_index import PayloadFilter
+from .quantization import QuantizationConfig
+from .vector_store import LocalVectorStore, SearchResult, VectorCollection, normalize
+
+MANIFEST = "manifest.json"
+TOMBSTONES = "tombstones.jsonl"
+
+
+def _write_json_atomic(path: Path, data: dict) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+@dataclass
+class MergePlan:
+    target: str
+    segments: list[str]
+    # Per merged segment, the rows that were live when the plan was made.
+    live_rows: dict[str, np.ndarray]
+
+
+class SegmentedCollection:
+    """User collection persisted as append-only segment files.
+
+    Layout of a collection directory::
+
+        manifest.json        dimension, ordered segment names, next segment number
+        seg-000001.f32       raw float32 rows (row-major, ``dimension`` wide)
+        seg-000001.jsonl     one {"id", "payload"} line per row
+        seg-000001.index.npz IVF centroids/assignments and quantizer codes of a sealed segment
+        tombstones.jsonl     one {"segment", "row"} line per deleted row
+
+    Sealed segments are opened with ``np.memmap`` so startup only parses the
+    small JSON sidecars and vector pages load on demand. New rows go to a single
+    active segment that is written through to disk and sealed once it reaches
+    ``segment_size`` rows. Every segment is a ``VectorCollection``; search runs
+    per segment and merges the per-segment top-k. Segments never train their
+    own index; the owning store trains them in the background and the result
+    is saved next to sealed segments so reopening does not retrain.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        user_id: str,
+        segment_size: int = 50_000,
+        ann: AnnConfig | None = None,
+        quantization: QuantizationConfig | None = None,
+    ) -> None:
+        self.path = path
+        self.user_id = user_id
+        self.segment_size = segment_size
+        self.ann = ann
+        self.quantization = quantization
+        self.dimension: int | None = None
+        self._segment_names: list[str] = []
+        self._segments: dict[str, VectorCollection] = {}
+        self._owner: dict[str, str] = {}
+        self._next_segment = 1
+        self._active: str | None = None
+        self._vector_file = None
+        self._row_file = None
+        self._tombstone_file = None
+        self.merging = False
+        self.path.mkdir(parents=True, exist_ok=True)
+        if (self.path / MANIFEST).exists():
+            self._load()
+        else:
+            self._write_manifest()
+
+    def __len__(self) -> int:
+        return len(self._owner)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._owner
+
+    @property
+    def segment_names(self) -> list[str]:
+        return list(self._segment_names)
+
+    @property
+    def active_segment(self) -> str | None:
+        return self._active
+
+    def segments(self) -> list[VectorCollection]:
+        return [self._segments[name] for name in self._segment_names]
+
+    def sealed_name(self, segment: VectorCollection) -> str | None:
+        """Name of ``segment`` if it is one of this collection's sealed segments."""
+        for name in self._segment_names:
+            if self._segments.get(name) is segment and name != self._active:
+                return name
+        return None
+
+    def save_index(self, name: str, state: dict[str, np.ndarray]) -> None:
+        """Write an ``index_state`` next to sealed segment ``name``; safe to run in a worker thread."""
+        path = self.path / f"{name}.index.npz"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as handle:
+            np.savez(handle, **state)
+        os.replace(tmp, path)
+
+    def upsert(self, doc_id: str, vector: Any, payload: dict[str, Any]) -> int:
+        vec = normalize(vector)
+        if self.dimension is None:
+            self.dimension = vec.shape[0]
+            self._write_manifest()
+        if vec.shape != (self.dimension,):
+            raise ValueError(f"expected vector of dimension {self.dimension}, got {vec.shape[0]}")
+        # Tombstone first: a crash between the two writes loses the document
+        # rather than leaving two live copies of it.
+        self.delete(doc_id)
+        active = self._active_segment()
+        row = active.upsert(doc_id, vec, payload)
+        self._vector_file.write(vec.tobytes())
+        self._vector_file.flush()
+        self._row_file.write(json.dumps({"id": doc_id, "payload": payload}) + "\n")
+        self._row_file.flush()
+        self._owner[doc_id] = self._active
+        if active.size >= self.segment_size:
+            self.seal()
+        return row
+
+    def delete(self, doc_id: str) -> bool:
+        name = self._owner.pop(doc_id, None)
+        if name is None:
+            return False
+        segment = self._segments[name]
+        row = segment.row_of(doc_id)
+        segment.delete(doc_id)
+        self._append_tombstone(name, row)
+        return True
+
+    def get_vector(self, doc_id: str) -> np.ndarray | None:
+        name = self._owner.get(doc_id)
+        return self._segments[name].get_vector(doc_id) if name else None
+
+    def get_payload(self, doc_id: str) -> dict[str, Any] | None:
+        name = self._owner.get(doc_id)
+        return self._segments[name].get_payload(doc_id) if name else None
+
+    def items(self) -> Iterator[tuple[str, np.ndarray, dict[str, Any]]]:
+        for name in self._segment_names:
+            yield from self._segments[name].items()
+
+    def search(
+        self,
+        query_vector: Any,
+        limit: int = 20,
+        threshold: float = 0.5,
+        type_filter: str | None = None,
+        exact: bool = False,
+        nprobe: int | None = None,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[SearchResult]:
+        results: list[SearchResult] = []
+        for name in self._segment_names:
+            results.extend(
+                self._segments[name].search(
+                    query_vector, limit, threshold, type_filter, exact, nprobe, payload_filter
+                )
+            )
+        results.sort(key=lambda item: item.score, reverse=True)
+        return results[:limit]
+
+    def memory_usage(self) -> dict[str, int]:
+        usage: dict[str, int] = {}
+        for name in self._segment_names:
+            for key, value in self._segments[name].memory_usage().items():
+                usage[key] = usage.get(key, 0) + value
+        return usage or VectorCollection().memory_usage()
+
+    def search_many(
+        self,
+        query_vectors: Any,
+        limit: int = 20,
+        threshold: float = 0.5,
+        block_size: int = 256,
+        payload_filter: PayloadFilter | None = None,
+        exact: bool = False,
+    ) -> list[list[SearchResult]]:
+        merged: list[list[SearchResult]] = [[] for _ in range(len(query_vectors))]
+        for name in self._segment_names:
+            per_segment = self._segments[name].search_many(
+                query_vectors, limit, threshold, block_size, payload_filter, exact
+            )
+            for results, found in zip(merged, per_segment):
+                results.extend(found)
+        for results in merged:
+            results.sort(key=lambda item: item.score, reverse=True)
+            del results[limit:]
+        return merged
+
+    def seal(self) -> None:
+        """Close the active segment and reopen it read-only via mmap."""
+        if self._active is None:
+            return
+        name = self._active
+        self._close_writers()
+        self._active = None
+        active = self._segments[name]
+        if active.ann_index is not None or active.quantizer is not None:
+            self.save_index(name, active.index_state())
+        self._segments[name] = self._open_segment(name, active.live_mask.copy())
+
+    def close(self) -> None:
+        self._close_writers()
+        if self._tombstone_file:
+            self._tombstone_file.close()
+            self._tombstone_file = None
+
+    def plan_merge(self, min_live_ratio: float = 0.5) -> MergePlan | None:
+        """Pick sealed segments worth rewriting: small ones and ones dominated by tombstones."""
+        if self.merging:
+            return None
+        small = self.segment_size // 4
+        chosen = []
+        for name in self._segment_names:
+            if name == self._active:
+                continue
+            segment = self._segments[name]
+            if segment.size == 0 or segment.size < small or len(segment) < segment.size * min_live_ratio:
+                chosen.append(name)
+        if not chosen or (len(chosen) == 1 and self._segments[chosen[0]].tombstones == 0):
+            return None
+        return MergePlan(
+            target=self._allocate_name(),
+            segments=chosen,
+            live_rows={name: np.flatnonzero(self._segments[name].live_mask) for name in chosen},
+        )
+
+    def write_merged(self, plan: MergePlan) -> None:
+        """Write the live rows of ``plan`` into its target segment; safe to run in a worker thread."""
+        with open(self.path / f"{plan.target}.f32", "wb") as vector_file, open(
+            self.path / f"{plan.target}.jsonl", "w"
+        ) as row_file:
+            for source in plan.segments:
+                segment = self._segments[source]
+                rows = plan.live_rows[source]
+                if rows.size == 0:
+                    continue
+                vector_file.write(np.ascontiguousarray(segment.vectors[rows], dtype=np.float32).tobytes())
+                for row in rows.tolist():
+                    row_file.write(json.dumps({"id": segment.id_at(row), "payload": segment.payload_at(row)}) + "\n")
+            vector_file.flush()
+            os.fsync(vector_file.fileno())
+            row_file.flush()
+            os.fsync(row_file.fileno())
+
+    def install_merge(self, plan: MergePlan) -> int:
+        """Swap a written merge into the manifest, re-applying deletes made meanwhile."""
+        merged = self._open_segment(plan.target, None)
+        dropped = 0
+        new_row = 0
+        for source in plan.segments:
+            segment = self._segments[source]
+            dropped += segment.size - plan.live_rows[source].size
+            for row in plan.live_rows[source].tolist():
+                doc_id = segment.id_at(row)
+                if self._owner.get(doc_id) == source and segment.row_of(doc_id) == row:
+                    self._owner[doc_id] = plan.target
+                else:
+                    merged.delete(doc_id)
+                    self._append_tombstone(plan.target, new_row)
+                new_row += 1
+        position = min(self._segment_names.index(source) for source in plan.segments)
+        names = [name for name in self._segment_names if name not in plan.segments]
+        if merged.size:
+            names.insert(position, plan.target)
+            self._segments[plan.target] = merged
+        self._segment_names = names
+        self._write_manifest()
+        if not merged.size:
+            plan.segments.append(plan.target)
+        for source in plan.segments:
+            self._segments.pop(source, None)
+            for suffix in (".f32", ".jsonl", ".index.npz"):
+                (self.path / f"{source}{suffix}").unlink(missing_ok=True)
+        self._rewrite_tombstones()
+        return dropped
+
+    def _active_segment(self) -> VectorCollection:
+        if self._active is None:
+            name = self._allocate_name()
+            self._segment_names.append(name)
+            self._segments[name] = VectorCollection(
+                self.dimension, auto_compact=False, ann=self.ann, quantization=self.quantization, inline_training=False
+            )
+            self._active = name
+            self._write_manifest()
+            self._vector_file = open(self.path / f"{name}.f32", "wb")
+            self._row_file = open(self.path / f"{name}.jsonl", "w")
+        return self._segments[self._active]
+
+    def _allocate_name(self) -> str:
+        name = f"seg-{self._next_segment:06d}"
+        self._next_segment += 1
+        return name
+
+    def _close_writers(self) -> None:
+        for handle in (self._vector_file, self._row_file):
+            if handle:
+                handle.close()
+        self._vector_file = None
+        self._row_file = None
+
+    def _append_tombstone(self, segment: str, row: int) -> None:
+        if self._tombstone_file is None:
+            self._tombstone_file = open(self.path / TOMBSTONES, "a")
+        self._tombstone_file.write(json.dumps({"segment": segment, "row": row}) + "\n")
+        self._tombstone_file.flush()
+
+    def _rewrite_tombstones(self) -> None:
+        if self._tombstone_file:
+            self._tombstone_file.close()
+            self._tombstone_file = None
+        lines = []
+        for name in self._segment_names:
+            segment = self._segments[name]
+            for row in np.flatnonzero(~segment.live_mask).tolist():
+                lines.append(json.dumps({"segment": name, "row": row}) + "\n")
+        tmp = self.path / (TOMBSTONES + ".tmp")
+        tmp.write_text("".join(lines))
+        os.replace(tmp, self.path / TOMBSTONES)
+
+    def _write_manifest(self) -> None:
+        _write_json_atomic(
+            self.path / MANIFEST,
+            {
+                "user_id": self.user_id,
+                "dimension": self.dimension,
+                "segments": self._segment_names,
+                "next_segment": self._next_segment,
+            },
+        )
+
+    def _load(self) -> None:
+        manifest = json.loads((self.path / MANIFEST).read_text())
+        self.dimension = manifest["dimension"]
+        self._segment_names = manifest["segments"]
+        self._next_segment = manifest["next_segment"]
+        dead: dict[str, set[int]] = {}
+        tombstone_path = self.path / TOMBSTONES
+        if tombstone_path.exists():
+            for line in tombstone_path.read_text().splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn final line
+                dead.setdefault(entry["segment"], set()).add(entry["row"])
+        for name in self._segment_names:
+            self._segments[name] = self._open_segment(name, None, dead.get(name, set()))
+        # A document lives in at most one row; later rows win over earlier ones.
+        for name in self._segment_names:
+            segment = self._segments[name]
+            for doc_id, _, _ in list(segment.items()):
+                previous = self._owner.get(doc_id)
+                if previous is not None:
+                    self._segments[previous].delete(doc_id)
+                self._owner[doc_id] = name
+
+    def _open_segment(
+        self,
+        name: str,
+        alive: np.ndarray | None,
+        dead: set[int] | None = None,
+    ) -> VectorCollection:
+        ids: list[str] = []
+        payloads: list[dict[str, Any]] = []
+        row_path = self.path / f"{name}.jsonl"
+        if row_path.exists():
+            for line in row_path.read_text().splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn final line
+                ids.append(entry["id"])
+                payloads.append(entry["payload"])
+        vector_path = self.path / f"{name}.f32"
+        dimension = self.dimension or 0
+        row_bytes = dimension * 4
+        file_rows = vector_path.stat().st_size // row_bytes if row_bytes and vector_path.exists() else 0
+        rows = min(len(ids), file_rows)
+        ids, payloads = ids[:rows], payloads[:rows]
+        if rows:
+            vectors = np.memmap(vector_path, dtype=np.float32, mode="r", shape=(rows, dimension))
+        else:
+            vectors = np.zeros((0, dimension), dtype=np.float32)
+        if alive is None:
+            alive = np.ones(rows, dtype=bool)
+            for row in dead or ():
+                if row < rows:
+                    alive[row] = False
+            # Within a segment a re-upserted id keeps only its last row.
+            seen: set[str] = set()
+            for row in range(rows - 1, -1, -1):
+                if ids[row] in seen:
+                    alive[row] = False
+                seen.add(ids[row])
+        segment = VectorCollection.from_arrays(
+            vectors,
+            ids,
+            payloads,
+            np.array(alive[:rows], dtype=bool),
+            ann=self.ann,
+            quantization=self.quantization,
+            inline_training=False,
+        )
+        index_path = self.path / f"{name}.index.npz"
+        if index_path.exists():
+            try:
+                with np.load(index_path) as saved:
+                    segment.restore_index({key: saved[key] for key in saved.files})
+            except (OSError, ValueError, KeyError):
+                pass  # unreadable or stale: the store retrains in the background
+        return segment
+
+
+class PersistentVectorStore(LocalVectorStore):
+    """Vector store whose per-user collections survive restarts.
+
+    Collections are opened lazily from ``root`` on first use. Sealed segments
+    are merged in the background so tombstoned rows are eventually dropped.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        segment_size: int = 50_000,
+        ann: AnnConfig | None = None,
+        quantization: QuantizationConfig | None = None,
+        passages: LocalVectorStore | None = None,
+    ) -> None:
+        super().__init__(ann=ann, quantization=quantization, passages=passages)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self._merge_tasks: set[asyncio.Task] = set()
+
+    async def upsert(
+        self,
+        user_id: str,
+        doc_id: str,
+        vector: list[float],
+        payload: dict[str, Any],
+    ) -> bool:
+        await super().upsert(user_id, doc_id, vector, payload)
+        if self._get_collection(user_id).active_segment is None:
+            # The upsert sealed the active segment.
+            self._schedule_merge(user_id)
+        return True
+
+    async def merge_segments(self, user_id: str) -> int:
+        """Rewrite small or tombstone-heavy segments; returns the number of rows dropped."""
+        collection = self._get_collection(user_id)
+        if collection is None:
+            return 0
+        plan = collection.plan_merge()
+        if plan is None:
+            return 0
+        collection.merging = True
+        try:
+            await anyio.to_thread.run_sync(collection.write_merged, plan)
+            return collection.install_merge(plan)
+        finally:
+            collection.merging = False
+
+    def user_ids(self) -> list[str]:
+        """User ids with a collection on disk."""
+        users = []
+        for manifest in self.root.glob(f"*/{MANIFEST}"):
+            users.append(json.loads(manifest.read_text())["user_id"])
+        return users
+
+    def close(self) -> None:
+        for collection in self.collections.values():
+            collection.close()
+        if isinstance(self.passages, PersistentVectorStore):
+            self.passages.close()
+
+    def _trainable(self, user_id: str) -> list[VectorCollection]:
+        collection = self._get_collection(user_id)
+        return collection.segments() if collection is not None else []
+
+    async def _trained(self, user_id: str, segment: VectorCollection) -> None:
+        collection = self._get_collection(user_id)
+        name = collection.sealed_name(segment) if collection is not None else None
+        if name is not None:
+            await anyio.to_thread.run_sync(collection.save_index, name, segment.index_state())
+
+    def _schedule_merge(self, user_id: str) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.merge_segments(user_id))
+        self._merge_tasks.add(task)
+        task.add_done_callback(self._merge_tasks.discard)
+
+    def _get_collection(self, user_id: str, create: bool = False) -> SegmentedCollection | None:
+        name = f"user_{user_id}"
+        collection = self.collections.get(name)
+        if collection is None and (create or (self._collection_path(user_id) / MANIFEST).exists()):
+            collection = self.collections[name] = self._new_collection(user_id)
+        return collection
+
+    def _new_collection(self, user_id: str) -> SegmentedCollection:
+        return SegmentedCollection(
+            self._collection_path(user_id), user_id, self.segment_size, self.ann, self.quantization
+        )
+
+    def _collection_path(self, user_id: str) -> Path:
+        # Hash the id so arbitrary user ids map to safe directory names.
+        return self.root / hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable
+
+import anyio
+
+from .memory_store import MemoryRecord, MemoryStore, MemorySummary
+from .payload_index import PayloadFilter
+from .utils import now_utc
+
+SHARD_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+# Written next to shards.db once an unsharded memory.db has been imported.
+LEGACY_MARKER = "legacy-imported"
+
+
+class ShardMap:
+    """Which shard holds each user, persisted in ``shards.db``.
+
+    Users without an assignment hash to one of ``shard_count`` shared shards
+    (``shard-00``...). Assignments pin a user elsewhere, typically a large
+    tenant to a file of its own. ``shard_count`` must not change once data
+    has been written, since that would re-hash every unpinned user.
+    Assignments made by another process (the admin CLI) are picked up through
+    ``PRAGMA data_version``: on every ``shard_for`` call, or for
+    ``cached_shard_for`` once ``refresh`` has run, which async callers do in a
+    worker thread when ``needs_refresh`` says ``refresh_interval`` has passed.
+    """
+
+    def __init__(self, path: str | Path, shard_count: int, refresh_interval: float = 1.0) -> None:
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self.path = Path(path)
+        self.shard_count = shard_count
+        self.refresh_interval = refresh_interval
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS assignments (user_id TEXT PRIMARY KEY, shard TEXT NOT NULL, "
+                "assigned_at TEXT NOT NULL)"
+            )
+        self._version: int | None = None
+        self._refreshed_at = float("-inf")
+        self._assigned: dict[str, str] = {}
+
+    def hashed_shard(self, user_id: str) -> str:
+        # blake2b rather than hash(): the mapping must survive restarts.
+        digest = hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest()
+        return f"shard-{int.from_bytes(digest, 'big') % self.shard_count:02d}"
+
+    def shard_for(self, user_id: str) -> str:
+        self.refresh()
+        return self.cached_shard_for(user_id)
+
+    def cached_shard_for(self, user_id: str) -> str:
+        """``shard_for`` from the assignments as of the last refresh, without touching the database."""
+        return self._assigned.get(user_id) or self.hashed_shard(user_id)
+
+    def needs_refresh(self) -> bool:
+        return time.monotonic() - self._refreshed_at >= self.refresh_interval
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._refresh()
+
+    def assign(self, user_id: str, shard: str) -> None:
+        """Pin ``user_id`` to ``shard``; assigning the hashed shard removes the pin."""
+        if not SHARD_NAME.match(shard):
+            raise ValueError(f"invalid shard name {shard!r}")
+        with self._lock, self._conn:
+            if shard == self.hashed_shard(user_id):
+                self._conn.execute("DELETE FROM assignments WHERE user_id = ?", (user_id,))
+                self._assigned.pop(user_id, None)
+            else:
+                self._conn.execute(
+                    "INSERT INTO assignments (user_id, shard, assigned_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET shard = excluded.shard, assigned_at = excluded.assigned_at",
+                    (user_id, shard, now_utc().isoformat()),
+                )
+                self._assigned[user_id] = shard
+
+    def assignments(self) -> dict[str, str]:
+        with self._lock:
+            self._refresh()
+            return dict(self._assigned)
+
+    def shards(self) -> list[str]:
+        """Every shard that can hold data: the hashed ones plus any assignment target."""
+        hashed = [f"shard-{index:02d}" for index in range(self.shard_count)]
+        return hashed + sorted(set(self.assignments().values()) - set(hashed))
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _refresh(self) -> None:
+        # data_version only moves when another connection commits.
+        self._refreshed_at = time.monotonic()
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._version:
+            self._assigned = dict(self._conn.execute("SELECT user_id, shard FROM assignments"))
+            self._version = version
+
+
+class ShardedMemoryStore:
+    """``MemoryStore`` API over one SQLite file per shard.
+
+    SQLite serialises writers per database file, so spreading users over
+    files lets tenants ingest concurrently. Every per-user call goes to the
+    user's shard with the same signature as ``MemoryStore``; only admin and
+    maintenance calls without a ``user_id`` (event pruning, compression)
+    fan out to all shards. Shard stores open lazily as ``<base_dir>/<shard>.db``
+    with ``store_options`` passed to each ``MemoryStore``. Routing never
+    touches SQLite on the event loop: the shard map is refreshed and shards
+    are opened (and migrated) in worker threads.
+    """
+
+    def __init__(
+        self, base_dir: str | Path, shard_count: int = 8, refresh_interval: float = 1.0, **store_options: Any
+    ) -> None:
+        self.base_dir = Path(base_dir)
+        self.shard_map = ShardMap(self.base_dir / "shards.db", shard_count, refresh_interval)
+        self.store_options = store_options
+        self._stores: dict[str, MemoryStore] = {}
+        self._stores_lock = threading.Lock()
+        self._moving: dict[str, asyncio.Event] = {}
+
+    def store(self, shard: str) -> MemoryStore:
+        with self._stores_lock:
+            store = self._stores.get(shard)
+            if store is None:
+                store = MemoryStore(self.base_dir / f"{shard}.db", **self.store_options)
+                self._stores[shard] = store
+            return store
+
+    async def open_store(self, shard: str) -> MemoryStore:
+        """``store`` for async callers; opening a shard runs its migrations in a worker thread."""
+        store = self._stores.get(shard)
+        if store is None:
+            store = await anyio.to_thread.run_sync(self.store, shard)
+        return store
+
+    async def _route(self, user_id: str) -> MemoryStore:
+        # Calls for a tenant that is being moved wait until the move is done.
+        while (moving := self._moving.get(user_id)) is not None:
+            await moving.wait()
+        if self.shard_map.needs_refresh():
+            await anyio.to_thread.run_sync(self.shard_map.refresh)
+        return await self.open_store(self.shard_map.cached_shard_for(user_id))
+
+    async def _all_stores(self) -> list[MemoryStore]:
+        return [await self.open_store(shard) for shard in await anyio.to_thread.run_sync(self.shard_map.shards)]
+
+    async def move_user(self, user_id: str, shard: str) -> int:
+        """Move a user's data to ``shard`` and repoint the shard map; returns entries moved.
+
+        The target is written in one transaction before the map changes and
+        the source copy is removed last, so an interruption leaves the user
+        readable from the old shard. Calls for the user made through this
+        store wait for the move; writers in other processes should be quiet.
+        """
+        if not SHARD_NAME.match(shard):
+            raise ValueError(f"invalid shard name {shard!r}")
+        while (moving := self._moving.get(user_id)) is not None:
+            await moving.wait()
+        self._moving[user_id] = asyncio.Event()
+        try:
+            source = await self.open_store(await anyio.to_thread.run_sync(self.shard_map.shard_for, user_id))
+            target = await self.open_store(shard)
+            if source is target:
+                return 0
+            moved = await source.copy_user(user_id, target)
+            await anyio.to_thread.run_sync(self.shard_map.assign, user_id, shard)
+            await source.delete_user(user_id)
+            return moved
+        finally:
+            self._moving.pop(user_id).set()
+
+    async def import_store(self, legacy: MemoryStore) -> dict[str, int]:
+        """Copy every user of an unsharded ``MemoryStore`` into their shard; returns entries per user."""
+        imported = {}
+        for user_id in await legacy.user_ids():
+            imported[user_id] = await legacy.copy_user(user_id, await self._route(user_id))
+        return imported
+
+    async def import_legacy_once(self, path: str | Path) -> dict[str, int] | None:
+        """Import the unsharded ``memory.db`` at ``path`` unless that already happened.
+
+        Returns entries imported per user, or None when there was nothing to
+        do. The ``LEGACY_MARKER`` file keeps the import from running twice.
+        If the shards already hold entries but the marker is missing, it is
+        unclear which copy is current, so this raises instead of merging.
+        """
+        path = Path(path)
+        if (self.base_dir / LEGACY_MARKER).exists() or not path.exists():
+            return None
+        legacy = await anyio.to_thread.run_sync(MemoryStore, path)
+        try:
+            if not await legacy.entry_counts():
+                imported = {}
+            elif await self.entry_counts():
+                raise RuntimeError(
+                    f"{path} holds entries that were never imported into {self.base_dir}, which already has "
+                    f"data; run `python -m jobs.storage_admin import-legacy {path}` or move the file aside"
+                )
+            else:
+                imported = await self.import_store(legacy)
+        finally:
+            legacy.close()
+        await anyio.to_thread.run_sync(self.mark_legacy_imported, path)
+        return imported
+
+    def mark_legacy_imported(self, path: str | Path) -> None:
+        (self.base_dir / LEGACY_MARKER).write_text(f"{Path(path).resolve()} {now_utc().isoformat()}\n")
+
+    async def shard_report(self) -> list[dict]:
+        """Users and entries per shard, for deciding which tenants to move."""
+        report = []
+        for shard in await anyio.to_thread.run_sync(self.shard_map.shards):
+            counts = await (await self.open_store(shard)).entry_counts()
+            report.append(
+                {
+                    "shard": shard,
+                    "users": len(counts),
+                    "entries": sum(counts.values()),
+                    "largest": sorted(counts.items(), key=lambda item: item[1], reverse=True)[:5],
+                }
+            )
+        return report
+
+    def write_stats(self) -> dict[str, dict[str, float]]:
+        """``MemoryStore.write_stats`` of every open shard."""
+        with self._stores_lock:
+            return {shard: store.write_stats() for shard, store in self._stores.items()}
+
+    def close(self) -> None:
+        with self._stores_lock:
+            stores, self._stores = list(self._stores.values()), {}
+        for store in stores:
+            store.close()
+        self.shard_map.close()
+
+    async def upsert(self, record: MemoryRecord) -> None:
+        await (await self._route(record.user_id)).upsert(record)
+
+    async def upsert_many(self, records: list[MemoryRecord]) -> None:
+        grouped = await self._group(records, lambda record: record.user_id)
+        await asyncio.gather(*(store.upsert_many(group) for store, group in grouped))
+
+    async def get(self, user_id: str, entry_id: str) -> MemoryRecord | None:
+        return await (await self._route(user_id)).get(user_id, entry_id)
+
+    async def get_many(self, user_id: str, entry_ids: Iterable[str]) -> dict[str, MemoryRecord]:
+        return await (await self._route(user_id)).get_many(user_id, entry_ids)
+
+    async def list(
+        self,
+        user_id: str,
+        content_type: str | None,
+        limit: int,
+        offset: int,
+        sort_by: str,
+    ) -> list[MemoryRecord]:
+        return await (await self._route(user_id)).list(user_id, content_type, limit, offset, sort_by)
+
+    async def list_page(
+        self,
+        user_id: str,
+        content_type: str | None,
+        limit: int,
+        sort_by: str,
+        cursor: str | None = None,
+    ) -> tuple[list[MemoryRecord], str | None]:
+        return await (await self._route(user_id)).list_page(user_id, content_type, limit, sort_by, cursor)
+
+    async def delete(self, user_id: str, entry_id: str) -> bool:
+        return await (await self._route(user_id)).delete(user_id, entry_id)
+
+    async def delete_many(self, user_id: str, entry_ids: list[str]) -> int:
+        return await (await self._route(user_id)).delete_many(user_id, entry_ids)
+
+    async def update_access(
+        self,
+        user_id: str,
+        entry_id: str,
+        accessed_at_us: int | None = None,
+        increment: int = 1,
+        reset_decay: bool = True,
+    ) -> None:
+        await (await self._route(user_id)).update_access(user_id, entry_id, accessed_at_us, increment, reset_decay)
+
+    async def update_access_many(self, accesses: list[tuple[str, str, int, int]]) -> None:
+        grouped = await self._group(accesses, lambda access: access[0])
+        await asyncio.gather(*(store.update_access_many(group) for store, group in grouped))
+
+    async def update_related_entries(self, user_id: str, entry_id: str, related_entries: list[str]) -> None:
+        await (await self._route(user_id)).update_related_entries(user_id, entry_id, related_entries)
+
+    async def update_related_many(self, user_id: str, related: dict[str, list[str]]) -> None:
+        await (await self._route(user_id)).update_related_many(user_id, related)
+
+    async def add_related_many(self, user_id: str, links: list[tuple[str, str]]) -> None:
+        await (await self._route(user_id)).add_related_many(user_id, links)
+
+    async def add_edges(self, user_id: str, edges: list[tuple[str, str, float | None]]) -> None:
+        await (await self._route(user_id)).add_edges(user_id, edges)
+
+    async def replace_edges(self, user_id: str, edges: dict[str, list[tuple[str, float | None]]]) -> None:
+        await (await self._route(user_id)).replace_edges(user_id, edges)
+
+    async def get_backlinks(self, user_id: str, entry_id: str) -> list[str]:
+        return await (await self._route(user_id)).get_backlinks(user_id, entry_id)
+
+    async def update_decay(self, user_id: str, entry_id: str, new_decay: float) -> None:
+        await (await self._route(user_id)).update_decay(user_id, entry_id, new_decay)
+
+    async def update_decay_many(self, user_id: str, decays: dict[str, float]) -> None:
+        await (await self._route(user_id)).update_decay_many(user_id, decays)
+
+    async def update_content_fields(
+        self, user_id: str, entry_id: str, title: str, preview: str, tags: list[str]
+    ) -> None:
+        await (await self._route(user_id)).update_content_fields(user_id, entry_id, title, preview, tags)
+
+    async def list_all(self, user_id: str) -> list[MemoryRecord]:
+        return await (await self._route(user_id)).list_all(user_id)
+
+    async def search_text(
+        self,
+        user_id: str,
+        query: str,
+        limit: int = 20,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[tuple[str, float]]:
+        return await (await self._route(user_id)).search_text(user_id, query, limit, payload_filter)
+
+    async def iter_summaries(self, user_id: str, page_size: int = 1000) -> AsyncIterator[list[MemorySummary]]:
+        store = await self._route(user_id)
+        async for page in store.iter_summaries(user_id, page_size):
+            yield page
+
+    async def load_content(self, user_id: str, entry_ids: Iterable[str]) -> dict[str, str]:
+        return await (await self._route(user_id)).load_content(user_id, entry_ids)
+
+    async def add_compounding_event(self, user_id: str, event_type: str, details: dict) -> None:
+        await (await self._route(user_id)).add_compounding_event(user_id, event_type, details)
+
+    async def add_compounding_events(self, events: list[tuple[str, str, int, dict]]) -> None:
+        grouped = await self._group(events, lambda event: event[0])
+        await asyncio.gather(*(store.add_compounding_events(group) for store, group in grouped))
+
+    async def last_compounding_event_at(self, user_id: str) -> int | None:
+        return await (await self._route(user_id)).last_compounding_event_at(user_id)
+
+    async def get_event_rollups(self, user_id: str, since_day: str | None = None) -> list[dict]:
+        return await (await self._route(user_id)).get_event_rollups(user_id, since_day)
+
+    async def prune_compounding_events(self, before_us: int) -> int:
+        return sum([await store.prune_compounding_events(before_us) for store in await self._all_stores()])
+
+    async def get_compounding_events(self, user_id: str, limit: int) -> list[dict]:
+        return await (await self._route(user_id)).get_compounding_events(user_id, limit)
+
+    async def stats(self, user_id: str) -> dict:
+        return await (await self._route(user_id)).stats(user_id)
+
+    async def entry_counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for store in await self._all_stores():
+            counts.update(await store.entry_counts())
+        return counts
+
+    async def repair_user_stats(self, user_id: str | None = None) -> int:
+        if user_id is not None:
+            return await (await self._route(user_id)).repair_user_stats(user_id)
+        return sum([await store.repair_user_stats() for store in await self._all_stores()])
+
+    async def train_content_dictionary(self, sample_size: int = 2000, size: int = 32 * 1024) -> int | None:
+        """Train one dictionary per shard (ids are per shard); returns the highest new id."""
+        trained = [await store.train_content_dictionary(sample_size, size) for store in await self._all_stores()]
+        return max((dictionary_id for dictionary_id in trained if dictionary_id is not None), default=None)
+
+    async def compress_content(self, user_id: str | None = None, batch_size: int = 500) -> int:
+        if user_id is not None:
+            return await (await self._route(user_id)).compress_content(user_id, batch_size)
+        return sum([await store.compress_content(None, batch_size) for store in await self._all_stores()])
+
+    async def compression_report(self) -> list[dict]:
+        report = [row for store in await self._all_stores() for row in await store.compression_report()]
+        return sorted(report, key=lambda row: row["user_id"])
+
+    async def _group(self, items: list, user_of) -> list[tuple[MemoryStore, list]]:
+        groups: dict[int, tuple[MemoryStore, list]] = {}
+        routes: dict[str, MemoryStore] = {}
+        for item in items:
+            user_id = user_of(item)
+            if user_id not in routes:
+                routes[user_id] = await self._route(user_id)
+            store = routes[user_id]
+            groups.setdefault(id(store), (store, []))[1].append(item)
+        return list(groups.values())
@@ -1,12 +1,41 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
 
 
 def now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def now_us() -> int:
+    """Current time as integer microseconds since the Unix epoch (UTC)."""
+    return time.time_ns() // 1000
+
+
+def to_epoch_us(value: datetime) -> int:
+    """Exact epoch microseconds of ``value``; naive datetimes are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_epoch_us(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def iso_to_epoch_us(value: str | None) -> int | None:
+    return to_epoch_us(datetime.fromisoformat(value)) if value else None
+
+
+def utc_day(value_us: int) -> str:
+    """``YYYY-MM-DD`` of the UTC day containing ``value_us``."""
+    return from_epoch_us(value_us).date().isoformat()
+
+
 def estimate_token_count(text: str) -> int:
     # Rough heuristic: ~4 chars per token in English
     if not text:
@@ -14,10 +43,10 @@ def estimate_token_count(text: str) -> int:
     return max(1, len(text) // 4)
 
 
-def recency_score(created_at: datetime, now: datetime | None = None, half_life_days: int = 14) -> float:
+def recency_score(created_at_us: int, now: int | None = None, half_life_days: int = 14) -> float:
     if not now:
-        now = now_utc()
-    delta = max((now - created_at).total_seconds(), 0)
+        now = now_us()
+    delta = max((now - created_at_us) / 1_000_000, 0)
     half_life_seconds = half_life_days * 86400
     if half_life_seconds <= 0:
         return 1.0
@@ -1,9 +1,24 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
+import asyncio
+import logging
+from dataclasses import dataclass, replace
+from typing import Any, Iterator
 
-from .utils import cosine_similarity
+import anyio
+import numpy as np
+
+from .ann_index import AnnConfig, IVFIndex, recall_at_k
+from .payload_index import PayloadFilter, PayloadIndex
+from .quantization import (
+    ProductQuantizer,
+    QuantizationConfig,
+    ScalarQuantizer,
+    quantizer_from_state,
+    train_quantizer,
+)
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -13,16 +28,498 @@ class SearchResult:
     payload: dict[str, Any]
 
 
+@dataclass
+class TrainedIndex:
+    """IVF index and quantizer trained on a snapshot of a collection's first ``size`` rows."""
+
+    generation: int
+    size: int
+    live: np.ndarray
+    ann_index: IVFIndex | None = None
+    quantizer: ScalarQuantizer | ProductQuantizer | None = None
+    codes: np.ndarray | None = None
+
+
+def passage_id(parent_id: str, index: int) -> str:
+    """Id of the ``index``-th passage vector of ``parent_id`` in a passage store."""
+    return f"{parent_id}#{index}"
+
+
+def normalize(vector: Any) -> np.ndarray:
+    """Return ``vector`` as a unit-length float32 array (zero vectors stay zero)."""
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    if norm == 0.0:
+        return arr.copy()
+    return arr / norm
+
+
+def normalize_rows(vectors: Any) -> np.ndarray:
+    """Row-wise ``normalize`` for a 2-D block of vectors."""
+    arr = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    return np.divide(arr, norms, out=np.zeros_like(arr), where=norms > 0)
+
+
+def top_k(scores: np.ndarray, limit: int, threshold: float) -> np.ndarray:
+    """Indices of the best ``limit`` scores at or above ``threshold``, best first.
+
+    ``-inf`` marks masked-out rows and is never returned, whatever the threshold.
+    """
+    candidates = np.flatnonzero((scores >= threshold) & (scores > -np.inf))
+    if limit <= 0 or candidates.size == 0:
+        return candidates[:0]
+    if candidates.size > limit:
+        part = np.argpartition(scores[candidates], -limit)[-limit:]
+        candidates = candidates[part]
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
+
+
+class VectorCollection:
+    """Contiguous float32 matrix of unit vectors for one user collection.
+
+    Rows are append-only: re-upserting a document tombstones its old row and
+    appends a new one, and deletes only clear the row's ``alive`` flag. The
+    matrix is compacted once tombstones make up more than half of it.
+
+    With an ``AnnConfig`` the collection builds an IVF index once it holds
+    ``ann.min_size`` live rows and searches only the probed clusters from then on.
+    A ``PayloadIndex`` over type, tags and ``created_at`` turns filters into
+    candidate rows before scoring. With a ``QuantizationConfig`` candidates are scored on compressed codes and
+    only the best ``limit * rescore`` are rescored on the float32 rows.
+
+    With ``inline_training=False`` the collection never trains on its own;
+    the owner calls ``train`` (safe in a worker thread) and ``install`` when
+    ``needs_training`` says so, and searches stay exact until then.
+    """
+
+    def __init__(
+        self,
+        dimension: int | None = None,
+        initial_capacity: int = 64,
+        auto_compact: bool = True,
+        ann: AnnConfig | None = None,
+        quantization: QuantizationConfig | None = None,
+        inline_training: bool = True,
+    ) -> None:
+        self.dimension = dimension
+        self.auto_compact = auto_compact
+        self.ann = ann
+        self.quantization = quantization
+        self.inline_training = inline_training
+        # Bumped whenever rows are renumbered, which invalidates a training snapshot.
+        self._generation = 0
+        self._ann_index: IVFIndex | None = None
+        self._quantizer: ScalarQuantizer | ProductQuantizer | None = None
+        self._codes: np.ndarray | None = None
+        self._quantized_rows = 0
+        self._capacity = initial_capacity
+        self._vectors = np.zeros((0, dimension or 0), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids: list[str] = []
+        self._payloads: list[dict[str, Any]] = []
+        self._rows: dict[str, int] = {}
+        self._payload_index = PayloadIndex()
+        self._size = 0
+
+    @classmethod
+    def from_arrays(
+        cls,
+        vectors: np.ndarray,
+        ids: list[str],
+        payloads: list[dict[str, Any]],
+        alive: np.ndarray,
+        ann: AnnConfig | None = None,
+        quantization: QuantizationConfig | None = None,
+        inline_training: bool = True,
+    ) -> "VectorCollection":
+        """Wrap existing (possibly memory-mapped) rows without copying them.
+
+        Collections built this way are read-only apart from deletes, and are
+        never compacted in place.
+        """
+        collection = cls(
+            dimension=vectors.shape[1],
+            auto_compact=False,
+            ann=ann,
+            quantization=quantization,
+            inline_training=inline_training,
+        )
+        collection._vectors = vectors
+        collection._alive = alive
+        collection._ids = ids
+        collection._payloads = payloads
+        collection._rows = {ids[row]: row for row in np.flatnonzero(alive).tolist()}
+        collection._payload_index = PayloadIndex.build(payloads)
+        collection._size = len(ids)
+        return collection
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._rows
+
+    @property
+    def size(self) -> int:
+        """Number of rows, including tombstones."""
+        return self._size
+
+    @property
+    def tombstones(self) -> int:
+        return self._size - len(self._rows)
+
+    @property
+    def ann_index(self) -> IVFIndex | None:
+        return self._ann_index
+
+    @property
+    def quantizer(self) -> ScalarQuantizer | ProductQuantizer | None:
+        return self._quantizer
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """All rows of the matrix, including tombstoned ones."""
+        return self._vectors[: self._size]
+
+    @property
+    def live_mask(self) -> np.ndarray:
+        return self._alive[: self._size]
+
+    def row_of(self, doc_id: str) -> int | None:
+        return self._rows.get(doc_id)
+
+    def id_at(self, row: int) -> str:
+        return self._ids[row]
+
+    def payload_at(self, row: int) -> dict[str, Any]:
+        return self._payloads[row]
+
+    def upsert(self, doc_id: str, vector: Any, payload: dict[str, Any]) -> int:
+        vec = normalize(vector)
+        if self.dimension is None:
+            self.dimension = vec.shape[0]
+        if vec.shape != (self.dimension,):
+            raise ValueError(f"expected vector of dimension {self.dimension}, got {vec.shape[0]}")
+        if doc_id in self._rows:
+            self._kill(self._rows[doc_id])
+        row = self._append(vec)
+        self._ids.append(doc_id)
+        self._payloads.append(payload)
+        self._rows[doc_id] = row
+        self._payload_index.add(row, payload)
+        if self._ann_index is not None:
+            self._ann_index.add(row, vec)
+        if self._quantizer is not None:
+            self._store_code(row, vec)
+        self._maybe_train()
+        return row
+
+    def delete(self, doc_id: str) -> bool:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+        self._kill(row)
+        if self.auto_compact and self.tombstones * 2 > self._size:
+            self.compact()
+        return True
+
+    def get_vector(self, doc_id: str) -> np.ndarray | None:
+        row = self._rows.get(doc_id)
+        if row is None:
+            return None
+        return self._vectors[row]
+
+    def get_payload(self, doc_id: str) -> dict[str, Any] | None:
+        row = self._rows.get(doc_id)
+        return self._payloads[row] if row is not None else None
+
+    def items(self) -> Iterator[tuple[str, np.ndarray, dict[str, Any]]]:
+        for doc_id, row in self._rows.items():
+            yield doc_id, self._vectors[row], self._payloads[row]
+
+    def search(
+        self,
+        query_vector: Any,
+        limit: int = 20,
+        threshold: float = 0.5,
+        type_filter: str | None = None,
+        exact: bool = False,
+        nprobe: int | None = None,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[SearchResult]:
+        """Top ``limit`` rows scoring at least ``threshold``.
+
+        Filters are resolved through the payload index to a candidate row set
+        before any similarity work. Uses the IVF index (when the candidate set
+        is large) and quantized codes when they are built, unless ``exact`` is
+        set; ``nprobe`` overrides the configured number of probed clusters.
+        Returned scores are always exact cosine similarities.
+        """
+        if not self._rows:
+            return []
+        query = normalize(query_vector)
+        if query.shape != (self.dimension,):
+            return []
+        if type_filter:
+            payload_filter = replace(payload_filter or PayloadFilter(), content_types=[type_filter])
+        mask = self._alive[: self._size]
+        rows: np.ndarray | None = None
+        if payload_filter is not None and payload_filter.active:
+            mask = mask & self._payload_index.mask(payload_filter, self._size)
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return []
+        if not exact:
+            self._maybe_train()
+            if self._ann_index is not None and (rows is None or rows.size > self.ann.min_size):
+                rows = self._ann_index.candidates(query, nprobe)
+                rows = rows[mask[rows]]
+            budget = limit * self.quantization.rescore if self.quantization else 0
+            if self._quantizer is not None and (rows is None or rows.size > budget):
+                if rows is None:
+                    approximate = np.where(mask, self._quantizer.score(self._codes[: self._size], query), -np.inf)
+                    rows = np.sort(top_k(approximate, budget, -np.inf))
+                else:
+                    approximate = self._quantizer.score(self._codes[rows], query)
+                    rows = np.sort(rows[top_k(approximate, budget, -np.inf)])
+        if rows is None:
+            scores = np.where(mask, self._vectors[: self._size] @ query, -np.inf)
+            return [self._result(int(row), float(scores[row])) for row in top_k(scores, limit, threshold)]
+        scores = self._vectors[rows] @ query
+        return [self._result(int(rows[i]), float(scores[i])) for i in top_k(scores, limit, threshold)]
+
+    def search_many(
+        self,
+        query_vectors: Any,
+        limit: int = 20,
+        threshold: float = 0.5,
+        block_size: int = 256,
+        payload_filter: PayloadFilter | None = None,
+        exact: bool = False,
+    ) -> list[list[SearchResult]]:
+        """Per-query top-k for a block of queries.
+
+        Exact search scores ``block_size`` queries at a time with one matrix
+        product, so peak memory is ``block_size * rows`` floats. Once an IVF
+        index or quantizer is built each query goes through ``search`` instead,
+        which avoids the full product on large collections.
+        """
+        queries = normalize_rows(query_vectors) if len(query_vectors) else np.zeros((0, self.dimension or 0))
+        if not self._rows or queries.shape[1] != self.dimension:
+            return [[] for _ in range(len(queries))]
+        if not exact:
+            self._maybe_train()
+            if self._ann_index is not None or self._quantizer is not None:
+                return [self.search(query, limit, threshold, payload_filter=payload_filter) for query in queries]
+        mask = self._alive[: self._size]
+        if payload_filter is not None and payload_filter.active:
+            mask = mask & self._payload_index.mask(payload_filter, self._size)
+        matrix = self._vectors[: self._size]
+        results: list[list[SearchResult]] = []
+        for start in range(0, len(queries), block_size):
+            scores = queries[start : start + block_size] @ matrix.T
+            scores[:, ~mask] = -np.inf
+            for row_scores in scores:
+                results.append(
+                    [self._result(int(row), float(row_scores[row])) for row in top_k(row_scores, limit, threshold)]
+                )
+        return results
+
+    def memory_usage(self) -> dict[str, int]:
+        """Bytes held for vectors, and what the same rows would cost unquantized."""
+        live = len(self._rows)
+        dimension = self.dimension or 0
+        resident_floats = 0 if isinstance(self._vectors, np.memmap) else self._size * dimension * 4
+        code_bytes = self._codes[: self._size].nbytes if self._codes is not None else 0
+        return {
+            "vectors": live,
+            # A list of Python floats: 56-byte list header, an 8-byte pointer
+            # and a 24-byte float object per dimension.
+            "python_list_bytes": live * (56 + 32 * dimension),
+            "float32_bytes": self._size * dimension * 4,
+            "resident_float32_bytes": resident_floats,
+            "code_bytes": code_bytes,
+        }
+
+    def compact(self) -> None:
+        """Drop tombstoned rows and rebuild the id→row map."""
+        live = np.flatnonzero(self._alive[: self._size])
+        self._vectors = self._vectors[live].copy()
+        self._alive = np.ones(live.size, dtype=bool)
+        self._ids = [self._ids[row] for row in live]
+        self._payloads = [self._payloads[row] for row in live]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._payload_index = PayloadIndex.build(self._payloads)
+        self._size = live.size
+        self._generation += 1
+        self._ann_index = None
+        self._quantizer = None
+        self._codes = None
+        self._maybe_train()
+
+    def needs_training(self) -> bool:
+        """Whether the IVF index or quantizer is missing or stale for the current size."""
+        return self._ann_due() or self._quantizer_due()
+
+    def train(self) -> TrainedIndex:
+        """Train whatever ``needs_training`` reported on a snapshot of the current rows.
+
+        Only reads the collection, so it can run in a worker thread while the
+        owner keeps appending and deleting; ``install`` catches up on those.
+        """
+        size = self._size
+        vectors = self._vectors
+        live = np.flatnonzero(self._alive[:size])
+        trained = TrainedIndex(generation=self._generation, size=size, live=live)
+        if self._ann_due():
+            trained.ann_index = IVFIndex.train(vectors, live, self.ann)
+        if self._quantizer_due():
+            rng = np.random.default_rng(self.quantization.seed)
+            sample = np.sort(rng.choice(live, size=min(live.size, 65_536), replace=False))
+            trained.quantizer = train_quantizer(np.asarray(vectors[sample]), self.quantization)
+            trained.codes = self._encode_rows(trained.quantizer, vectors, 0, size)
+        return trained
+
+    def install(self, trained: TrainedIndex) -> bool:
+        """Swap in a ``train`` result, applying rows added or deleted since its snapshot.
+
+        Returns False, installing nothing, if a compaction renumbered the rows meanwhile.
+        """
+        if trained.generation != self._generation:
+            return False
+        if trained.ann_index is not None:
+            index = trained.ann_index
+            for row in trained.live[~self._alive[trained.live]].tolist():
+                index.remove(row)
+            added = trained.size + np.flatnonzero(self._alive[trained.size : self._size])
+            index.add_many(added, self._vectors[added])
+            self._ann_index = index
+        if trained.quantizer is not None:
+            tail = self._encode_rows(trained.quantizer, self._vectors, trained.size, self._size)
+            self._quantizer = trained.quantizer
+            self._codes = np.concatenate([trained.codes, tail])
+            self._quantized_rows = int(trained.live.size)
+        return True
+
+    def index_state(self) -> dict[str, np.ndarray]:
+        """The trained IVF index, quantizer and codes as arrays, for ``np.savez``."""
+        state: dict[str, np.ndarray] = {"size": np.array(self._size)}
+        if self._ann_index is not None:
+            state.update(self._ann_index.state())
+        if self._quantizer is not None:
+            state.update(self._quantizer.state())
+            state["codes"] = self._codes[: self._size]
+            state["quantized_rows"] = np.array(self._quantized_rows)
+        return state
+
+    def restore_index(self, state: dict[str, np.ndarray]) -> bool:
+        """Load an ``index_state`` saved for these exact rows; False if it does not match."""
+        if int(state["size"]) != self._size:
+            return False
+        if "ivf_centroids" in state and self.ann is not None:
+            index = IVFIndex.from_state(state)
+            for row in np.flatnonzero(~self._alive[: self._size]).tolist():
+                index.remove(row)
+            self._ann_index = index
+        quantizer = quantizer_from_state(state)
+        if quantizer is not None and self.quantization is not None:
+            self._quantizer = quantizer
+            self._codes = state["codes"]
+            self._quantized_rows = int(state["quantized_rows"])
+        return True
+
+    def _append(self, vec: np.ndarray) -> int:
+        if self._size == self._vectors.shape[0]:
+            capacity = max(self._capacity, self._size * 2)
+            grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+            if self._size:
+                grown[: self._size] = self._vectors[: self._size]
+            self._vectors = grown
+            alive = np.zeros(capacity, dtype=bool)
+            alive[: self._size] = self._alive[: self._size]
+            self._alive = alive
+        row = self._size
+        self._vectors[row] = vec
+        self._alive[row] = True
+        self._size += 1
+        return row
+
+    def _kill(self, row: int) -> None:
+        self._alive[row] = False
+        if self._ann_index is not None:
+            self._ann_index.remove(row)
+
+    def _maybe_train(self) -> None:
+        """Build the IVF index and quantizer past their size thresholds; retrain when the collection doubles."""
+        if self.inline_training and self.needs_training():
+            self.install(self.train())
+
+    def _ann_due(self) -> bool:
+        live_count = len(self._rows)
+        if self.ann is None or live_count == 0 or live_count < self.ann.min_size:
+            return False
+        return self._ann_index is None or live_count >= 2 * self._ann_index.trained_rows
+
+    def _quantizer_due(self) -> bool:
+        live_count = len(self._rows)
+        if self.quantization is None or live_count == 0 or live_count < self.quantization.min_size:
+            return False
+        return self._quantizer is None or live_count >= 2 * self._quantized_rows
+
+    @staticmethod
+    def _encode_rows(
+        quantizer: ScalarQuantizer | ProductQuantizer, vectors: np.ndarray, start: int, stop: int
+    ) -> np.ndarray:
+        blocks = [
+            quantizer.encode(vectors[offset : min(offset + 16_384, stop)]) for offset in range(start, stop, 16_384)
+        ]
+        if blocks:
+            return np.concatenate(blocks)
+        dtype = np.uint8 if isinstance(quantizer, ProductQuantizer) else np.int8
+        return np.zeros((0, quantizer.code_width), dtype=dtype)
+
+    def _store_code(self, row: int, vec: np.ndarray) -> None:
+        if row >= self._codes.shape[0]:
+            grown = np.zeros((max(row + 1, self._codes.shape[0] * 2), self._codes.shape[1]), dtype=self._codes.dtype)
+            grown[: self._codes.shape[0]] = self._codes
+            self._codes = grown
+        self._codes[row] = self._quantizer.encode(vec[None, :])[0]
+
+    def _result(self, row: int, score: float) -> SearchResult:
+        return SearchResult(doc_id=self._ids[row], score=score, payload=self._payloads[row])
+
+
 class LocalVectorStore:
-    """Simple in-memory vector store to mimic Qdrant behavior."""
+    """In-memory vector store that mimics Qdrant behavior.
+
+    Each user collection is a ``VectorCollection``; search is a single
+    matrix-vector product followed by an ``argpartition`` top-k. Stored
+    vectors are unit-normalized, so ``get_vector`` returns the normalized form.
 
-    def __init__(self) -> None:
-        self.collections: dict[str, dict[str, tuple[list[float], dict[str, Any]]]] = {}
+    ``passages`` is an optional second store holding per-passage vectors of
+    long entries under ``passage_id(parent_id, i)``; deleting a parent here
+    deletes its passages there.
+
+    IVF and quantizer training runs in a worker thread, scheduled after the
+    upsert or search that finds it due; searches stay exact until it lands.
+    """
+
+    def __init__(
+        self,
+        ann: AnnConfig | None = None,
+        quantization: QuantizationConfig | None = None,
+        passages: "LocalVectorStore | None" = None,
+    ) -> None:
+        self.collections: dict[str, VectorCollection] = {}
+        self.ann = ann
+        self.quantization = quantization
+        self.passages = passages
+        self._training: dict[VectorCollection, asyncio.Task] = {}
 
     async def init_collection(self, user_id: str) -> bool:
-        name = f"user_{user_id}"
-        if name not in self.collections:
-            self.collections[name] = {}
+        self._get_collection(user_id, create=True)
         return True
 
     async def upsert(
@@ -32,10 +529,8 @@ class LocalVectorStore:
         vector: list[float],
         payload: dict[str, Any],
     ) -> bool:
-        name = f"user_{user_id}"
-        if name not in self.collections:
-            await self.init_collection(user_id)
-        self.collections[name][doc_id] = (vector, payload)
+        self._get_collection(user_id, create=True).upsert(doc_id, vector, payload)
+        self._schedule_training(user_id)
         return True
 
     async def search(
@@ -45,36 +540,166 @@ class LocalVectorStore:
         limit: int = 20,
         threshold: float = 0.5,
         type_filter: str | None = None,
+        payload_filter: PayloadFilter | None = None,
     ) -> list[SearchResult]:
-        name = f"user_{user_id}"
-        if name not in self.collections:
+        collection = self._get_collection(user_id)
+        if collection is None:
             return []
+        self._schedule_training(user_id)
+        return collection.search(query_vector, limit, threshold, type_filter, payload_filter=payload_filter)
 
-        results: list[SearchResult] = []
-        for doc_id, (vector, payload) in self.collections[name].items():
-            if type_filter and payload.get("type") != type_filter:
-                continue
-            score = cosine_similarity(query_vector, vector)
-            if score >= threshold:
-                results.append(SearchResult(doc_id=doc_id, score=score, payload=payload))
-        results.sort(key=lambda item: item.score, reverse=True)
-        return results[:limit]
+    async def search_many(
+        self,
+        user_id: str,
+        query_vectors: list[list[float]],
+        limit: int = 20,
+        threshold: float = 0.5,
+        block_size: int = 256,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[list[SearchResult]]:
+        """Batched ``search``: one result list per query vector, in order."""
+        collection = self._get_collection(user_id)
+        if collection is None:
+            return [[] for _ in query_vectors]
+        self._schedule_training(user_id)
+        return collection.search_many(query_vectors, limit, threshold, block_size, payload_filter)
+
+    async def search_stored(
+        self,
+        user_id: str,
+        doc_ids: list[str],
+        limit: int = 20,
+        threshold: float = 0.5,
+        block_size: int = 256,
+    ) -> list[list[SearchResult]]:
+        """``search_many`` with the stored vectors of ``doc_ids`` as the queries.
+
+        Queries are copied out of the collection as float32 blocks of
+        ``block_size`` rows, so no per-document Python lists are built. Ids
+        without a vector get an empty result list.
+        """
+        collection = self._get_collection(user_id)
+        if collection is None:
+            return [[] for _ in doc_ids]
+        self._schedule_training(user_id)
+        results: list[list[SearchResult]] = []
+        for start in range(0, len(doc_ids), block_size):
+            vectors = [collection.get_vector(doc_id) for doc_id in doc_ids[start : start + block_size]]
+            stored = [vector for vector in vectors if vector is not None]
+            found = iter(
+                collection.search_many(np.stack(stored), limit, threshold, block_size) if stored else []
+            )
+            results.extend(next(found) if vector is not None else [] for vector in vectors)
+        return results
 
     async def delete(self, user_id: str, doc_id: str) -> bool:
-        name = f"user_{user_id}"
-        if name in self.collections and doc_id in self.collections[name]:
-            del self.collections[name][doc_id]
-            return True
-        return False
+        if self.passages is not None:
+            await self.passages.delete_passages(user_id, doc_id)
+        collection = self._get_collection(user_id)
+        if collection is None:
+            return False
+        return collection.delete(doc_id)
+
+    async def delete_passages(self, user_id: str, parent_id: str, start: int = 0) -> int:
+        """Delete passages ``start``, ``start + 1``, ... of ``parent_id``; returns how many."""
+        collection = self._get_collection(user_id)
+        if collection is None:
+            return 0
+        index = start
+        while collection.delete(passage_id(parent_id, index)):
+            index += 1
+        return index - start
 
     async def get_vector(self, user_id: str, doc_id: str) -> list[float] | None:
-        name = f"user_{user_id}"
-        if name not in self.collections or doc_id not in self.collections[name]:
+        collection = self._get_collection(user_id)
+        if collection is None:
             return None
-        return self.collections[name][doc_id][0]
+        vector = collection.get_vector(doc_id)
+        return vector.tolist() if vector is not None else None
+
+    async def missing(self, user_id: str, doc_ids: list[str]) -> list[str]:
+        """The ``doc_ids`` that have no stored vector, in order."""
+        collection = self._get_collection(user_id)
+        if collection is None:
+            return list(doc_ids)
+        return [doc_id for doc_id in doc_ids if doc_id not in collection]
 
     async def get_all(self, user_id: str) -> list[tuple[str, list[float], dict[str, Any]]]:
-        name = f"user_{user_id}"
-        if name not in self.collections:
+        collection = self._get_collection(user_id)
+        if collection is None:
             return []
-        return [(doc_id, vec, payload) for doc_id, (vec, payload) in self.collections[name].items()]
+        return [(doc_id, vec.tolist(), payload) for doc_id, vec, payload in collection.items()]
+
+    async def memory_report(self, user_id: str) -> dict[str, int]:
+        """Vector memory held for a user and the savings from mmap and quantization."""
+        collection = self._get_collection(user_id)
+        usage = collection.memory_usage() if collection is not None else VectorCollection().memory_usage()
+        resident = usage["resident_float32_bytes"] + usage["code_bytes"]
+        return {
+            **usage,
+            "resident_bytes": resident,
+            "saved_vs_python_lists": usage["python_list_bytes"] - resident,
+            "saved_vs_float32": usage["float32_bytes"] - resident,
+        }
+
+    async def approximate_recall(self, user_id: str, k: int = 10, sample: int = 100, seed: int = 0) -> float:
+        """Recall@k of the approximate (ANN/quantized) path against exact search.
+
+        Stored vectors are used as queries, so this measures the recall impact
+        of the current index and quantization settings on the user's own data.
+        """
+        collection = self._get_collection(user_id)
+        if collection is None:
+            return 1.0
+        vectors = [vector for _, vector, _ in collection.items()]
+        rng = np.random.default_rng(seed)
+        picks = rng.choice(len(vectors), size=min(sample, len(vectors)), replace=False)
+        exact = []
+        approximate = []
+        for index in picks.tolist():
+            query = vectors[index]
+            exact.append([r.doc_id for r in collection.search(query, k, -1.0, exact=True)])
+            approximate.append([r.doc_id for r in collection.search(query, k, -1.0)])
+        return recall_at_k(exact, approximate)
+
+    async def wait_for_training(self) -> None:
+        """Wait until no background training is running."""
+        while self._training:
+            await asyncio.wait(list(self._training.values()))
+
+    def _schedule_training(self, user_id: str) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        for segment in self._trainable(user_id):
+            if segment in self._training or not segment.needs_training():
+                continue
+            task = loop.create_task(self._train(user_id, segment))
+            self._training[segment] = task
+            task.add_done_callback(lambda _, segment=segment: self._training.pop(segment, None))
+
+    async def _train(self, user_id: str, segment: VectorCollection) -> None:
+        try:
+            trained = await anyio.to_thread.run_sync(segment.train)
+            if segment.install(trained):
+                await self._trained(user_id, segment)
+        except Exception:
+            logger.warning("index training failed for %s; searches stay exact", user_id, exc_info=True)
+
+    def _trainable(self, user_id: str) -> list[VectorCollection]:
+        collection = self._get_collection(user_id)
+        return [collection] if collection is not None else []
+
+    async def _trained(self, user_id: str, segment: VectorCollection) -> None:
+        """Called after a background training result is installed."""
+
+    def _get_collection(self, user_id: str, create: bool = False) -> VectorCollection | None:
+        name = f"user_{user_id}"
+        collection = self.collections.get(name)
+        if collection is None and create:
+            collection = self.collections[name] = self._new_collection(user_id)
+        return collection
+
+    def _new_collection(self, user_id: str) -> VectorCollection:
+        return VectorCollection(ann=self.ann, quantization=self.quantization, inline_training=False)
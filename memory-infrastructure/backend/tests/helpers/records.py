@@ -0,0 +1,25 @@
+"""Record builders for store tests."""
+
+from services.memory_store import MemoryRecord
+from services.utils import now_us
+
+
+def make_record(entry_id: str, user_id: str = "user-1") -> MemoryRecord:
+    return MemoryRecord(
+        id=entry_id,
+        user_id=user_id,
+        content_type="document",
+        title=entry_id,
+        content_preview="notes",
+        content="notes",
+        embedding_id=entry_id,
+        indexed_at_us=now_us(),
+        last_accessed_at_us=None,
+        access_count=0,
+        relevance_decay=1.0,
+        source_url=None,
+        source_metadata=None,
+        related_entries=[],
+        tags=[],
+        token_count=1,
+    )
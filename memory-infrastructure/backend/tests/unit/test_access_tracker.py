@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+
+from services.access_tracker import AccessTracker
+from services.memory_store import MemoryStore
+from services.utils import now_us
+from tests.helpers.records import make_record
+
+
+@pytest.mark.asyncio
+async def test_reads_are_coalesced_until_flush(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    await store.upsert_many([make_record("a"), make_record("b")])
+    tracker = AccessTracker(store, flush_interval=60)
+
+    first = now_us()
+    tracker.record("user-1", "a", first + 2_000_000)
+    tracker.record("user-1", "a", first)
+    tracker.record("user-1", "a", first + 1_000_000)
+    tracker.record("user-1", "b", first)
+    assert tracker.pending == 2
+    assert (await store.get("user-1", "a")).access_count == 0
+
+    await tracker.close()
+
+    a = await store.get("user-1", "a")
+    assert a.access_count == 3
+    assert a.last_accessed_at_us == first + 2_000_000
+    assert (await store.get("user-1", "b")).access_count == 1
+    assert tracker.pending == 0
+
+
+class FailingStore(MemoryStore):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flushes = 0
+
+    async def update_access_many(self, accesses):
+        self.flushes += 1
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+@pytest.mark.asyncio
+async def test_failing_flushes_keep_the_buffer_bounded(tmp_path):
+    store = FailingStore(tmp_path / "memory.db")
+    tracker = AccessTracker(store, flush_interval=60, max_pending=3)
+
+    for i in range(10):
+        tracker.record("user-1", f"e{i}")
+    await tracker._flush_task
+
+    assert store.flushes == 1
+    assert tracker.pending <= 3
+    with pytest.raises(sqlite3.OperationalError):
+        await tracker.close()
+    assert tracker.pending <= 3
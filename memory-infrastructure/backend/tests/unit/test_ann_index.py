@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from services.ann_index import AnnConfig, recall_at_k
+from services.vector_store import LocalVectorStore, VectorCollection
+
+
+def test_ivf_index_matches_exact_when_probing_every_list():
+    rng = np.random.default_rng(1)
+    collection = VectorCollection(ann=AnnConfig(min_size=100, nlist=8, nprobe=2))
+    data = rng.standard_normal((300, 16)).astype(np.float32)
+    for i, vector in enumerate(data):
+        collection.upsert(f"doc-{i}", vector, {})
+    assert collection.ann_index is not None
+
+    collection.delete("doc-0")
+    exact = collection.search(data[0], limit=5, threshold=-1.0, exact=True)
+    full_probe = collection.search(data[0], limit=5, threshold=-1.0, nprobe=8)
+    assert [r.doc_id for r in full_probe] == [r.doc_id for r in exact]
+    assert "doc-0" not in {r.doc_id for r in collection.search(data[0], limit=5, threshold=-1.0)}
+
+
+def test_recall_at_k():
+    assert recall_at_k([["a", "b"], ["c", "d"]], [["a", "x"], ["c", "d"]]) == 0.75
+    assert recall_at_k([], []) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_store_trains_the_index_off_the_event_loop():
+    rng = np.random.default_rng(2)
+    store = LocalVectorStore(ann=AnnConfig(min_size=100, nlist=8, nprobe=2))
+    data = rng.standard_normal((150, 16)).astype(np.float32)
+    for i, vector in enumerate(data):
+        await store.upsert("user-1", f"doc-{i}", vector, {})
+    collection = store.collections["user_user-1"]
+    assert collection.ann_index is None
+    assert [r.doc_id for r in await store.search("user-1", data[7].tolist(), limit=1)] == ["doc-7"]
+
+    await store.wait_for_training()
+    assert collection.ann_index is not None
+    assert len(collection.ann_index) == 150
@@ -0,0 +1,17 @@
+from services.chunking import split_passages
+
+
+def test_split_passages_overlaps_on_word_boundaries():
+    text = " ".join(f"word{i:03d}" for i in range(300))
+
+    passages = split_passages(text, max_chars=400, overlap=80)
+
+    assert len(passages) > 1
+    assert passages[0].start == 0
+    assert passages[-1].end == len(text)
+    for previous, passage in zip(passages, passages[1:]):
+        assert passage.start < previous.end
+        assert len(passage.text) <= 400
+        assert passage.text == text[passage.start : passage.end]
+        assert passage.text.startswith("word")
+    assert len(split_passages("short note")) == 1
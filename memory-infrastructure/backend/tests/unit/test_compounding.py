@@ -59,3 +59,60 @@ async def test_decay_reduces_relevance(tmp_path):
     record = await store.get("user-1", response.entry_id)
     assert decayed == 1
     assert record.relevance_decay < 1.0
+
+    assert await compounding.decay_stale_entries("user-1", decay_after_days=365) == 0
+    await compounding.events.flush()
+    events = await store.get_compounding_events("user-1", 10)
+    assert [event["details"] for event in events if event["event_type"] == "decay"] == [
+        {"decayed": 1, "decay_rate": 0.5}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_merge_near_duplicates_keeps_newer_entry(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    vector_store = LocalVectorStore()
+    voice = VoiceProfileService()
+    compounding = MemoryCompoundingService(store, vector_store, voice, search_block_size=1)
+    indexer = MemoryIndexService(vector_store, LocalVoyageClient())
+    aggregator = MemoryAggregator(store, indexer, compounding)
+
+    first = await aggregator.ingest(
+        "user-1", IngestRequest(content_type="text_snippet", title="Pricing", content="Annual plans", tags=["a"])
+    )
+    second = await aggregator.ingest(
+        "user-1", IngestRequest(content_type="text_snippet", title="Pricing", content="Annual plans", tags=["b"])
+    )
+
+    merged = await compounding.merge_near_duplicates("user-1")
+    assert merged == [(second.entry_id, first.entry_id)]
+    assert await store.get("user-1", first.entry_id) is None
+    assert (await store.get("user-1", second.entry_id)).tags == ["b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_merge_near_duplicates_reads_content_only_for_candidates(tmp_path, monkeypatch):
+    store = MemoryStore(tmp_path / "memory.db")
+    vector_store = LocalVectorStore()
+    compounding = MemoryCompoundingService(store, vector_store, VoiceProfileService(), search_block_size=2)
+    aggregator = MemoryAggregator(store, MemoryIndexService(vector_store, LocalVoyageClient()), compounding)
+    ids = []
+    for title, content in (("Pricing", "Annual plans"), ("Hiring", "Two engineers in Q3"), ("Pricing", "Annual plans")):
+        request = IngestRequest(content_type="text_snippet", title=title, content=content)
+        ids.append((await aggregator.ingest("user-1", request)).entry_id)
+
+    async def fail_list_all(user_id):
+        raise AssertionError("list_all loads every entry")
+
+    requested: list[str] = []
+    get_many = store.get_many
+
+    async def tracking_get_many(user_id, entry_ids):
+        requested.extend(entry_ids)
+        return await get_many(user_id, entry_ids)
+
+    monkeypatch.setattr(store, "list_all", fail_list_all)
+    monkeypatch.setattr(store, "get_many", tracking_get_many)
+    assert await compounding.merge_near_duplicates("user-1") == [(ids[2], ids[0])]
+    assert set(requested) == {ids[0], ids[2]}
+    assert await compounding.find_new_connections("user-1") == 0
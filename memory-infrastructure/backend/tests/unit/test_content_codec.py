@@ -0,0 +1,81 @@
+from dataclasses import MISSING, fields
+
+import pytest
+
+from services.content_codec import PLAIN, EncodedContent, ZlibCodec
+from services.memory_store import MemoryRecord, MemoryStore
+from tests.helpers.records import make_record
+
+
+def stored_row(store, entry_id):
+    return store._connect().execute(
+        "SELECT content, content_codec, content_raw_bytes FROM memory_entries WHERE id = ?", (entry_id,)
+    ).fetchone()
+
+
+@pytest.mark.asyncio
+async def test_content_round_trips_and_decodes_lazily(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db", codec=ZlibCodec())
+    long_record = make_record("long")
+    long_record.content = "the quick brown fox jumps over the lazy dog. " * 40
+    await store.upsert_many([long_record, make_record("short")])
+
+    assert stored_row(store, "long")["content_codec"] == "zlib"
+    assert stored_row(store, "short")["content_codec"] == PLAIN
+
+    record = await store.get("user-1", "long")
+    assert isinstance(record.__dict__["_content"], EncodedContent)
+    assert record.content == long_record.content
+    assert (await store.load_content("user-1", ["long"]))["long"] == long_record.content
+
+
+@pytest.mark.asyncio
+async def test_backfill_is_resumable_and_reported(tmp_path):
+    path = tmp_path / "memory.db"
+    legacy = MemoryStore(path)
+    records = [make_record(f"e{i}") for i in range(5)]
+    for record in records:
+        record.content = f"entry {record.id}: " + "repeated memory content " * 30
+    await legacy.upsert_many(records)
+    assert stored_row(legacy, "e0")["content_codec"] is None
+    legacy.close()
+
+    store = MemoryStore(path, codec=ZlibCodec())
+    store._write_sync(store._apply_compressed_tx, store._compress_batch_sync(None, 2))
+    assert await store.compress_content(batch_size=2) == 3
+    assert await store.compress_content() == 0
+
+    assert await store.train_content_dictionary() is not None
+    assert (await store.get("user-1", "e4")).content == records[4].content
+    [report] = await store.compression_report()
+    assert report["entries"] == report["compressed"] == 5
+    assert report["raw_bytes"] == sum(len(record.content) for record in records)
+    assert report["ratio"] > 3
+
+
+@pytest.mark.asyncio
+async def test_dictionaries_trained_elsewhere_are_loaded_on_first_use(tmp_path):
+    path = tmp_path / "memory.db"
+    server = MemoryStore(path, codec=ZlibCodec())
+    admin = MemoryStore(path, codec=ZlibCodec())
+    records = [make_record(f"e{i}") for i in range(20)]
+    for record in records:
+        record.content = f"note {record.id} about quarterly retention and onboarding " * 6
+    await admin.upsert_many(records)
+    dictionary_id = await admin.train_content_dictionary()
+    await admin.upsert(records[0])
+    assert stored_row(admin, "e0")["content_codec"] == f"zlib:{dictionary_id}"
+
+    assert (await server.get("user-1", "e0")).content == records[0].content
+    assert await server.delete("user-1", "e0")
+    await server.upsert(records[1])
+    assert stored_row(server, "e1")["content_codec"] == f"zlib:{dictionary_id}"
+
+
+def test_lazy_content_is_a_required_dataclass_field():
+    content = next(field for field in fields(MemoryRecord) if field.name == "content")
+    assert content.default is MISSING
+    with pytest.raises(TypeError):
+        MemoryRecord(*[None] * (len(fields(MemoryRecord)) - 1))
+    record = make_record("a")
+    assert record.__dict__["_content"] == record.content == "notes"
@@ -1,5 +1,8 @@
+import asyncio
+
 import pytest
 
+from services.chunking import split_passages
 from services.embedding import LocalVoyageClient
 from services.memory_index import MemoryIndexService
 from services.memory_store import MemoryStore
@@ -40,3 +43,121 @@ async def test_retrieve_context_returns_sources(tmp_path):
     assert result.sources
     assert result.sources[0].title == "Marketing Playbook"
     assert result.token_count > 0
+
+
+@pytest.mark.asyncio
+async def test_retrieve_context_pushes_filters_into_search(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    vector_store = LocalVectorStore()
+    embedding = LocalVoyageClient()
+    voice = VoiceProfileService()
+    compounding = MemoryCompoundingService(store, vector_store, voice)
+    indexer = MemoryIndexService(vector_store, embedding)
+    aggregator = MemoryAggregator(store, indexer, compounding)
+
+    for content_type in ("document", "article", "article"):
+        await aggregator.ingest(
+            "user-1",
+            IngestRequest(content_type=content_type, title=f"{content_type} notes", content="pricing strategy"),
+        )
+
+    builder = ContextBuilder(store, vector_store, embedding, voice)
+    result = await builder.retrieve_context(
+        "user-1",
+        ContextRequest(query="pricing strategy", content_types=["document"], max_sources=3),
+    )
+
+    assert [source.content_type for source in result.sources] == ["document"]
+    assert result.sources_considered == 1
+
+
+@pytest.mark.asyncio
+async def test_long_content_returns_best_passage_and_cascades_delete(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    vector_store = LocalVectorStore(passages=LocalVectorStore())
+    embedding = LocalVoyageClient()
+    voice = VoiceProfileService()
+    compounding = MemoryCompoundingService(store, vector_store, voice)
+    indexer = MemoryIndexService(vector_store, embedding, passage_chars=300, passage_overlap=50)
+    aggregator = MemoryAggregator(store, indexer, compounding)
+
+    content = " ".join(f"Paragraph {i} talks about topic {i} in some depth." for i in range(40))
+    response = await aggregator.ingest(
+        "user-1",
+        IngestRequest(content_type="document", title="Long read", content=content),
+    )
+    middle = split_passages(content, 300, 50)[3]
+
+    builder = ContextBuilder(store, vector_store, embedding, voice)
+    result = await builder.retrieve_context(
+        "user-1",
+        ContextRequest(query=middle.text, max_sources=1, min_relevance=0.9),
+    )
+
+    assert [source.entry_id for source in result.sources] == [response.entry_id]
+    assert result.sources[0].excerpt == middle.text
+
+    await vector_store.delete("user-1", response.entry_id)
+    assert await vector_store.passages.get_all("user-1") == []
+
+
+class UnavailableEmbedder(LocalVoyageClient):
+    async def embed_query(self, text: str) -> list[float]:
+        raise ConnectionError("embedding service unavailable")
+
+
+@pytest.mark.asyncio
+async def test_hybrid_retrieval_falls_back_to_lexical_matches(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    vector_store = LocalVectorStore()
+    embedding = LocalVoyageClient()
+    voice = VoiceProfileService()
+    compounding = MemoryCompoundingService(store, vector_store, voice)
+    aggregator = MemoryAggregator(store, MemoryIndexService(vector_store, embedding), compounding)
+
+    for title, content in (("Incident log", "Checkout returned ERR-4012 twice today."), ("Roadmap", "Q3 goals.")):
+        await aggregator.ingest("user-1", IngestRequest(content_type="document", title=title, content=content))
+
+    request = ContextRequest(query="ERR-4012", max_sources=3, retrieval_mode="hybrid", include_voice_profile=False)
+    hybrid = await ContextBuilder(store, vector_store, embedding, voice).retrieve_context("user-1", request)
+    assert hybrid.sources[0].title == "Incident log"
+
+    degraded = await ContextBuilder(store, vector_store, UnavailableEmbedder(), voice).retrieve_context("user-1", request)
+    assert [source.title for source in degraded.sources] == ["Incident log"]
+    assert degraded.sources[0].relevance_score > 0.7
+
+
+def test_retrieve_endpoint_caps_long_passage_excerpts(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from api.routes import context
+
+    store = MemoryStore(tmp_path / "memory.db")
+    vector_store = LocalVectorStore(passages=LocalVectorStore())
+    embedding = LocalVoyageClient()
+    voice = VoiceProfileService()
+    aggregator = MemoryAggregator(
+        store, MemoryIndexService(vector_store, embedding), MemoryCompoundingService(store, vector_store, voice)
+    )
+    content = " ".join(f"Section {i} covers churn drivers and renewal playbooks." for i in range(50))
+    assert len(content) > 2 * 1200
+    response = asyncio.run(
+        aggregator.ingest("user-1", IngestRequest(content_type="document", title="Playbook", content=content))
+    )
+    monkeypatch.setattr(context, "context_builder", ContextBuilder(store, vector_store, embedding, voice))
+    app = FastAPI()
+    app.include_router(context.router)
+
+    with TestClient(app) as client:
+        reply = client.post(
+            "/api/context/retrieve",
+            params={"user_id": "user-1"},
+            json={"query": content[1000:1990], "max_sources": 1, "min_relevance": 0.0, "include_voice_profile": False},
+        )
+
+    assert reply.status_code == 200
+    [source] = reply.json()["sources"]
+    assert source["entry_id"] == response.entry_id
+    assert 0 < len(source["excerpt"]) <= 500
+    assert source["excerpt"] in content
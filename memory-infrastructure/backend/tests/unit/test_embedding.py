@@ -0,0 +1,39 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from services.embedding import LocalVoyageClient
+
+SNIPPET = (
+    "import asyncio;"
+    "from services.embedding import LocalVoyageClient;"
+    "print(asyncio.run(LocalVoyageClient(8).embed('brand voice'))[:3])"
+)
+
+
+@pytest.mark.asyncio
+async def test_embeddings_are_stable_and_batched():
+    client = LocalVoyageClient(dimension=16)
+    single = await client.embed("brand voice")
+    batch = await client.embed_batch(["retention", "brand voice"])
+    assert batch[1] == single
+    assert batch[0] != single
+    assert client.embed_array(["a", "b", "c"]).shape == (3, 16)
+
+
+def test_embeddings_match_across_processes():
+    backend = Path(__file__).resolve().parents[2]
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", SNIPPET],
+            cwd=backend,
+            env={"PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert len(outputs) == 1
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from services.embedding import LocalVoyageClient
+from services.embedding_batcher import EmbeddingBatcher
+
+
+class RecordingClient(LocalVoyageClient):
+    def __init__(self) -> None:
+        super().__init__(dimension=8)
+        self.batches: list[list[str]] = []
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(list(texts))
+        await asyncio.sleep(0)
+        return await super().embed_batch(texts)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_batch():
+    client = RecordingClient()
+    batcher = EmbeddingBatcher(client, window_ms=20, max_batch_size=3)
+
+    texts = ["a", "b", "a", "c", "d"]
+    vectors = await asyncio.gather(*(batcher.embed(text) for text in texts))
+
+    assert client.batches == [["a", "b"], ["c", "d"]]
+    expected = await LocalVoyageClient(dimension=8).embed_batch(texts)
+    for got, want in zip(vectors, expected):
+        assert got == pytest.approx(want, abs=1e-6)
+    stats = batcher.stats()
+    assert stats["batches"] == 2
+    assert stats["items"] == 5
+    assert stats["max_batch_size"] == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_is_dropped_before_dispatch():
+    client = RecordingClient()
+    batcher = EmbeddingBatcher(client, window_ms=20)
+
+    doomed = asyncio.create_task(batcher.embed("doomed"))
+    kept = asyncio.create_task(batcher.embed("kept"))
+    await asyncio.sleep(0)
+    doomed.cancel()
+
+    assert len(await kept) == 8
+    with pytest.raises(asyncio.CancelledError):
+        await doomed
+    assert client.batches == [["kept"]]
+    assert batcher.stats()["cancelled"] == 1
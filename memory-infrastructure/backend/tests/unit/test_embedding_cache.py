@@ -0,0 +1,74 @@
+import pytest
+
+from services.embedding import LocalVoyageClient
+from services.embedding_cache import ENTRY_OVERHEAD_BYTES, CachedEmbeddingClient, SQLiteEmbeddingCache
+
+
+class CountingClient(LocalVoyageClient):
+    def __init__(self) -> None:
+        super().__init__(dimension=8)
+        self.calls = 0
+
+    def embed_array(self, texts: list[str]):
+        self.calls += len(texts)
+        return super().embed_array(texts)
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_and_evicts_least_recently_used():
+    client = CountingClient()
+    entry_bytes = 8 * 4 + 33 + ENTRY_OVERHEAD_BYTES
+    cache = CachedEmbeddingClient(client, max_bytes=2 * entry_bytes)
+
+    first = await cache.embed("alpha")
+    assert await cache.embed("alpha") == pytest.approx(first, abs=1e-6)
+    await cache.embed("beta")
+    await cache.embed("alpha")
+    await cache.embed("gamma")  # evicts "beta", the least recently used
+    await cache.embed("beta")
+
+    stats = cache.stats()
+    assert client.calls == 4
+    assert stats["hits"] == 2
+    assert stats["misses"] == 4
+    assert stats["evictions"] == 2
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 2 * entry_bytes
+
+
+@pytest.mark.asyncio
+async def test_batch_only_embeds_missing_texts():
+    client = CountingClient()
+    cache = CachedEmbeddingClient(client)
+    await cache.embed("alpha")
+    vectors = await cache.embed_batch(["alpha", "beta", "beta"])
+    assert len(vectors) == 3
+    assert client.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_is_shared_across_clients(tmp_path):
+    writer = CachedEmbeddingClient(CountingClient(), disk=SQLiteEmbeddingCache(tmp_path / "embeddings.db"))
+    vector = await writer.embed("alpha")
+    await writer.embed_query("alpha")
+
+    client = CountingClient()
+    reader = CachedEmbeddingClient(client, disk=SQLiteEmbeddingCache(tmp_path / "embeddings.db"))
+    assert await reader.embed_batch(["alpha"]) == [pytest.approx(vector, abs=1e-6)]
+    await reader.embed_query("alpha")
+    await reader.embed("beta")
+    assert client.calls == 1
+    assert reader.stats()["disk_hits"] == 2
+
+
+def test_disk_cache_prunes_least_recently_used(tmp_path):
+    import numpy as np
+
+    disk = SQLiteEmbeddingCache(tmp_path / "embeddings.db", max_bytes=3 * 32, prune_every=10_000)
+    for i in range(5):
+        disk._put_many_sync("m", 8, "document", [(bytes([i]) * 32, np.ones(8, dtype=np.float32))])
+        disk._connect().execute("UPDATE embeddings SET last_used_at = ? WHERE digest = ?", (i, bytes([i]) * 32))
+    assert disk._prune_sync() == 2
+    assert set(disk._get_many_sync("m", 8, "document", [bytes([i]) * 32 for i in range(5)])) == {
+        bytes([i]) * 32 for i in (2, 3, 4)
+    }
@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+from services.event_log import EventLog
+from services.memory_store import MemoryStore
+from services.utils import now_us, now_utc
+
+
+@pytest.mark.asyncio
+async def test_events_are_buffered_rolled_up_and_pruned(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    events = EventLog(store, flush_interval=60, batch_size=3)
+
+    await events.record("user-1", "content_accessed", {"entry_id": "a"})
+    await events.record("user-1", "content_accessed", {"entry_id": "b"})
+    assert await store.get_compounding_events("user-1", 10) == []
+
+    await events.record("user-1", "decay", {"decayed": 1})  # fills the batch
+    await events._flush_task
+    assert len(await store.get_compounding_events("user-1", 10)) == 3
+
+    await events.record("user-2", "decay", {"decayed": 2})
+    await events.close()
+
+    today = now_utc().date().isoformat()
+    assert {row["day"] for row in await store.get_event_rollups("user-1")} == {today}
+    counts = {row["event_type"]: row["count"] for row in await store.get_event_rollups("user-1")}
+    assert counts == {"content_accessed": 2, "decay": 1}
+    assert await store.last_compounding_event_at("user-2") is not None
+
+    assert await store.prune_compounding_events(now_us() - 60_000_000) == 0
+    assert await store.prune_compounding_events(now_us() + 1_000_000) == 4
+    assert await store.get_compounding_events("user-1", 10) == []
+    counts = {row["event_type"]: row["count"] for row in await store.get_event_rollups("user-1", today)}
+    assert counts == {"content_accessed": 2, "decay": 1}
+
+
+class FailingStore(MemoryStore):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flushes = 0
+
+    async def add_compounding_events(self, events):
+        self.flushes += 1
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+@pytest.mark.asyncio
+async def test_failing_flushes_keep_the_buffer_bounded(tmp_path):
+    store = FailingStore(tmp_path / "memory.db")
+    events = EventLog(store, flush_interval=60, batch_size=4, max_buffer=6)
+
+    for i in range(4):
+        await events.record("user-1", "content_accessed", {"entry_id": str(i)})
+    await events._flush_task
+    for i in range(4, 10):
+        await events.record("user-1", "content_accessed", {"entry_id": str(i)})  # never raises
+    await events._flush_task
+
+    assert store.flushes == 2
+    assert events.pending == 6
+    assert events.dropped == 4
+    assert [event[3]["entry_id"] for event in events._buffer] == [str(i) for i in range(4, 10)]
+    with pytest.raises(sqlite3.OperationalError):
+        await events.close()
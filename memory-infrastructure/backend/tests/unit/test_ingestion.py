@@ -36,3 +36,32 @@ async def test_ingest_creates_entry(tmp_path):
     assert record.title == "Test Note"
     assert record.content_preview.startswith("This is a short")
     assert response.related_entries == []
+
+
+class RejectingStore(MemoryStore):
+    """Refuses to store entries titled "bad"."""
+
+    def _record_params(self, record):
+        if record.title == "bad":
+            raise ValueError("rejected")
+        return super()._record_params(record)
+
+
+@pytest.mark.asyncio
+async def test_bulk_ingest_reports_unstored_entries_and_drops_their_vectors(tmp_path):
+    store = RejectingStore(tmp_path / "memory.db")
+    vector_store = LocalVectorStore()
+    compounding = MemoryCompoundingService(store, vector_store, VoiceProfileService())
+    aggregator = MemoryAggregator(store, MemoryIndexService(vector_store, LocalVoyageClient()), compounding)
+    entries = [
+        IngestRequest(content_type="text_snippet", title=title, content=f"{title} notes on growth", tags=[])
+        for title in ("first", "bad", "third")
+    ]
+
+    successful, failed = await aggregator.ingest_bulk("user-1", entries)
+
+    assert [item["index"] for item in failed] == [1]
+    assert len(successful) == 2
+    stored = {record.title for record in await store.list_all("user-1")}
+    assert stored == {"first", "third"}
+    assert len(await vector_store.get_all("user-1")) == 2
@@ -0,0 +1,350 @@
+import asyncio
+import gc
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from services import memory_store
+
+from services.content_codec import ZlibCodec
+from services.memory_store import MemoryStore
+from services.payload_index import PayloadFilter
+from services.utils import now_utc, to_epoch_us
+from tests.helpers.records import make_record
+
+
+@pytest.mark.asyncio
+async def test_connections_are_pooled_per_thread_in_wal_mode(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+
+    conn = store._connect()
+    assert store._connect() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+    await store.add_compounding_event("user-1", "decay", {"updated": 1})
+    assert len(await store.get_compounding_events("user-1", 10)) == 1
+
+    store.close()
+    assert store._connect() is not conn
+    store.close()
+
+
+def test_read_connections_close_with_their_threads(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    opened = []
+    for _ in range(5):
+        thread = threading.Thread(target=lambda: opened.append(store._connect()))
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert len(opened) == 5
+    assert store._connections == []
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_bulk_writes(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    await store.upsert_many([make_record(f"e{i}") for i in range(4)])
+
+    await store.update_decay_many("user-1", {"e0": 0.5, "e1": 0.25})
+    await store.update_related_many("user-1", {"e0": ["e1"]})
+    await store.add_related_many("user-1", [("e0", "e1"), ("e0", "e2"), ("e3", "e0")])
+    assert await store.delete_many("user-1", ["e1", "missing"]) == 1
+
+    records = {record.id: record for record in await store.list_all("user-1")}
+    assert sorted(records) == ["e0", "e2", "e3"]
+    assert records["e0"].relevance_decay == 0.5
+    # Deleting e1 cascades to its links.
+    assert records["e0"].related_entries == ["e2"]
+    assert records["e3"].related_entries == ["e0"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_transactions_and_fail_alone(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    broken = make_record("broken")
+    broken.title = None
+
+    results = await asyncio.gather(
+        *(store.upsert(make_record(f"e{i}")) for i in range(50)),
+        store.upsert(broken),
+        return_exceptions=True,
+    )
+
+    assert [type(result) for result in results if result is not None] == [sqlite3.IntegrityError]
+    assert len(await store.list_all("user-1")) == 50
+    stats = store.write_stats()
+    assert stats["writes"] == 51 and stats["failed"] == 1
+    assert stats["transactions"] < 51
+    assert stats["p99_write_ms"] > 0
+    with pytest.raises(sqlite3.OperationalError):
+        store._connect().execute("DELETE FROM memory_entries")
+
+    store.close()
+    await store.delete("user-1", "e0")
+    assert await store.get("user-1", "e0") is None
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_writer_survives_a_batch_that_fails_outside_its_transaction(tmp_path, monkeypatch):
+    store = MemoryStore(tmp_path / "memory.db")
+    run_write_batch = store._run_write_batch
+
+    def rollback_fails(conn, batch):
+        monkeypatch.setattr(store, "_run_write_batch", run_write_batch)
+        conn.execute("BEGIN IMMEDIATE")
+        raise sqlite3.OperationalError("disk I/O error during ROLLBACK")
+
+    monkeypatch.setattr(store, "_run_write_batch", rollback_fails)
+    with pytest.raises(sqlite3.OperationalError):
+        await store.upsert(make_record("lost"))
+
+    # The writer rolled back what the batch left open and keeps serving.
+    await asyncio.wait_for(store.upsert(make_record("kept")), timeout=5)
+    assert [record.id for record in await store.list_all("user-1")] == ["kept"]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_writes_fail_fast_once_the_writer_cannot_reconnect(tmp_path, monkeypatch):
+    store = MemoryStore(tmp_path / "memory.db")
+
+    def connection_lost(conn, batch):
+        conn.close()
+        raise sqlite3.OperationalError("disk I/O error")
+
+    def cannot_open(read_only=False):
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(store, "_run_write_batch", connection_lost)
+    monkeypatch.setattr(store, "_open_connection", cannot_open)
+    with pytest.raises(sqlite3.OperationalError):
+        await store.upsert(make_record("a"))
+    store._writer.join(timeout=5)
+
+    with pytest.raises(RuntimeError, match="writer stopped"):
+        await asyncio.wait_for(store.upsert(make_record("b")), timeout=5)
+    monkeypatch.undo()
+    store.close()
+    await store.upsert(make_record("c"))
+    assert await store.get("user-1", "c") is not None
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_user_stats_follow_writes_and_repair_drift(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    records = [make_record(f"e{i}") for i in range(4)] + [make_record("other", "user-2")]
+    for i, record in enumerate(records):
+        record.indexed_at_us = 1000 * (i + 1)
+        record.token_count = 10
+    records[3].content_type = "article"
+    await store.upsert_many(records)
+
+    # Re-indexing moves the newest bound; deleting e0 the oldest.
+    records[1].indexed_at_us = 5000
+    records[1].token_count = 5
+    await store.upsert(records[1])
+    await store.delete("user-1", "e0")
+    await store.delete_user("user-2")
+
+    expected = {
+        "total_entries": 3,
+        "total_tokens": 25,
+        "entries_by_type": {"document": 2, "article": 1},
+        "oldest": 3000,
+        "newest": 5000,
+    }
+    assert await store.stats("user-1") == expected
+    assert (await store.stats("user-2"))["total_entries"] == 0
+    assert await store.repair_user_stats() == 0
+
+    store._write_sync(lambda conn: conn.execute("UPDATE user_stats SET entries = 99, oldest_us = 0"))
+    assert await store.repair_user_stats("user-1") == 2
+    assert await store.stats("user-1") == expected
+
+
+@pytest.mark.asyncio
+async def test_get_many_returns_found_entries_keyed_by_id(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    await store.upsert_many([make_record(f"e{i}") for i in range(1000)] + [make_record("other", "user-2")])
+
+    wanted = [f"e{i}" for i in range(0, 1000, 3)] + ["missing", "other"]
+    records = await store.get_many("user-1", wanted)
+
+    assert set(records) == {f"e{i}" for i in range(0, 1000, 3)}
+    assert records["e3"].title == "e3"
+
+
+@pytest.mark.asyncio
+async def test_summaries_stream_in_pages_without_content(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    await store.upsert_many([make_record(f"e{i}") for i in range(7)] + [make_record("other", "user-2")])
+
+    pages = [page async for page in store.iter_summaries("user-1", page_size=3)]
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [summary.id for page in pages for summary in page] == [f"e{i}" for i in range(7)]
+    assert not hasattr(pages[0][0], "content")
+    assert await store.load_content("user-1", ["e2", "other"]) == {"e2": "notes"}
+
+
+@pytest.mark.asyncio
+async def test_list_page_walks_all_entries_with_cursor(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db")
+    records = [make_record(f"e{i}") for i in range(7)]
+    for i, record in enumerate(records):
+        record.relevance_decay = 1.0 if i % 2 else 0.5
+    await store.upsert_many(records)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = await store.list_page("user-1", None, 3, "relevance_decay", cursor)
+        seen.extend(record.id for record in page)
+        if cursor is None:
+            break
+        await store.upsert(make_record(f"late-{len(seen)}"))
+
+    assert seen == ["e5", "e3", "e1", "e6", "e4", "e2", "e0"]
+    with pytest.raises(ValueError):
+        await store.list_page("user-1", None, 3, "indexed_at", "not-a-cursor")
+
+
+# memory_entries as created before schema versioning (user_version 0).
+LEGACY_ENTRIES_DDL = """
+CREATE TABLE memory_entries (
+    id TEXT PRIMARY KEY, user_id TEXT NOT NULL, content_type TEXT NOT NULL, title TEXT NOT NULL,
+    content_preview TEXT NOT NULL, content TEXT NOT NULL, embedding_id TEXT NOT NULL,
+    indexed_at TEXT NOT NULL, last_accessed_at TEXT, access_count INTEGER NOT NULL,
+    relevance_decay REAL NOT NULL, source_url TEXT, source_metadata TEXT, related_entries TEXT,
+    tags TEXT, token_count INTEGER NOT NULL
+)
+"""
+
+
+def test_related_entries_json_column_migrates_to_edges(tmp_path):
+    db_path = tmp_path / "memory.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(LEGACY_ENTRIES_DDL)
+    for entry_id, related in (("a", '["b", "gone"]'), ("b", '["a"]'), ("c", None)):
+        conn.execute(
+            "INSERT INTO memory_entries VALUES (?, 'user-1', 'document', ?, '', '', ?, ?, NULL, 0, 1.0, NULL, NULL, ?, '[]', 1)",
+            (entry_id, entry_id, entry_id, now_utc().isoformat(), related),
+        )
+    conn.commit()
+    conn.close()
+
+    store = MemoryStore(db_path)
+    conn = store._connect()
+
+    assert "related_entries" not in {row["name"] for row in conn.execute("PRAGMA table_info(memory_entries)")}
+    assert store._get_sync("user-1", "a").related_entries == ["b"]
+    assert store._get_backlinks_sync("user-1", "a") == ["b"]
+    assert store._get_sync("user-1", "c").related_entries == []
+
+
+@pytest.mark.asyncio
+async def test_full_text_index_follows_writes_including_compressed_content(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db", codec=ZlibCodec())
+    long_record = make_record("long")
+    long_record.content = "Deploy failed with ERR-4012 on the Acme widget. " + "filler words " * 100
+    tagged = make_record("tagged", "user-1")
+    tagged.tags = ["acme"]
+    tagged.content_type = "article"
+    await store.upsert_many([long_record, tagged, make_record("other", "user-2")])
+
+    assert [entry_id for entry_id, _ in await store.search_text("user-1", "err-4012")] == ["long"]
+    assert {entry_id for entry_id, _ in await store.search_text("user-1", "acme")} == {"long", "tagged"}
+    articles = PayloadFilter(content_types=["article"])
+    assert [entry_id for entry_id, _ in await store.search_text("user-1", "acme", payload_filter=articles)] == ["tagged"]
+    assert await store.search_text("user-1", "?!") == []
+
+    long_record.content = "rewritten"
+    await store.upsert(long_record)
+    await store.delete("user-1", "tagged")
+    assert await store.search_text("user-1", "acme") == []
+    assert [entry_id for entry_id, _ in await store.search_text("user-1", "rewritten")] == ["long"]
+
+
+@pytest.mark.asyncio
+async def test_entries_with_undecodable_content_can_still_be_deleted(tmp_path):
+    store = MemoryStore(tmp_path / "memory.db", codec=ZlibCodec())
+    await store.upsert(make_record("e0"))
+    store._write_sync(lambda conn: conn.execute("UPDATE memory_entries SET content_codec = 'zlib:99'"))
+
+    assert await store.delete("user-1", "e0")
+    assert await store.get("user-1", "e0") is None
+
+
+def _legacy_db_with_timestamps(db_path, indexed_at):
+    conn = sqlite3.connect(db_path)
+    conn.execute(LEGACY_ENTRIES_DDL)
+    conn.execute(
+        "CREATE TABLE compounding_events (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, "
+        "event_type TEXT NOT NULL, timestamp TEXT NOT NULL, details TEXT NOT NULL)"
+    )
+    for entry_id, timestamp in indexed_at.items():
+        conn.execute(
+            "INSERT INTO memory_entries VALUES (?, 'user-1', 'document', ?, '', '', ?, ?, ?, 0, 1.0, NULL, NULL, NULL, '[]', 1)",
+            (entry_id, entry_id, entry_id, timestamp, timestamp),
+        )
+        conn.execute(
+            "INSERT INTO compounding_events (user_id, event_type, timestamp, details) VALUES ('user-1', 'decay', ?, '{}')",
+            (timestamp,),
+        )
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_iso_timestamps_migrate_to_epoch_microseconds(tmp_path, monkeypatch):
+    db_path = tmp_path / "memory.db"
+    # String order disagrees with time order once offsets differ.
+    _legacy_db_with_timestamps(
+        db_path,
+        {"east": "2024-01-01T10:00:00.000001+02:00", "utc": "2024-01-01T09:30:00+00:00", "naive": "2024-01-01T08:15:00"},
+    )
+
+    def interrupted(conn):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(memory_store, "MIGRATION_BATCH_SIZE", 2)
+    monkeypatch.setattr(MemoryStore, "_switch_to_epoch_timestamps", staticmethod(interrupted))
+    with pytest.raises(KeyboardInterrupt):
+        MemoryStore(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM memory_entries WHERE indexed_at_us IS NULL").fetchone()[0] == 0
+    conn.close()
+    monkeypatch.undo()
+
+    store = MemoryStore(db_path)
+    conn = store._connect()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == memory_store.SCHEMA_VERSION
+    assert "indexed_at" not in {row["name"] for row in conn.execute("PRAGMA table_info(memory_entries)")}
+
+    records, _ = await store.list_page("user-1", None, 10, "indexed_at")
+    assert [record.id for record in records] == ["utc", "naive", "east"]
+    assert records[2].indexed_at_us == to_epoch_us(datetime(2024, 1, 1, 8, 0, 0, 1, tzinfo=timezone.utc))
+    assert records[2].last_accessed_at_us == records[2].indexed_at_us
+    events = await store.get_compounding_events("user-1", 10)
+    assert [event["timestamp_us"] for event in events] == [record.indexed_at_us for record in records]
+    stats = await store.stats("user-1")
+    assert stats["total_entries"] == 3
+    assert (stats["oldest"], stats["newest"]) == (records[2].indexed_at_us, records[0].indexed_at_us)
+
+
+def test_newer_schema_version_is_refused(tmp_path):
+    conn = sqlite3.connect(tmp_path / "memory.db")
+    conn.execute(f"PRAGMA user_version = {memory_store.SCHEMA_VERSION + 1}")
+    conn.close()
+    with pytest.raises(RuntimeError):
+        MemoryStore(tmp_path / "memory.db")
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from services.payload_index import PayloadFilter
+from services.vector_store import LocalVectorStore
+
+
+@pytest.mark.asyncio
+async def test_filters_resolve_to_candidates_before_scoring():
+    rng = np.random.default_rng(2)
+    store = LocalVectorStore()
+    now = datetime.now(timezone.utc)
+    query = rng.standard_normal(16)
+    for i in range(30):
+        payload = {
+            "type": "article" if i % 3 == 0 else "document",
+            "tags": ["growth"] if i % 2 == 0 else ["retention"],
+            "created_at": (now - timedelta(days=i)).isoformat(),
+        }
+        await store.upsert("user-1", f"doc-{i}", query + 0.01 * rng.standard_normal(16), payload)
+
+    results = await store.search(
+        "user-1",
+        query.tolist(),
+        limit=20,
+        threshold=0.5,
+        payload_filter=PayloadFilter(
+            content_types=["article"],
+            tags=["growth"],
+            created_after=now - timedelta(days=20, hours=1),
+        ),
+    )
+    assert sorted(r.doc_id for r in results) == ["doc-0", "doc-12", "doc-18", "doc-6"]
+
+    by_type = await store.search("user-1", query.tolist(), limit=50, threshold=0.5, type_filter="article")
+    assert len(by_type) == 10
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from services.quantization import QuantizationConfig
+from services.vector_store import LocalVectorStore
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["int8", "pq"])
+async def test_quantized_search_rescores_exactly(mode):
+    rng = np.random.default_rng(4)
+    store = LocalVectorStore(quantization=QuantizationConfig(mode=mode, min_size=200, pq_subvectors=4))
+    data = rng.standard_normal((400, 16)).astype(np.float32)
+    for i, vector in enumerate(data):
+        await store.upsert("user-1", f"doc-{i}", vector, {})
+    await store.delete("user-1", "doc-1")
+    await store.wait_for_training()
+    assert store.collections["user_user-1"].quantizer is not None
+
+    results = await store.search("user-1", data[0].tolist(), limit=5, threshold=-1.0)
+    assert results[0].doc_id == "doc-0"
+    assert results[0].score == pytest.approx(1.0, abs=1e-5)
+    assert "doc-1" not in {r.doc_id for r in await store.search("user-1", data[1].tolist(), limit=5, threshold=-1.0)}
+
+    report = await store.memory_report("user-1")
+    assert report["vectors"] == 399
+    assert 0 < report["code_bytes"] < report["float32_bytes"]
+    assert report["saved_vs_python_lists"] > 0
+    assert await store.approximate_recall("user-1", k=5, sample=20) >= 0.6
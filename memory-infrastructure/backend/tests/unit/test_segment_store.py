@@ -0,0 +1,104 @@
+import random
+
+import numpy as np
+import pytest
+
+from services.ann_index import AnnConfig
+from services.embedding import LocalVoyageClient
+from services.memory_index import MemoryIndexService
+from services.memory_store import MemoryStore
+from services.segment_store import PersistentVectorStore
+from tests.helpers.records import make_record
+
+
+def _random_vector(rng: random.Random, dimension: int = 16) -> list[float]:
+    return [rng.gauss(0, 1) for _ in range(dimension)]
+
+
+@pytest.mark.asyncio
+async def test_vectors_survive_reopen(tmp_path):
+    rng = random.Random(3)
+    store = PersistentVectorStore(tmp_path / "vectors", segment_size=8)
+    vectors = {f"doc-{i}": _random_vector(rng) for i in range(20)}
+    for doc_id, vector in vectors.items():
+        await store.upsert("user-1", doc_id, vector, {"type": "document"})
+    await store.delete("user-1", "doc-3")
+    await store.upsert("user-1", "doc-4", vectors["doc-5"], {"type": "note"})
+    store.close()
+
+    reopened = PersistentVectorStore(tmp_path / "vectors", segment_size=8)
+    results = await reopened.search("user-1", vectors["doc-5"], limit=2, threshold=0.0)
+    assert {result.doc_id for result in results} == {"doc-4", "doc-5"}
+    assert await reopened.get_vector("user-1", "doc-3") is None
+    assert len(await reopened.get_all("user-1")) == 19
+    assert reopened.user_ids() == ["user-1"]
+
+
+@pytest.mark.asyncio
+async def test_merge_drops_deleted_rows(tmp_path):
+    rng = random.Random(5)
+    store = PersistentVectorStore(tmp_path / "vectors", segment_size=1000)
+    for i in range(10):
+        await store.upsert("user-1", f"doc-{i}", _random_vector(rng), {"type": "document"})
+    store.close()
+
+    # Each reopen seals the previous active segment, leaving small segments behind.
+    store = PersistentVectorStore(tmp_path / "vectors", segment_size=1000)
+    for i in range(10, 20):
+        await store.upsert("user-1", f"doc-{i}", _random_vector(rng), {"type": "document"})
+    for i in range(0, 20, 2):
+        await store.delete("user-1", f"doc-{i}")
+    store.close()
+
+    store = PersistentVectorStore(tmp_path / "vectors", segment_size=1000)
+    dropped = await store.merge_segments("user-1")
+    collection = store.collections["user_user-1"]
+    assert dropped == 10
+    assert len(collection.segment_names) == 1
+    store.close()
+
+    reopened = PersistentVectorStore(tmp_path / "vectors", segment_size=1000)
+    remaining = sorted(doc_id for doc_id, _, _ in await reopened.get_all("user-1"))
+    assert remaining == sorted(f"doc-{i}" for i in range(1, 20, 2))
+
+
+@pytest.mark.asyncio
+async def test_backfill_embeds_entries_missing_from_the_segment_store(tmp_path):
+    memory_store = MemoryStore(tmp_path / "memory.db")
+    await memory_store.upsert_many([make_record(f"entry-{i}") for i in range(5)])
+    store = PersistentVectorStore(tmp_path / "vectors", passages=PersistentVectorStore(tmp_path / "passages"))
+    indexer = MemoryIndexService(store, LocalVoyageClient())
+    await indexer.index_text_content("user-1", "entry-0", "notes", {"type": "document"})
+
+    assert await indexer.backfill(memory_store, "user-1", page_size=2) == 4
+    assert await indexer.backfill(memory_store, "user-1") == 0
+    store.close()
+
+    reopened = PersistentVectorStore(tmp_path / "vectors")
+    assert await reopened.missing("user-1", [f"entry-{i}" for i in range(5)]) == []
+    assert (await reopened.get_all("user-1"))[-1][2]["title"] == "entry-4"
+    memory_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sealed_segments_keep_their_trained_index(tmp_path):
+    rng = random.Random(9)
+    ann = AnnConfig(min_size=20, nlist=4, nprobe=1)
+    store = PersistentVectorStore(tmp_path / "vectors", segment_size=40, ann=ann)
+    vectors = {f"doc-{i}": _random_vector(rng) for i in range(50)}
+    for doc_id, vector in vectors.items():
+        await store.upsert("user-1", doc_id, vector, {})
+    await store.wait_for_training()
+    await store.delete("user-1", "doc-3")
+    sealed = store.collections["user_user-1"].segments()[0]
+    assert sealed.ann_index is not None
+    store.close()
+
+    reopened = PersistentVectorStore(tmp_path / "vectors", segment_size=40, ann=ann)
+    [first, _] = reopened._get_collection("user-1").segments()
+    assert not first.needs_training()
+    assert np.array_equal(first.ann_index.centroids, sealed.ann_index.centroids)
+    assert len(first.ann_index) == 39
+    results = await reopened.search("user-1", vectors["doc-5"], limit=1, threshold=0.0)
+    assert [result.doc_id for result in results] == ["doc-5"]
+    reopened.close()
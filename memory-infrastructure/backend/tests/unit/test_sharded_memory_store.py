@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+from services.content_codec import ZlibCodec
+from services.memory_store import MemoryStore
+from services.sharded_memory_store import LEGACY_MARKER, ShardedMemoryStore
+from services.utils import now_us
+from tests.helpers.records import make_record
+
+
+@pytest.mark.asyncio
+async def test_users_route_to_stable_shards(tmp_path):
+    store = ShardedMemoryStore(tmp_path, shard_count=4)
+    users = [f"user-{i}" for i in range(12)]
+    await store.upsert_many([make_record(f"{user}-e", user) for user in users])
+    await store.add_compounding_events([(user, "decay", now_us(), {}) for user in users])
+
+    shards = {user: store.shard_map.shard_for(user) for user in users}
+    assert len(set(shards.values())) > 1
+    for user in users:
+        assert (await store.store(shards[user]).get(user, f"{user}-e")) is not None
+    assert sum((await store.entry_counts()).values()) == 12
+    assert await store.prune_compounding_events(now_us() + 1) == 12
+    store.close()
+
+    reopened = ShardedMemoryStore(tmp_path, shard_count=4)
+    assert {user: reopened.shard_map.shard_for(user) for user in users} == shards
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_move_user_to_dedicated_shard(tmp_path):
+    store = ShardedMemoryStore(tmp_path, shard_count=2, codec=ZlibCodec())
+    records = [make_record(f"e{i}", "big") for i in range(3)]
+    records[0].content = "long enough to be compressed " * 20
+    records[1].related_entries = ["e2"]
+    await store.upsert_many(records + [make_record("x", "small")])
+    await store.add_compounding_event("big", "decay", {"decayed": 1})
+    await store.train_content_dictionary()
+    source = store.store(store.shard_map.shard_for("big"))
+
+    assert await store.move_user("big", "tenant-big") == 3
+    assert await source.get("big", "e0") is None
+    assert await store.get("small", "x") is not None
+
+    # Another process sees the new assignment.
+    other = ShardedMemoryStore(tmp_path, shard_count=2, codec=ZlibCodec())
+    assert other.shard_map.shard_for("big") == "tenant-big"
+    moved = await other.get("big", "e0")
+    assert moved.content == records[0].content
+    assert (await other.get("big", "e1")).related_entries == ["e2"]
+    assert len(await other.get_compounding_events("big", 10)) == 1
+    assert [entry_id for entry_id, _ in await other.search_text("big", "compressed")] == ["e0"]
+    assert "tenant-big" in [shard["shard"] for shard in await other.shard_report()]
+    other.close()
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_import_legacy_store(tmp_path):
+    legacy = MemoryStore(tmp_path / "memory.db")
+    await legacy.upsert_many([make_record("a", "user-1"), make_record("b", "user-2")])
+    await legacy.add_compounding_event("user-3", "decay", {})
+
+    store = ShardedMemoryStore(tmp_path / "shards", shard_count=2)
+    assert await store.import_store(legacy) == {"user-1": 1, "user-2": 1, "user-3": 0}
+    assert (await store.get("user-2", "b")).title == "b"
+    assert await store.last_compounding_event_at("user-3") is not None
+    store.close()
+    legacy.close()
+
+
+@pytest.mark.asyncio
+async def test_legacy_store_is_imported_once_on_first_start(tmp_path):
+    legacy = MemoryStore(tmp_path / "memory.db")
+    await legacy.upsert_many([make_record("a", "user-1"), make_record("b", "user-2")])
+    legacy.close()
+
+    store = ShardedMemoryStore(tmp_path / "shards", shard_count=2)
+    assert await store.import_legacy_once(tmp_path / "memory.db") == {"user-1": 1, "user-2": 1}
+    await store.delete("user-1", "a")
+    assert await store.import_legacy_once(tmp_path / "memory.db") is None
+    assert await store.get("user-1", "a") is None
+    assert (await store.get("user-2", "b")).title == "b"
+    store.close()
+
+    # Shards with data and no marker: refuse rather than guess which copy is current.
+    (tmp_path / "shards" / LEGACY_MARKER).unlink()
+    store = ShardedMemoryStore(tmp_path / "shards", shard_count=2)
+    with pytest.raises(RuntimeError, match="import-legacy"):
+        await store.import_legacy_once(tmp_path / "memory.db")
+    assert await store.import_legacy_once(tmp_path / "missing.db") is None
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_routing_refreshes_and_opens_shards_off_the_event_loop(tmp_path):
+    store = ShardedMemoryStore(tmp_path, shard_count=2, refresh_interval=0)
+    opened_on = []
+    open_shard = store.store
+    store.store = lambda shard: opened_on.append(threading.get_ident()) or open_shard(shard)
+    await store.upsert(make_record("a", "user-1"))
+    assert opened_on and threading.get_ident() not in opened_on
+
+    admin = ShardedMemoryStore(tmp_path, shard_count=2)
+    await admin.move_user("user-1", "tenant-1")
+    assert (await store.get("user-1", "a")).title == "a"
+    assert store.shard_map.cached_shard_for("user-1") == "tenant-1"
+    admin.close()
+    store.close()
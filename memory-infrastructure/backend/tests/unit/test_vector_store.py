@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from services.embedding import LocalVoyageClient
+from services.memory_index import MemoryIndexService
+from services.utils import cosine_similarity
+from services.vector_store import LocalVectorStore, passage_id
+
+
+def _random_vector(rng: random.Random, dimension: int = 32) -> list[float]:
+    return [rng.gauss(0, 1) for _ in range(dimension)]
+
+
+@pytest.mark.asyncio
+async def test_search_matches_exact_cosine_ranking():
+    rng = random.Random(7)
+    store = LocalVectorStore()
+    docs = {f"doc-{i}": _random_vector(rng) for i in range(200)}
+    for doc_id, vector in docs.items():
+        await store.upsert("user-1", doc_id, vector, {"type": "document"})
+
+    query = _random_vector(rng)
+    expected = sorted(docs, key=lambda doc_id: cosine_similarity(query, docs[doc_id]), reverse=True)[:10]
+    results = await store.search("user-1", query, limit=10, threshold=-1.0)
+
+    assert [result.doc_id for result in results] == expected
+    assert results[0].score == pytest.approx(cosine_similarity(query, docs[expected[0]]), abs=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_delete_and_reupsert_use_tombstones():
+    rng = random.Random(11)
+    store = LocalVectorStore()
+    for i in range(10):
+        await store.upsert("user-1", f"doc-{i}", _random_vector(rng), {"type": "note" if i % 2 else "document"})
+
+    vector = _random_vector(rng)
+    await store.upsert("user-1", "doc-0", vector, {"type": "document"})
+    assert await store.delete("user-1", "doc-1")
+    assert not await store.delete("user-1", "doc-1")
+
+    results = await store.search("user-1", vector, limit=20, threshold=-1.0, type_filter="document")
+    assert results[0].doc_id == "doc-0"
+    assert results[0].score == pytest.approx(1.0, abs=1e-5)
+    assert {result.doc_id for result in results} == {"doc-0", "doc-2", "doc-4", "doc-6", "doc-8"}
+    assert len(await store.get_all("user-1")) == 9
+    assert await store.get_vector("user-1", "doc-1") is None
+
+
+@pytest.mark.asyncio
+async def test_search_many_matches_single_queries():
+    rng = random.Random(13)
+    store = LocalVectorStore()
+    for i in range(50):
+        await store.upsert("user-1", f"doc-{i}", _random_vector(rng), {"type": "document"})
+    await store.delete("user-1", "doc-7")
+
+    queries = [_random_vector(rng) for _ in range(9)]
+    batched = await store.search_many("user-1", queries, limit=5, threshold=-1.0, block_size=4)
+    single = [await store.search("user-1", query, limit=5, threshold=-1.0) for query in queries]
+
+    assert [[r.doc_id for r in results] for results in batched] == [[r.doc_id for r in results] for results in single]
+
+
+@pytest.mark.asyncio
+async def test_search_stored_uses_stored_vectors_as_queries():
+    rng = random.Random(17)
+    store = LocalVectorStore()
+    for i in range(30):
+        await store.upsert("user-1", f"doc-{i}", _random_vector(rng), {"type": "document"})
+    await store.delete("user-1", "doc-4")
+
+    doc_ids = ["doc-1", "doc-4", "missing", "doc-20", "doc-9"]
+    stored = await store.search_stored("user-1", doc_ids, limit=3, threshold=-1.0, block_size=2)
+    single = [
+        await store.search("user-1", await store.get_vector("user-1", doc_id), limit=3, threshold=-1.0)
+        for doc_id in ("doc-1", "doc-20", "doc-9")
+    ]
+
+    assert [len(results) for results in stored] == [3, 0, 0, 3, 3]
+    assert [[r.doc_id for r in results] for results in stored if results] == [
+        [r.doc_id for r in results] for results in single
+    ]
+    assert await store.search_stored("user-2", ["doc-1"]) == [[]]
+
+
+@pytest.mark.asyncio
+async def test_delete_cascades_to_passages():
+    store = LocalVectorStore(passages=LocalVectorStore())
+    indexer = MemoryIndexService(store, LocalVoyageClient(), passage_chars=100, passage_overlap=20)
+    content = " ".join(f"Paragraph {i} about onboarding checklists." for i in range(20))
+    await indexer.index_text_content("user-1", "doc-1", content, {"type": "document"})
+    assert await store.passages.get_vector("user-1", passage_id("doc-1", 0)) is not None
+
+    assert await indexer.delete_indexed_content("user-1", "doc-1")
+    assert await store.passages.get_all("user-1") == []
+    assert await store.get_vector("user-1", "doc-1") is None